@@ -0,0 +1,99 @@
+from typing import Any, Dict, Optional, Sequence
+import numpy as np
+
+# 感情ラベル（インデックスは_LABEL_OF_RATINGの値に対応）
+LABELS = ("negative", "neutral", "positive")
+# 1-5の評価から感情ラベルのインデックスへの変換表（0番目は評価なし）
+_LABEL_OF_RATING = np.array([-1, 0, 0, 1, 2, 2])
+_STARS = np.arange(1, 6, dtype=np.float32)
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def probability_matrix(results: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """
+    記事ごとの1-5の確率分布を(記事数, 5)のfloat32配列にまとめる
+
+    確率分布を持たない結果（以前の形式で保存されたもの）は評価の位置を1とし、
+    評価も無い結果（エラー）は0の行とする
+    """
+    matrix = np.zeros((len(results), 5), dtype=np.float32)
+    for i, result in enumerate(results):
+        probs = result.get('probs')
+        if probs is not None:
+            matrix[i] = probs
+        elif result.get('rating'):
+            matrix[i, int(result['rating']) - 1] = 1.0
+    return matrix
+
+
+def _groups(keys: np.ndarray, labels: np.ndarray, stars: np.ndarray, valid: np.ndarray) -> Dict[str, Dict[str, Any]]:
+    """
+    キーごとの件数・ラベル別件数・平均評価をまとめて求める
+    """
+    names, inverse = np.unique(keys, return_inverse=True)
+    size = len(names)
+    totals = np.bincount(inverse, minlength=size)
+    counted = np.bincount(inverse[valid], minlength=size)
+    by_label = np.bincount(
+        inverse[valid] * len(LABELS) + labels[valid],
+        minlength=size * len(LABELS)
+    ).reshape(size, len(LABELS))
+    star_sums = np.bincount(inverse[valid], weights=stars[valid], minlength=size)
+    means = np.divide(star_sums, counted, out=np.zeros(size), where=counted > 0)
+
+    groups = {}
+    for i, name in enumerate(names.tolist()):
+        group = {label: int(by_label[i, j]) for j, label in enumerate(LABELS)}
+        group['total'] = int(totals[i])
+        group['mean_rating'] = round(float(means[i]), 4) if counted[i] else None
+        groups[name] = group
+    return groups
+
+
+def summarize(
+    results: Sequence[Dict[str, Any]],
+    sources: Optional[Sequence[str]] = None,
+    days: Optional[Sequence[str]] = None
+) -> Dict[str, Any]:
+    """
+    記事ごとの感情分析結果を1回の走査で集計する
+
+    戻り値の'counts'は従来のラベル別件数（total はエラーを含む全件数）、
+    'stats'は平均評価・信頼度で重み付けした件数・パーセンタイル・情報源別/日別の内訳
+    """
+    total = len(results)
+    probs = probability_matrix(results)
+    ratings = np.fromiter((r.get('rating') or 0 for r in results), dtype=np.int64, count=total)
+    scores = np.fromiter((r.get('score') or 0.0 for r in results), dtype=np.float32, count=total)
+
+    labels = _LABEL_OF_RATING[ratings]
+    valid = labels >= 0
+    # 確率分布から求めた評価の期待値（1-5）
+    stars = probs @ _STARS
+
+    label_counts = np.bincount(labels[valid], minlength=len(LABELS))
+    weighted = np.bincount(labels[valid], weights=scores[valid], minlength=len(LABELS))
+    counts = {label: int(label_counts[i]) for i, label in enumerate(LABELS)}
+    counts['total'] = total
+
+    analyzed = int(valid.sum())
+    stats: Dict[str, Any] = {
+        'articles': analyzed,
+        'errors': total - analyzed,
+        'mean_rating': None,
+        'rating_distribution': None,
+        'rating_percentiles': None,
+        'weighted': {label: round(float(weighted[i]), 4) for i, label in enumerate(LABELS)},
+    }
+    if analyzed:
+        stats['mean_rating'] = round(float(stars[valid].mean()), 4)
+        stats['rating_distribution'] = [round(float(p), 4) for p in probs[valid].mean(axis=0)]
+        stats['rating_percentiles'] = {
+            f"p{q}": round(float(value), 4)
+            for q, value in zip(PERCENTILES, np.percentile(stars[valid], PERCENTILES))
+        }
+    if sources is not None:
+        stats['by_source'] = _groups(np.asarray(sources, dtype=str), labels, stars, valid)
+    if days is not None:
+        stats['by_day'] = _groups(np.asarray(days, dtype=str), labels, stars, valid)
+    return {'counts': counts, 'stats': stats}
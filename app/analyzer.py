@@ -1,67 +1,595 @@
 import os
+import time
 import asyncio
-from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
 from dotenv import load_dotenv
 from .model import Sentiment
+from .batching import plan_batches
+from .cache import SentimentCache, cached_batch, make_cache_key
+from .language import LANGUAGE_MODELS, estimate_tokens, route_batch, split_revision
+from .workers import INFERENCE_WORKERS, InferencePool
+from .startup import stage
+from .logs import fields, get_logger
+from .metrics import ERRORS, QUEUE_WAIT_SECONDS, SCHEDULER_BATCH_SIZE, Gauge, observe_predict
 
 # 環境変数の読み込み
 load_dotenv()
 
+MODEL_NAME = os.getenv("SENTIMENT_MODEL", "nlptown/bert-base-multilingual-uncased-sentiment")
+MODEL_REVISION = os.getenv("SENTIMENT_MODEL_REVISION", "main")
+# 1回のフォワードパスで処理する最大テキスト数
+BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", "32"))
+# 1回のフォワードパスで処理するパディングを含む最大トークン数（0の場合はBATCH_SIZE件ずつ）
+TOKEN_BUDGET = int(os.getenv("SENTIMENT_TOKEN_BUDGET", "8192"))
+MAX_LENGTH = 512
+# 長文を分割するウィンドウ数の上限（1の場合は先頭512トークンのみを分析する）と、ウィンドウ間で重複させるトークン数
+MAX_CHUNKS = int(os.getenv("SENTIMENT_MAX_CHUNKS", "8"))
+CHUNK_STRIDE = int(os.getenv("SENTIMENT_CHUNK_STRIDE", "64"))
+# マイクロバッチの最大件数と最大待ち時間（ミリ秒）。最大件数の既定値は見出し程度（約32トークン）の
+# テキストでトークン予算を満たす件数とし、長さの近いテキストを同じバッチにまとめられるようにする
+# （ワーカープールでは各ワーカーが並行して別のマイクロバッチを処理できるようワーカー数で割る）
+SCHEDULER_MAX_BATCH_SIZE = int(os.getenv(
+    "SCHEDULER_MAX_BATCH_SIZE", str(max(BATCH_SIZE, TOKEN_BUDGET // 32 // max(1, INFERENCE_WORKERS)))
+))
+SCHEDULER_MAX_WAIT_MS = float(os.getenv("SCHEDULER_MAX_WAIT_MS", "10"))
+# 起動時にバックグラウンドでモデルを読み込むかどうか（0の場合は最初のリクエストで読み込む）
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "1") == "1"
+# モデルの読み込み後にダミーのバッチで推論を1回実行するかどうか
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "1") == "1"
+WARMUP_TEXTS = ["This is a warm-up sentence.", "ウォームアップ用の文です。"]
+
+logger = get_logger("analyzer")
+
+
+def rating_to_sentiment(rating: int) -> str:
+    """
+    1-5の評価を3段階の感情に変換
+    """
+    if rating >= 4:
+        return 'positive'
+    elif rating <= 2:
+        return 'negative'
+    return 'neutral'
+
+
 class SentimentAnalyzer:
-    def __init__(self):
+    def __init__(
+        self,
+        model_name: str = MODEL_NAME,
+        batch_size: int = BATCH_SIZE,
+        revision: str = MODEL_REVISION,
+        cache: Optional[SentimentCache] = None,
+        backend: Optional[str] = None,
+        max_chunks: int = MAX_CHUNKS,
+        chunk_stride: int = CHUNK_STRIDE,
+        language_models: Optional[Dict[str, str]] = None,
+        token_budget: int = TOKEN_BUDGET
+    ):
+        # torch・transformersは読み込みに時間がかかるため、モデルの作成時に読み込む
+        from transformers import AutoTokenizer, AutoModelForSequenceClassification
+        from .backends import SENTIMENT_BACKEND, configure_threads
+
         # 感情分析モデルの初期化
-        model_name = "nlptown/bert-base-multilingual-uncased-sentiment"
-        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-        self.model = AutoModelForSequenceClassification.from_pretrained(model_name)
-        self.pipeline = pipeline(
-            "sentiment-analysis",
-            model=self.model,
-            tokenizer=self.tokenizer
+        configure_threads()
+        self.model_name = model_name
+        self.revision = revision
+        self.batch_size = batch_size
+        self.token_budget = token_budget
+        self.last_timings: dict = {}
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name, revision=revision)
+        # ウィンドウへの分割には高速トークナイザー（overflow_to_sample_mapping）が必要
+        self.max_chunks = max_chunks if self.tokenizer.is_fast else 1
+        self.chunk_stride = chunk_stride
+        self.model = AutoModelForSequenceClassification.from_pretrained(model_name, revision=revision)
+        self.model.eval()
+        self.id2label = self.model.config.id2label
+        self.backend = self._load_backend(backend or SENTIMENT_BACKEND)
+        if self.backend.name != "torch":
+            # fp32モデルは不要になるため解放する
+            self.model = None
+        # 同一テキストの再推論を避けるための結果キャッシュ（バックエンドごとに結果が異なりうる）
+        self.cache = cache if cache is not None else SentimentCache()
+        self.cache_revision = f"{revision}+{self.backend.name}"
+        if self.max_chunks > 1:
+            self.cache_revision += f"+chunk{self.max_chunks}x{self.chunk_stride}"
+        # 言語ごとのモデル（最初にその言語のテキストを分析する時に読み込む）
+        self.language_models = LANGUAGE_MODELS if language_models is None else language_models
+        self._language_analyzers: Dict[str, "SentimentAnalyzer"] = {}
+        self._language_lock = threading.Lock()
+
+    def _load_backend(self, name: str):
+        """
+        推論バックエンドを作成し、fp32モデルとのラベル一致率を確認する
+
+        作成に失敗した場合や一致率が低い場合はfp32のPyTorchにフォールバックする
+        """
+        from .backends import (
+            BACKEND_MIN_AGREEMENT,
+            BACKEND_VERIFY,
+            TorchBackend,
+            create_backend,
+            label_agreement
         )
 
+        baseline = TorchBackend(self.model)
+        self.agreement = None
+        if name == "torch":
+            return baseline
+        try:
+            candidate = create_backend(name, self.model, f"{self.model_name}@{self.revision}")
+            if BACKEND_VERIFY:
+                self.agreement = label_agreement(baseline, candidate, self.tokenizer)
+                logger.info("推論バックエンドのラベル一致率", extra=fields(backend=name, agreement=self.agreement))
+                if self.agreement < BACKEND_MIN_AGREEMENT:
+                    logger.warning(
+                        f"一致率が{BACKEND_MIN_AGREEMENT:.0%}未満のためtorchを使用します",
+                        extra=fields(backend=name, agreement=self.agreement)
+                    )
+                    return baseline
+            return candidate
+        except Exception as e:
+            logger.warning("推論バックエンドを使用できないためtorchを使用します", extra=fields(backend=name, error=str(e)))
+            return baseline
+
+    def backend_info(self) -> dict:
+        import torch
+
+        return {
+            'backend': self.backend.name,
+            'agreement': self.agreement,
+            'intra_op_threads': torch.get_num_threads(),
+            'inter_op_threads': torch.get_num_interop_threads(),
+        }
+
     def analyze_text(self, text: str) -> dict:
         """
         テキストの感情分析を実行
         """
-        try:
-            # トークン化して長さを確認
-            tokens = self.tokenizer.encode(text, truncation=True, max_length=512)
-            # トークン化されたテキストをデコード
-            truncated_text = self.tokenizer.decode(tokens, skip_special_tokens=True)
-            
-            # 感情分析の実行
-            result = self.pipeline(truncated_text)[0]
-            
-            # 結果の整形
-            label = result['label']
-            score = result['score']
-            
-            # ラベルを感情に変換（1-5のスケールを3段階に変換）
-            rating = int(label.split()[0])
-            if rating >= 4:
-                sentiment = 'positive'
-            elif rating <= 2:
-                sentiment = 'negative'
-            else:
-                sentiment = 'neutral'
-            
-            print(f"感情分析結果: {sentiment} (スコア: {score:.2f}, 評価: {rating})")
-            
-            return {
-                'sentiment': sentiment,
+        # トークン化（切り詰めを含む）は1回だけ行い、トークンIDを直接モデルに渡す
+        result = self.analyze_batch([text])[0]
+        if result['sentiment'] != 'ERROR':
+            logger.debug(
+                "感情分析結果",
+                extra=fields(sample=True, sentiment=result['sentiment'], score=result['score'], rating=result['rating'])
+            )
+        return result
+
+    def analyze_batch(self, texts: List[str], batch_size: int = None) -> List[dict]:
+        """
+        複数テキストの感情分析をバッチ単位で実行
+
+        テキストは言語ごとにまとめて推論する。キャッシュに結果があるテキストはモデルを実行しない
+        """
+        batch_size = batch_size or self.batch_size
+        return route_batch(texts, lambda language, group: self._analyze_group(language, group, batch_size))
+
+    def _analyze_group(self, language: Optional[str], texts: List[str], batch_size: int) -> List[dict]:
+        analyzer = self.for_language(language)
+        keys = [make_cache_key(text, analyzer.model_name, analyzer.cache_revision) for text in texts]
+        lengths = [estimate_tokens(text, language) for text in texts]
+        return cached_batch(self.cache, texts, keys, analyzer._predict, batch_size, lengths, analyzer.token_budget)
+
+    def for_language(self, language: Optional[str]) -> "SentimentAnalyzer":
+        """
+        言語に対応するモデルを返す（SENTIMENT_LANGUAGE_MODELSに無い言語は自身）
+        """
+        spec = self.language_models.get(language) if language else None
+        if not spec:
+            return self
+        model_name, revision = split_revision(spec)
+        if (model_name, revision) == (self.model_name, self.revision):
+            return self
+        with self._language_lock:
+            if language not in self._language_analyzers:
+                logger.info("言語別のモデルを読み込みます", extra=fields(language=language, model=model_name))
+                self._language_analyzers[language] = SentimentAnalyzer(
+                    model_name=model_name,
+                    batch_size=self.batch_size,
+                    revision=revision,
+                    cache=self.cache,
+                    backend=self.backend.name,
+                    max_chunks=self.max_chunks,
+                    chunk_stride=self.chunk_stride,
+                    language_models={},
+                    token_budget=self.token_budget
+                )
+            return self._language_analyzers[language]
+
+    def _predict(self, texts: List[str]) -> List[dict]:
+        """
+        1バッチ分をパディング付きでトークン化し、モデルを実行
+
+        MAX_LENGTHを超えるテキストは重複付きのウィンドウ（最大max_chunks個）に分割し、
+        全テキストのウィンドウを長さ順に並べ、token_budget以内のバッチにまとめて推論する。
+        テキストごとの結果はウィンドウのトークン数で重み付けした1-5の確率分布の平均から求める。
+        返却する'text'は入力文字列そのもの（デコードによる再生成は行わない）。
+        トークン化とモデル実行の所要時間（全体とバッチごと）、パディングを含むトークン数はlast_timingsに残し、メトリクスに記録する
+        """
+        return self.predict_encoded(self.encode(texts))
+
+    def encode(self, texts: List[str]) -> dict:
+        """
+        テキストをトークン化し、ウィンドウとテキストの対応を求める
+
+        モデルを使わないため、predict_encodedとは別のスレッドで実行できる
+        """
+        import torch
+
+        if not texts:
+            return {'texts': [], 'inputs': {}, 'mapping': torch.zeros(0, dtype=torch.long), 'tokenize_s': 0.0}
+        started = time.perf_counter()
+        options = {}
+        if self.max_chunks > 1:
+            options = {'return_overflowing_tokens': True, 'stride': self.chunk_stride}
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=MAX_LENGTH,
+            return_tensors="pt",
+            **options
+        )
+        mapping = encoded.pop("overflow_to_sample_mapping", None)
+        if mapping is None:
+            mapping = torch.arange(len(texts))
+        else:
+            # テキストごとに先頭からmax_chunks個のウィンドウだけを使う
+            first = torch.searchsorted(mapping, mapping, right=False)
+            keep = (torch.arange(len(mapping)) - first) < self.max_chunks
+            if not bool(keep.all()):
+                encoded = {name: values[keep] for name, values in encoded.items()}
+                mapping = mapping[keep]
+        return {
+            'texts': texts,
+            'inputs': dict(encoded),
+            'mapping': mapping,
+            'tokenize_s': time.perf_counter() - started,
+        }
+
+    def predict_encoded(self, encoded: dict) -> List[dict]:
+        """
+        encodeの結果でモデルを実行し、テキストごとの結果にまとめる
+        """
+        import torch
+
+        started = time.perf_counter()
+        texts = encoded['texts']
+        if not texts:
+            return []
+        inputs = encoded['inputs']
+        mapping = encoded['mapping']
+        lengths = inputs["attention_mask"].sum(dim=1)
+        right = self.tokenizer.padding_side == "right"
+        total = inputs["attention_mask"].shape[1]
+        probs = None
+        real = padded = 0
+        batch_inference_s = []
+        for batch in plan_batches(lengths.tolist(), self.token_budget, self.batch_size):
+            batch_started = time.perf_counter()
+            index = torch.tensor(batch)
+            # バッチ内の最長ウィンドウに合わせてパディングを切り詰める
+            width = int(lengths[index].max())
+            columns = slice(0, width) if right else slice(total - width, total)
+            window = {name: values[index][:, columns] for name, values in inputs.items()}
+            logits = torch.from_numpy(self.backend.predict_logits(window))
+            batch_probs = torch.softmax(logits.float(), dim=-1)
+            if probs is None:
+                probs = torch.empty(len(mapping), batch_probs.shape[1])
+            # 元のウィンドウの順に戻す
+            probs[index] = batch_probs
+            batch_inference_s.append(time.perf_counter() - batch_started)
+            real += int(lengths[index].sum())
+            padded += width * len(batch)
+        self.last_timings = {
+            'tokenize_s': encoded['tokenize_s'],
+            'inference_s': time.perf_counter() - started,
+            'real_tokens': real,
+            'padded_tokens': padded,
+            'batch_inference_s': batch_inference_s,
+        }
+        observe_predict(**self.last_timings)
+
+        weights = lengths.float()
+        totals = torch.zeros(len(texts), probs.shape[1]).index_add_(0, mapping, probs * weights[:, None])
+        norms = torch.zeros(len(texts)).index_add_(0, mapping, weights)
+        distributions = totals / norms[:, None]
+        scores, label_ids = distributions.max(dim=-1)
+
+        id2label = self.id2label
+        results = []
+        for text, score, label_id, distribution in zip(
+            texts, scores.tolist(), label_ids.tolist(), distributions.tolist()
+        ):
+            rating = int(id2label[label_id].split()[0])
+            results.append({
+                'sentiment': rating_to_sentiment(rating),
                 'score': score,
-                'text': truncated_text
-            }
-        except Exception as e:
-            print(f"感情分析エラー: {str(e)}")
-            return {
-                'sentiment': 'ERROR',
-                'score': 0.0,
+                'rating': rating,
+                # 1-5の各評価の確率（保存・キャッシュのためリストで持ち、集計時に配列にまとめる）
+                'probs': distribution,
                 'text': text
-            }
+            })
+        return results
+
+class BatchScheduler:
+    """
+    複数リクエストからのテキストを集約し、まとめて推論するマイクロバッチスケジューラ
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[str]], List[dict]],
+        max_batch_size: int = SCHEDULER_MAX_BATCH_SIZE,
+        max_wait_ms: float = SCHEDULER_MAX_WAIT_MS,
+        concurrency: int = 1
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        # 同時に推論するバッチ数（プロセス内推論では1でモデルへのアクセスを直列化する）
+        self.concurrency = max(1, concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.concurrency,
+            thread_name_prefix="sentiment-batch"
+        )
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._running = set()
+        # 統計情報
+        self._batches = 0
+        self._items = 0
+        self._max_batch = 0
+        self._wait_ms = deque(maxlen=1000)
+        self._inference_ms = deque(maxlen=1000)
+
+    def _ensure_started(self) -> None:
+        """
+        現在のイベントループ上でワーカーを起動する
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, text: str) -> dict:
+        """
+        1件のテキストを投入し、結果を待つ
+        """
+        return (await self.submit_many([text]))[0]
+
+    async def submit_many(self, texts: List[str]) -> List[dict]:
+        """
+        複数のテキストを投入し、全ての結果を待つ
+        """
+        self._ensure_started()
+        now = time.monotonic()
+        futures = []
+        for text in texts:
+            future = self._loop.create_future()
+            self._queue.put_nowait((text, future, now))
+            futures.append(future)
+        return list(await asyncio.gather(*futures))
+
+    async def _run(self) -> None:
+        """
+        キューからバッチを組み立てて推論するワーカー
+
+        推論中のバッチが上限に達している間は新しいバッチを組み立てず、キューに溜まった分をまとめる
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # キャンセル済みのリクエストは除外
+            batch = [item for item in batch if not item[1].done()]
+            if not batch:
+                self._slots.release()
+                continue
 
-# シングルトンインスタンス
-analyzer = SentimentAnalyzer()
+            task = loop.create_task(self._execute(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _execute(self, batch: list) -> None:
+        """
+        1バッチを推論スレッドで実行し、結果を各リクエストに返す
+        """
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        waits = [started - enqueued for _, _, enqueued in batch]
+        self._wait_ms.extend(wait * 1000 for wait in waits)
+        for wait in waits:
+            QUEUE_WAIT_SECONDS.observe(wait)
+        SCHEDULER_BATCH_SIZE.observe(len(batch))
+        try:
+            results = await loop.run_in_executor(
+                self._executor,
+                self.batch_fn,
+                [text for text, _, _ in batch]
+            )
+        except Exception as e:
+            ERRORS.inc(stage="scheduler")
+            logger.exception("バッチ推論エラー", extra=fields(batch_size=len(batch)))
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._slots.release()
+
+        self._inference_ms.append((time.monotonic() - started) * 1000)
+        self._batches += 1
+        self._items += len(batch)
+        self._max_batch = max(self._max_batch, len(batch))
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue else 0
+
+    def stats(self) -> dict:
+        """
+        キューの深さ・バッチサイズ・待ち時間の統計を返す
+        """
+        def percentile(values, q):
+            if not values:
+                return 0.0
+            ordered = sorted(values)
+            return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+        return {
+            'queue_depth': self.queue_depth,
+            'concurrency': self.concurrency,
+            'in_flight': len(self._running),
+            'batches': self._batches,
+            'items': self._items,
+            'avg_batch_size': self._items / self._batches if self._batches else 0.0,
+            'max_batch_size': self._max_batch,
+            'wait_ms_p50': percentile(self._wait_ms, 0.5),
+            'wait_ms_p95': percentile(self._wait_ms, 0.95),
+            'wait_ms_max': max(self._wait_ms, default=0.0),
+            'inference_ms_p50': percentile(self._inference_ms, 0.5),
+            'inference_ms_p95': percentile(self._inference_ms, 0.95),
+        }
+
+class AnalyzerLoader:
+    """
+    感情分析モデル（またはワーカープール）を最初に必要になった時点で1回だけ作成する
+
+    起動時にバックグラウンドで読み込み・ウォームアップしておくこともできる
+    """
+
+    def __init__(self, factory: Callable[[], object], warmup: bool = MODEL_WARMUP, preload: bool = MODEL_PRELOAD):
+        self.factory = factory
+        self.warmup = warmup
+        self.preload = preload
+        self.error: Optional[str] = None
+        self._instance = None
+        self._warmed = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    @property
+    def ready(self) -> bool:
+        """
+        推論を受け付けられる状態か（ウォームアップを行う場合はその完了後）
+
+        起動時に読み込まない場合（MODEL_PRELOAD=0）は最初のリクエストで読み込むため、
+        読み込みに失敗していなければ受け付けられる状態とする
+        """
+        if not self.preload:
+            return self.error is None
+        return self.loaded and (self._warmed or not self.warmup)
+
+    def get(self):
+        """
+        インスタンスを返す（未作成の場合はここで作成する）
+        """
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    try:
+                        with stage("model_load"):
+                            self._instance = self.factory()
+                    except Exception as e:
+                        self.error = str(e)
+                        raise
+                    self.error = None
+        return self._instance
+
+    def load(self) -> None:
+        """
+        モデルを読み込み、ダミーのバッチで1回推論する（キャッシュには登録しない）
+        """
+        instance = self.get()
+        if self.warmup and not self._warmed:
+            # ワーカープールは各ワーカーが準備完了を返す前にウォームアップを済ませている
+            if not isinstance(instance, InferencePool):
+                with stage("model_warmup"):
+                    instance._predict(WARMUP_TEXTS)
+            self._warmed = True
+
+    async def load_in_background(self) -> None:
+        """
+        イベントループを止めずにモデルを読み込む
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self.load)
+        except Exception as e:
+            self.error = str(e)
+            logger.exception("モデルの読み込みに失敗しました")
+
+    def status(self) -> dict:
+        if self.error:
+            state = "failed"
+        elif not self.loaded:
+            state = "loading" if self.preload else "lazy"
+        elif self.ready:
+            state = "ready"
+        else:
+            state = "warming_up"
+        return {'model': state, 'error': self.error}
+
+
+def create_analyzer():
+    """
+    設定に応じてプロセス内のモデルまたは推論ワーカープールを作成する
+    """
+    if INFERENCE_WORKERS > 0:
+        pool = InferencePool(INFERENCE_WORKERS, batch_size=BATCH_SIZE)
+        pool.start()
+        return pool
+    return SentimentAnalyzer()
+
+
+# シングルトンインスタンス（INFERENCE_WORKERSが1以上の場合はワーカープロセスで推論する）
+analyzer_loader = AnalyzerLoader(create_analyzer)
+
+
+def get_analyzer():
+    """
+    感情分析器を返す（未読み込みの場合は読み込みを待つ）
+    """
+    return analyzer_loader.get()
+
+
+def _analyze_batch(texts: List[str]) -> List[dict]:
+    return get_analyzer().analyze_batch(texts)
+
+
+scheduler = BatchScheduler(_analyze_batch, concurrency=max(1, INFERENCE_WORKERS))
+Gauge("socialear_scheduler_queue_depth", "推論待ちのテキスト数", lambda: scheduler.queue_depth)
+
+
+def close_analyzer() -> None:
+    """
+    推論ワーカープロセスを停止する
+    """
+    if analyzer_loader.loaded and isinstance(get_analyzer(), InferencePool):
+        get_analyzer().close()
 
 async def analyze_text(text: str) -> dict:
     """
@@ -70,24 +598,26 @@ async def analyze_text(text: str) -> dict:
     if not text:
         raise ValueError("分析するテキストが空です")
     
-    # テキストを8KB以下に制限
-    if len(text.encode('utf-8')) > 8000:
-        text = text[:4000]  # テキストを切り詰める
-    
+    # 長さの制限はトークナイザーの切り詰め（最大512トークン）で1回だけ行う
     try:
-        # 非同期で感情分析を実行
-        loop = asyncio.get_event_loop()
-        result = await loop.run_in_executor(
-            None,
-            analyzer.analyze_text,
-            text
-        )
-        
-        return result
+        # 他のリクエストとまとめて感情分析を実行
+        return await scheduler.submit(text)
         
     except Exception as e:
-        print(f"感情分析エラー: {str(e)}")
-        print("エラーの詳細:")
-        import traceback
-        print(traceback.format_exc())
-        raise Exception(f"感情分析中にエラーが発生しました: {str(e)}") 
\ No newline at end of file
+        logger.exception("感情分析エラー")
+        raise Exception(f"感情分析中にエラーが発生しました: {str(e)}")
+
+async def analyze_texts(texts: List[str]) -> List[dict]:
+    """
+    複数テキストの感情分析をまとめて行う
+    """
+    if not texts:
+        return []
+
+    try:
+        # 他のリクエストとまとめてバッチ感情分析を実行
+        return await scheduler.submit_many(texts)
+
+    except Exception as e:
+        logger.exception("感情分析エラー")
+        raise Exception(f"感情分析中にエラーが発生しました: {str(e)}")
@@ -0,0 +1,173 @@
+import os
+import copy
+import hashlib
+from typing import Dict, List, Optional
+import numpy as np
+import torch
+from .logs import fields, get_logger
+
+# 推論バックエンド（torch / torch-int8 / onnx）
+SENTIMENT_BACKEND = os.getenv("SENTIMENT_BACKEND", "torch")
+# 演算スレッド数（0の場合はライブラリの既定値）
+INTRA_OP_THREADS = int(os.getenv("INTRA_OP_THREADS", "0"))
+INTER_OP_THREADS = int(os.getenv("INTER_OP_THREADS", "0"))
+# ONNXモデルの出力先
+ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", ".onnx")
+# fp32モデルとのラベル一致率の確認と、採用に必要な最低一致率
+BACKEND_VERIFY = os.getenv("BACKEND_VERIFY", "1") == "1"
+BACKEND_MIN_AGREEMENT = float(os.getenv("BACKEND_MIN_AGREEMENT", "0.95"))
+
+logger = get_logger("backends")
+
+# ラベル一致率の確認に使う文
+CALIBRATION_TEXTS = [
+    "The company reported record profits and shares soared.",
+    "The product launch was a complete disaster and customers are furious.",
+    "The meeting is scheduled for Tuesday afternoon.",
+    "Investors welcomed the merger, although some analysts remain cautious.",
+    "Thousands lost their jobs after the factory closed.",
+    "The new phone is fine, nothing special.",
+    "Critics praised the film as a masterpiece.",
+    "The airline cancelled hundreds of flights due to the strike.",
+    "新製品は好評で、売り上げが大きく伸びた。",
+    "サービスの対応が悪く、非常に残念だった。",
+    "会議は来週の月曜日に開催される予定です。",
+    "Die Ergebnisse waren besser als erwartet.",
+]
+
+
+def configure_threads(intra_op: int = INTRA_OP_THREADS, inter_op: int = INTER_OP_THREADS) -> None:
+    """
+    PyTorchの演算スレッド数を設定する
+    """
+    if intra_op > 0:
+        torch.set_num_threads(intra_op)
+    if inter_op > 0:
+        try:
+            torch.set_num_interop_threads(inter_op)
+        except RuntimeError:
+            # 並列処理の開始後は変更できない
+            logger.warning("inter-opスレッド数は既に確定しているため変更できません")
+
+
+class TorchBackend:
+    """
+    PyTorch（fp32・eagerモード）での推論
+    """
+    name = "torch"
+
+    def __init__(self, model: torch.nn.Module):
+        self.model = model
+        self.model.eval()
+
+    def predict_logits(self, encoded: Dict[str, torch.Tensor]) -> np.ndarray:
+        with torch.inference_mode():
+            return self.model(**encoded).logits.float().numpy()
+
+
+class QuantizedTorchBackend(TorchBackend):
+    """
+    Linear層を動的int8量子化したPyTorchモデルでの推論
+    """
+    name = "torch-int8"
+
+    def __init__(self, model: torch.nn.Module):
+        quantized = torch.quantization.quantize_dynamic(
+            copy.deepcopy(model).eval(),
+            {torch.nn.Linear},
+            dtype=torch.qint8
+        )
+        super().__init__(quantized)
+
+
+class OnnxBackend:
+    """
+    ONNX Runtimeでの推論（初回にモデルをONNX形式で書き出す）
+    """
+    name = "onnx"
+
+    def __init__(
+        self,
+        model: torch.nn.Module,
+        model_id: str,
+        cache_dir: str = ONNX_CACHE_DIR,
+        intra_op: int = INTRA_OP_THREADS,
+        inter_op: int = INTER_OP_THREADS
+    ):
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImportError("onnxバックエンドを使うにはonnxruntimeをインストールしてください")
+
+        path = os.path.join(
+            cache_dir,
+            hashlib.sha256(model_id.encode("utf-8")).hexdigest()[:16] + ".onnx"
+        )
+        if not os.path.exists(path):
+            os.makedirs(cache_dir, exist_ok=True)
+            self.export(model, path)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op > 0:
+            options.intra_op_num_threads = intra_op
+        if inter_op > 0:
+            options.inter_op_num_threads = inter_op
+        self.session = onnxruntime.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [node.name for node in self.session.get_inputs()]
+        self.path = path
+
+    @staticmethod
+    def export(model: torch.nn.Module, path: str) -> None:
+        """
+        バッチサイズと系列長を可変にしてONNX形式で書き出す
+        """
+        logger.info("ONNXモデルを書き出します", extra=fields(path=path))
+        names = ["input_ids", "attention_mask", "token_type_ids"]
+        dummy = tuple(torch.ones((1, 8), dtype=torch.long) for _ in names)
+        axes = {name: {0: "batch", 1: "sequence"} for name in names}
+        axes["logits"] = {0: "batch"}
+        tmp_path = path + ".tmp"
+        torch.onnx.export(
+            model.eval(),
+            dummy,
+            tmp_path,
+            input_names=names,
+            output_names=["logits"],
+            dynamic_axes=axes,
+            opset_version=14
+        )
+        os.replace(tmp_path, path)
+
+    def predict_logits(self, encoded: Dict[str, torch.Tensor]) -> np.ndarray:
+        inputs = {}
+        for name in self.input_names:
+            if name in encoded:
+                inputs[name] = np.ascontiguousarray(encoded[name].numpy())
+            else:
+                inputs[name] = np.zeros_like(encoded["input_ids"].numpy())
+        return self.session.run(["logits"], inputs)[0]
+
+
+def create_backend(name: str, model: torch.nn.Module, model_id: str):
+    """
+    設定名から推論バックエンドを作成する
+    """
+    if name == "torch":
+        return TorchBackend(model)
+    if name == "torch-int8":
+        return QuantizedTorchBackend(model)
+    if name == "onnx":
+        return OnnxBackend(model, model_id)
+    raise ValueError(f"不明な推論バックエンドです: {name}")
+
+
+def label_agreement(baseline, candidate, tokenizer, texts: Optional[List[str]] = None) -> float:
+    """
+    fp32モデルと候補バックエンドの予測ラベルの一致率を返す
+    """
+    texts = texts or CALIBRATION_TEXTS
+    encoded = tokenizer(texts, padding=True, truncation=True, max_length=512, return_tensors="pt")
+    expected = baseline.predict_logits(encoded).argmax(axis=-1)
+    actual = candidate.predict_logits(encoded).argmax(axis=-1)
+    return float((expected == actual).mean())
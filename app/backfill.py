@@ -0,0 +1,328 @@
+import os
+import sys
+import json
+import mmap
+import queue
+import time
+import argparse
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from .language import group_by_language
+from .logs import fields, get_logger, redirect_to_stderr
+from .metrics import ERRORS
+from .text import article_text
+
+# 1回のトークン化・推論にまとめる記事数
+BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", "256"))
+# トークン化済みで推論を待つバッチ数の上限（メモリ使用量はこの数で頭打ちになる）
+BACKFILL_PREFETCH = int(os.getenv("BACKFILL_PREFETCH", "4"))
+# チェックポイントを保存する間隔（バッチ数）
+BACKFILL_CHECKPOINT_EVERY = int(os.getenv("BACKFILL_CHECKPOINT_EVERY", "10"))
+# 分析するフィールド（空の場合はAPIと同じくタイトルと説明文を分析する）
+BACKFILL_TEXT_FIELD = os.getenv("BACKFILL_TEXT_FIELD", "")
+# 読み終えたページをページキャッシュのマッピングから外す間隔（バイト）
+RELEASE_BYTES = 64 * 1024 * 1024
+
+logger = get_logger("backfill")
+
+
+def iter_lines(path: str, offset: int = 0) -> Iterator[Tuple[int, int, bytes]]:
+    """
+    ファイルをmmapで先頭から順に読み、(行の開始位置, 次の行の開始位置, 行)を返す
+
+    ファイル全体を読み込まず、読み終えた範囲のページは定期的にマッピングから外す
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if offset >= size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, "madvise"):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            position = offset
+            released = offset - offset % mmap.PAGESIZE
+            while position < size:
+                end = mm.find(b"\n", position)
+                end = size if end < 0 else end
+                line = mm[position:end]
+                start, position = position, min(end + 1, size)
+                yield start, position, line
+                if hasattr(mm, "madvise") and position - released >= RELEASE_BYTES:
+                    boundary = position - position % mmap.PAGESIZE
+                    mm.madvise(mmap.MADV_DONTNEED, released, boundary - released)
+                    released = boundary
+
+
+def load_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path: str, state: Dict[str, Any]) -> None:
+    """
+    チェックポイントを一時ファイルに書いてから置き換える（書き込み中に落ちても前の内容が残る）
+    """
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def text_getter(field: str = BACKFILL_TEXT_FIELD) -> Callable[[Dict[str, Any]], str]:
+    """
+    記事から分析するテキストを取り出す関数を返す
+    """
+    if field:
+        return lambda record: str(record.get(field) or "")
+    return article_text
+
+
+def result_row(offset: int, record: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    1記事分の結果を出力用の1行にする（offsetは入力ファイル内の行の位置）
+    """
+    return {
+        'offset': offset,
+        'id': record.get('id'),
+        'url': record.get('url'),
+        'published_at': record.get('publishedAt'),
+        'sentiment': result['sentiment'],
+        'score': result['score'],
+        'rating': result['rating'],
+        'probs': result['probs'],
+    }
+
+
+class Backfill:
+    """
+    JSONLの記事ダンプをストリーミングで感情分析し、結果をJSONLに追記する
+
+    読み込みとトークン化（言語ごと）はプロデューサースレッドで行い、上限付きのキューを介して
+    呼び出し元のスレッドでモデルを実行する。チェックポイントには入力と出力の位置を残し、
+    中断後に再実行するとチェックポイント以降の記事から再開する
+    """
+
+    def __init__(
+        self,
+        analyzer,
+        input_path: str,
+        output_path: str,
+        checkpoint_path: Optional[str] = None,
+        batch_size: int = BACKFILL_BATCH_SIZE,
+        prefetch: int = BACKFILL_PREFETCH,
+        checkpoint_every: int = BACKFILL_CHECKPOINT_EVERY,
+        text_of: Optional[Callable[[Dict[str, Any]], str]] = None,
+        limit: Optional[int] = None
+    ):
+        self.analyzer = analyzer
+        self.input_path = input_path
+        self.output_path = output_path
+        self.checkpoint_path = checkpoint_path or output_path + ".checkpoint"
+        self.batch_size = max(1, batch_size)
+        self.prefetch = max(1, prefetch)
+        self.checkpoint_every = max(1, checkpoint_every)
+        self.text_of = text_of or text_getter()
+        self.limit = limit
+
+    def _resume(self, restart: bool) -> Dict[str, Any]:
+        """
+        チェックポイントを読み込み、出力をチェックポイント時点の長さに戻す
+        """
+        size = os.path.getsize(self.input_path)
+        state = None if restart else load_checkpoint(self.checkpoint_path)
+        if state is None:
+            with open(self.output_path, "wb"):
+                pass
+            if os.path.exists(self.checkpoint_path):
+                os.remove(self.checkpoint_path)
+            return {
+                'input': os.path.abspath(self.input_path),
+                'offset': 0,
+                'output_bytes': 0,
+                'records': 0,
+                'scored': 0,
+                'errors': 0,
+            }
+        if state['input'] != os.path.abspath(self.input_path) or state['offset'] > size:
+            raise RuntimeError(f"チェックポイントが入力ファイルと一致しません: {self.checkpoint_path}")
+        written = os.path.getsize(self.output_path) if os.path.exists(self.output_path) else -1
+        if written < state['output_bytes']:
+            raise RuntimeError(f"出力ファイルがチェックポイントより短いため再開できません: {self.output_path}")
+        # チェックポイント以降に書かれた行は再開後にもう一度出力される
+        os.truncate(self.output_path, state['output_bytes'])
+        logger.info("チェックポイントから再開します", extra=fields(offset=state['offset'], records=state['records']))
+        return state
+
+    def _produce(self, offset: int, batches: "queue.Queue", stop: threading.Event) -> None:
+        """
+        記事を読み込んでbatch_size件ずつトークン化し、キューに入れる
+        """
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    batches.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def flush(items, texts, end) -> bool:
+            # 言語ごとにその言語のモデルでトークン化する（全件が不正な行のバッチは空になる）
+            groups = []
+            for language, group in group_by_language(texts).items():
+                if not group:
+                    continue
+                model = self.analyzer.for_language(language)
+                groups.append((language, [index for index, _ in group], model.encode([text for _, text in group])))
+            return put(("batch", items, groups, end))
+
+        try:
+            items: List[Tuple[int, Optional[Dict[str, Any]], Optional[str]]] = []
+            texts: List[str] = []
+            count = 0
+            end = offset
+            for start, end, line in iter_lines(self.input_path, offset):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    text = self.text_of(record)
+                    items.append((start, record, None))
+                    texts.append(text)
+                except Exception as e:
+                    items.append((start, None, str(e)))
+                count += 1
+                if len(items) >= self.batch_size:
+                    if not flush(items, texts, end):
+                        return
+                    items, texts = [], []
+                if self.limit is not None and count >= self.limit:
+                    break
+            if items and not flush(items, texts, end):
+                return
+            put(("done", None, None, end))
+        except Exception as e:
+            put(("error", e, None, None))
+
+    def run(self, restart: bool = False) -> Dict[str, Any]:
+        """
+        バックフィルを実行し、今回と累計の件数を返す
+        """
+        state = self._resume(restart)
+        started = time.perf_counter()
+        processed = 0
+        batches: "queue.Queue" = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        producer = threading.Thread(
+            target=self._produce, args=(state['offset'], batches, stop), name="backfill-producer", daemon=True
+        )
+        producer.start()
+        pending = 0
+        try:
+            with open(self.output_path, "ab") as out:
+                def checkpoint(offset: int) -> None:
+                    out.flush()
+                    os.fsync(out.fileno())
+                    state.update(offset=offset, output_bytes=out.tell())
+                    save_checkpoint(self.checkpoint_path, state)
+                    elapsed = time.perf_counter() - started
+                    logger.info("バックフィルの進捗", extra=fields(
+                        offset=offset,
+                        records=state['records'],
+                        errors=state['errors'],
+                        records_per_s=round(processed / elapsed, 1) if elapsed > 0 else None
+                    ))
+
+                while True:
+                    kind, payload, groups, end = batches.get()
+                    if kind == "error":
+                        raise payload
+                    if kind == "done":
+                        if end is not None and (pending or end != state['offset']):
+                            checkpoint(end)
+                        break
+                    items = payload
+                    results = [None] * sum(error is None for _, _, error in items)
+                    for language, indices, encoded in groups:
+                        for index, result in zip(indices, self.analyzer.for_language(language).predict_encoded(encoded)):
+                            results[index] = result
+                    results = iter(results)
+                    lines = []
+                    for start, record, error in items:
+                        if error is None:
+                            row = result_row(start, record, next(results))
+                            state['scored'] += 1
+                        else:
+                            ERRORS.inc(stage="backfill")
+                            row = {'offset': start, 'error': error}
+                            state['errors'] += 1
+                        lines.append(json.dumps(row, ensure_ascii=False))
+                    out.write(("\n".join(lines) + "\n").encode("utf-8"))
+                    state['records'] += len(items)
+                    processed += len(items)
+                    pending += 1
+                    if pending >= self.checkpoint_every:
+                        checkpoint(end)
+                        pending = 0
+        finally:
+            stop.set()
+            producer.join()
+        elapsed = time.perf_counter() - started
+        return {
+            'processed': processed,
+            'records': state['records'],
+            'scored': state['scored'],
+            'errors': state['errors'],
+            'offset': state['offset'],
+            'elapsed_s': round(elapsed, 3),
+        }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.backfill",
+        description="JSONLの記事ダンプを感情分析し、結果をJSONLに書き出す（中断した位置から再開できる）"
+    )
+    parser.add_argument("input", help="記事のJSONLファイル（1行1記事）")
+    parser.add_argument("--output", required=True, help="結果のJSONLファイル")
+    parser.add_argument("--checkpoint", help="チェックポイントのファイル（省略時は<output>.checkpoint）")
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE, help="1回にトークン化・推論する記事数")
+    parser.add_argument("--prefetch", type=int, default=BACKFILL_PREFETCH, help="先にトークン化しておくバッチ数")
+    parser.add_argument("--checkpoint-every", type=int, default=BACKFILL_CHECKPOINT_EVERY, help="チェックポイントを保存するバッチ数の間隔")
+    parser.add_argument("--text-field", default=BACKFILL_TEXT_FIELD, help="分析するフィールド（省略時はタイトルと説明文）")
+    parser.add_argument("--limit", type=int, help="今回処理する最大記事数")
+    parser.add_argument("--restart", action="store_true", help="チェックポイントを無視して最初から処理する")
+    args = parser.parse_args(argv)
+    redirect_to_stderr()
+
+    from .analyzer import SentimentAnalyzer
+    from .cache import SentimentCache
+
+    # ダンプの記事はほとんど重複しないため、結果キャッシュを経由せずに推論する
+    analyzer = SentimentAnalyzer(cache=SentimentCache(db_path=None))
+    backfill = Backfill(
+        analyzer,
+        args.input,
+        args.output,
+        checkpoint_path=args.checkpoint,
+        batch_size=args.batch_size,
+        prefetch=args.prefetch,
+        checkpoint_every=args.checkpoint_every,
+        text_of=text_getter(args.text_field),
+        limit=args.limit
+    )
+    try:
+        summary = backfill.run(restart=args.restart)
+    except RuntimeError as e:
+        parser.exit(2, f"エラー: {e}\n")
+    logger.info("バックフィルが完了しました", extra=fields(**summary))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+import os
+import sys
+import json
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, TextIO
+from .fetcher import RateBudget, news_api_budget
+from .logs import fields, get_logger, redirect_to_stderr
+from .metrics import ERRORS
+
+# 同時に取得・分析するクエリ数（推論は全クエリの記事をまとめたマイクロバッチで行われる）
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+# 1回の一括分析で受け付ける最大クエリ数（API）
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "1000"))
+# 期間を省略したクエリで分析する日数
+BATCH_DEFAULT_DAYS = int(os.getenv("BATCH_DEFAULT_DAYS", "7"))
+
+logger = get_logger("batch")
+
+
+def default_window(days: int = BATCH_DEFAULT_DAYS) -> Dict[str, str]:
+    """
+    今日までのdays日間
+    """
+    today = datetime.now()
+    return {
+        'date_from': (today - timedelta(days=days - 1)).strftime("%Y-%m-%d"),
+        'date_to': today.strftime("%Y-%m-%d"),
+    }
+
+
+def parse_queries(lines: Iterable[str], days: int = BATCH_DEFAULT_DAYS) -> List[Dict[str, str]]:
+    """
+    JSONL（{"query": ..., "date_from": ..., "date_to": ...}）または1行1キーワードのテキストを読み込む
+    """
+    window = default_window(days)
+    items = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        item = json.loads(line) if line.startswith("{") else {'query': line}
+        items.append({
+            'query': item['query'],
+            'date_from': item.get('date_from') or window['date_from'],
+            'date_to': item.get('date_to') or window['date_to'],
+        })
+    return items
+
+
+def result_row(index: int, item: Dict[str, str], result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> Dict[str, Any]:
+    """
+    1クエリ分の結果を出力用の1行にする
+    """
+    counts = (result or {}).get('sentiment') or {}
+    stats = (result or {}).get('stats') or {}
+    return {
+        'index': index,
+        'query': item['query'],
+        'date_from': (result or item).get('date_from'),
+        'date_to': (result or item).get('date_to'),
+        'status': "error" if error else "ok",
+        'error': error,
+        'article_count': (result or {}).get('article_count', 0),
+        'positive': counts.get('positive', 0),
+        'negative': counts.get('negative', 0),
+        'neutral': counts.get('neutral', 0),
+        'mean_rating': stats.get('mean_rating'),
+        'stats': stats or None,
+    }
+
+
+async def run_batch(
+    items: List[Dict[str, str]],
+    analyze: Callable[[str, str, str], Awaitable[Any]],
+    concurrency: int = BATCH_CONCURRENCY,
+    budget: Optional[RateBudget] = news_api_budget
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    クエリを最大concurrency件ずつ並行して分析し、完了した順に結果の行を返す
+
+    各クエリの取得はNews APIの利用枠が空くのを待ってから始める。推論は全クエリの記事が
+    同じマイクロバッチスケジューラに集まるため、クエリをまたいでまとめて実行される
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(index: int, item: Dict[str, str]) -> Dict[str, Any]:
+        async with semaphore:
+            if budget is not None:
+                await budget.wait()
+            try:
+                result = await analyze(item['query'], item['date_from'], item['date_to'])
+            except Exception as e:
+                ERRORS.inc(stage="batch")
+                error = str(getattr(e, 'detail', None) or e)
+                logger.warning("一括分析のクエリでエラーが発生しました", extra=fields(query=item['query'], error=error))
+                return result_row(index, item, error=error)
+            if hasattr(result, 'model_dump'):
+                result = result.model_dump()
+            return result_row(index, item, result)
+
+    tasks = [asyncio.ensure_future(one(i, item)) for i, item in enumerate(items)]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def write_jsonl(rows: Iterable[Dict[str, Any]], stream: TextIO) -> int:
+    count = 0
+    for row in rows:
+        stream.write(json.dumps(row, ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("Parquetで出力するにはpyarrowをインストールしてください（pip install pyarrow）")
+    return pyarrow
+
+
+def write_parquet(rows: List[Dict[str, Any]], path: str) -> None:
+    """
+    Parquet形式で書き出す（pyarrowが必要。statsはJSON文字列の列にする）
+    """
+    pa = _require_pyarrow()
+    table = pa.Table.from_pylist([
+        {**row, 'stats': json.dumps(row['stats'], ensure_ascii=False) if row['stats'] is not None else None}
+        for row in rows
+    ])
+    pa.parquet.write_table(table, path)
+
+
+async def run_cli(args: argparse.Namespace) -> int:
+    from . import job_controller
+    from .analyzer import close_analyzer
+
+    if args.input:
+        with open(args.input, encoding="utf-8") as f:
+            items = parse_queries(f, args.days)
+    else:
+        items = parse_queries(args.queries, args.days)
+    if args.date_from or args.date_to:
+        for item in items:
+            item['date_from'] = args.date_from or item['date_from']
+            item['date_to'] = args.date_to or item['date_to']
+    if not items:
+        print("分析するクエリがありません", file=sys.stderr)
+        return 2
+
+    async def analyze(query: str, date_from: str, date_to: str):
+        return await job_controller.analyze_query(query, date_from, date_to, args.paginate)
+
+    output_format = args.format or ("parquet" if (args.output or "").endswith(".parquet") else "jsonl")
+    if output_format == "parquet":
+        # 分析の前に確認する
+        _require_pyarrow()
+    rows = []
+    errors = 0
+    out = open(args.output, "w", encoding="utf-8") if args.output and output_format == "jsonl" else sys.stdout
+    try:
+        async for row in run_batch(items, analyze, concurrency=args.concurrency):
+            errors += row['status'] == "error"
+            if output_format == "jsonl":
+                write_jsonl([row], out)
+                out.flush()
+            else:
+                rows.append(row)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        await job_controller.flush_pending_saves()
+        await job_controller.close_news_fetcher()
+        close_analyzer()
+    if output_format == "parquet":
+        write_parquet(sorted(rows, key=lambda row: row['index']), args.output)
+    logger.info("一括分析が完了しました", extra=fields(queries=len(items), errors=errors))
+    return 1 if errors == len(items) else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.batch",
+        description="複数のキーワードをまとめて感情分析し、JSONLまたはParquetで出力する"
+    )
+    parser.add_argument("queries", nargs="*", help="分析するキーワード")
+    parser.add_argument("--input", help="クエリのファイル（JSONL、または1行1キーワード）")
+    parser.add_argument("--date-from", help="開始日（YYYY-MM-DD、ファイルの指定より優先）")
+    parser.add_argument("--date-to", help="終了日（YYYY-MM-DD、ファイルの指定より優先）")
+    parser.add_argument("--days", type=int, default=BATCH_DEFAULT_DAYS, help="期間を省略したクエリで分析する日数")
+    parser.add_argument("--paginate", action="store_true", help="期間を日単位に分割して全ページを取得する")
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY, help="同時に分析するクエリ数")
+    parser.add_argument("--output", help="出力先（省略時は標準出力にJSONL）")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], help="出力形式（省略時は拡張子から判断）")
+    args = parser.parse_args(argv)
+    # 標準出力は結果の出力に使う
+    redirect_to_stderr()
+    if args.format == "parquet" and not args.output:
+        parser.error("Parquetで出力する場合は--outputを指定してください")
+    try:
+        return asyncio.run(run_cli(args))
+    except RuntimeError as e:
+        parser.exit(2, f"エラー: {e}\n")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
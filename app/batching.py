@@ -0,0 +1,24 @@
+from typing import List
+
+
+def plan_batches(lengths: List[int], token_budget: int, batch_size: int) -> List[List[int]]:
+    """
+    要素を短い順に並べ、batch_size件以内かつパディングを含むトークン数（件数×最長のトークン数）が
+    token_budget以下になるように区切ったバッチ（元の位置のリスト）を返す
+
+    token_budgetを超える1件は単独のバッチにする。token_budgetが0の場合はbatch_size件ずつ区切る
+    """
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    batches: List[List[int]] = []
+    current: List[int] = []
+    for index in order:
+        full = len(current) >= batch_size
+        if token_budget > 0:
+            full = full or (len(current) + 1) * lengths[index] > token_budget
+        if current and full:
+            batches.append(current)
+            current = []
+        current.append(index)
+    if current:
+        batches.append(current)
+    return batches
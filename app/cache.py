@@ -0,0 +1,236 @@
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from .batching import plan_batches
+from .logs import fields, get_logger
+from .metrics import CACHE_LOOKUPS, ERRORS
+
+# メモリ上に保持する最大件数
+SENTIMENT_CACHE_SIZE = int(os.getenv("SENTIMENT_CACHE_SIZE", "10000"))
+# キャッシュの有効期間（秒）。0以下の場合は無期限
+SENTIMENT_CACHE_TTL = float(os.getenv("SENTIMENT_CACHE_TTL", "86400"))
+# ディスクキャッシュ（SQLite）のパス。未設定の場合はメモリのみ
+SENTIMENT_CACHE_DB = os.getenv("SENTIMENT_CACHE_DB")
+
+_WHITESPACE = re.compile(r"\s+")
+
+logger = get_logger("cache")
+
+
+def normalize_text(text: str) -> str:
+    """
+    キャッシュキー用にテキストを正規化する（NFKC・小文字化・空白の圧縮）
+    """
+    text = unicodedata.normalize("NFKC", text or "")
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+
+def make_cache_key(text: str, model_name: str, revision: str = "main") -> str:
+    """
+    正規化テキストとモデル名・リビジョンからキャッシュキーを生成する
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{model_name}@{revision}\n".encode("utf-8"))
+    digest.update(normalize_text(text).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class SentimentCache:
+    """
+    感情分析結果のキャッシュ（LRUのメモリ層と任意のSQLiteディスク層）
+    """
+
+    def __init__(
+        self,
+        max_entries: int = SENTIMENT_CACHE_SIZE,
+        ttl: float = SENTIMENT_CACHE_TTL,
+        db_path: Optional[str] = SENTIMENT_CACHE_DB
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS sentiment_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS sentiment_cache_expires_at ON sentiment_cache (expires_at)"
+            )
+            self._db.commit()
+        # 統計情報
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _expires_at(self) -> Optional[float]:
+        return time.time() + self.ttl if self.ttl > 0 else None
+
+    @staticmethod
+    def _expired(expires_at: Optional[float]) -> bool:
+        return expires_at is not None and expires_at <= time.time()
+
+    def _remember(self, key: str, value: dict, expires_at: Optional[float]) -> None:
+        """
+        メモリ層に登録し、上限を超えた分を古い順に削除する（ロック取得済みで呼ぶ）
+        """
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: str) -> Optional[dict]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, dict]:
+        """
+        複数キーをまとめて検索する（メモリ層→ディスク層の順）
+        """
+        found = {}
+        missing = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and not self._expired(entry[1]):
+                    self._entries.move_to_end(key)
+                    found[key] = entry[0]
+                    self.memory_hits += 1
+                else:
+                    if entry is not None:
+                        del self._entries[key]
+                    missing.append(key)
+
+            if missing and self._db is not None:
+                placeholders = ",".join("?" * len(missing))
+                rows = self._db.execute(
+                    f"SELECT key, value, expires_at FROM sentiment_cache WHERE key IN ({placeholders})",
+                    missing
+                ).fetchall()
+                expired = []
+                for key, value, expires_at in rows:
+                    if self._expired(expires_at):
+                        expired.append((key,))
+                        continue
+                    value = json.loads(value)
+                    found[key] = value
+                    self._remember(key, value, expires_at)
+                    self.disk_hits += 1
+                # 期限切れの行は読み込んだときに削除する
+                if expired:
+                    self._db.executemany("DELETE FROM sentiment_cache WHERE key = ?", expired)
+                    self._db.commit()
+
+            self.misses += sum(1 for key in missing if key not in found)
+        return found
+
+    def set(self, key: str, value: dict) -> None:
+        self.set_many([(key, value)])
+
+    def set_many(self, items: List[Tuple[str, dict]]) -> None:
+        """
+        複数の結果をまとめて登録する（ディスク層の期限切れの行もここで削除する）
+        """
+        if not items:
+            return
+        expires_at = self._expires_at()
+        with self._lock:
+            for key, value in items:
+                self._remember(key, value, expires_at)
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO sentiment_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    [(key, json.dumps(value), expires_at) for key, value in items]
+                )
+                self._db.execute("DELETE FROM sentiment_cache WHERE expires_at <= ?", (time.time(),))
+                self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM sentiment_cache")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        """
+        ヒット・ミスの統計を返す
+        """
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_entries': self.max_entries,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            'disk_enabled': self._db is not None,
+        }
+
+
+def cached_batch(
+    cache: SentimentCache,
+    texts: List[str],
+    keys: List[str],
+    predict: Callable[[List[str]], List[dict]],
+    batch_size: int,
+    lengths: Optional[List[int]] = None,
+    token_budget: int = 0
+) -> List[dict]:
+    """
+    キャッシュに無いテキストだけを重複なしで推論し、結果をキャッシュする
+
+    lengths（推定トークン数）を渡した場合は長さの近いテキストをbatch_size件以内かつ
+    token_budget以内にまとめて推論し、渡さない場合は入力順にbatch_size件ずつ推論する。
+    推論に失敗したバッチは'ERROR'として返し、キャッシュしない
+    """
+    cached = cache.get_many(keys)
+
+    results: List[Optional[dict]] = [None] * len(texts)
+    pending: Dict[str, List[int]] = {}
+    for i, (text, key) in enumerate(zip(texts, keys)):
+        if key in cached:
+            results[i] = {**cached[key], 'text': text}
+        else:
+            pending.setdefault(key, []).append(i)
+    hits = len(texts) - sum(len(indexes) for indexes in pending.values())
+    CACHE_LOOKUPS.inc(hits, result="hit")
+    CACHE_LOOKUPS.inc(len(texts) - hits, result="miss")
+
+    todo = [(key, texts[indexes[0]]) for key, indexes in pending.items()]
+    if lengths is None:
+        chunks = [todo[start:start + batch_size] for start in range(0, len(todo), batch_size)]
+    else:
+        estimates = [lengths[indexes[0]] for indexes in pending.values()]
+        chunks = [[todo[i] for i in batch] for batch in plan_batches(estimates, token_budget, batch_size)]
+    for chunk in chunks:
+        try:
+            predictions = predict([text for _, text in chunk])
+        except Exception as e:
+            ERRORS.inc(stage="inference")
+            logger.exception("感情分析エラー", extra=fields(batch_size=len(chunk)))
+            predictions = [
+                {'sentiment': 'ERROR', 'score': 0.0, 'text': text}
+                for _, text in chunk
+            ]
+        else:
+            cache.set_many([
+                (key, {k: v for k, v in prediction.items() if k != 'text'})
+                for (key, _), prediction in zip(chunk, predictions)
+            ])
+        for (key, _), prediction in zip(chunk, predictions):
+            for i in pending[key]:
+                results[i] = {**prediction, 'text': texts[i]}
+    return results
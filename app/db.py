@@ -1,79 +1,610 @@
 import os
-import boto3
-from typing import Optional, List
-from datetime import datetime
+import re
+import json
+import time
+import hashlib
+import asyncio
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional, List, Tuple
+from datetime import datetime, timedelta
 from .model import AnalysisResult
+from .dedupe import DEDUPE_ENABLED, DEDUPE_WEIGHTING
+from .fetcher import NEWS_API_LANGUAGES, parse_languages
+from .logs import fields, get_logger
 
 # 環境変数の読み込みを確認
 AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 AWS_REGION = os.getenv("AWS_REGION", "ap-northeast-1")
 DYNAMODB_TABLE = os.getenv("DYNAMODB_TABLE", "socialear-results")
+# DynamoDB Localなどを使う場合のエンドポイント
+DYNAMODB_ENDPOINT_URL = os.getenv("DYNAMODB_ENDPOINT_URL")
+# 保存先（dynamodb / sqlite / memory / none）。未設定の場合はAWS認証情報があればdynamodb、なければsqlite
+RESULT_STORE = os.getenv("RESULT_STORE")
+# ローカル保存用のSQLiteファイル
+RESULT_DB_PATH = os.getenv("RESULT_DB_PATH", "socialear.db")
+# 保存先へのアクセスに使うスレッド数（boto3の接続プールの上限も兼ねる）
+DB_WORKERS = int(os.getenv("DB_WORKERS", "4"))
+# 書き込みをまとめる最大件数と最大待ち時間（ミリ秒）
+DB_FLUSH_SIZE = int(os.getenv("DB_FLUSH_SIZE", "25"))
+DB_FLUSH_INTERVAL_MS = float(os.getenv("DB_FLUSH_INTERVAL_MS", "200"))
+# 記事ごとの結果と日別集計を再利用する期間（秒）。0以下の場合は無期限
+RECORD_TTL = float(os.getenv("RECORD_TTL", "604800"))
 
-# デバッグ情報の出力
-print("AWS認証情報の確認:")
-print(f"AWS_ACCESS_KEY_ID: {'設定されています' if AWS_ACCESS_KEY_ID else '未設定'}")
-print(f"AWS_SECRET_ACCESS_KEY: {'設定されています' if AWS_SECRET_ACCESS_KEY else '未設定'}")
-print(f"AWS_REGION: {AWS_REGION}")
-print(f"DYNAMODB_TABLE: {DYNAMODB_TABLE}")
-
-if not AWS_ACCESS_KEY_ID or not AWS_SECRET_ACCESS_KEY:
-    raise ValueError("AWS認証情報が設定されていません。.envファイルを確認してください。")
-
-dynamodb = boto3.resource('dynamodb',
-    aws_access_key_id=AWS_ACCESS_KEY_ID,
-    aws_secret_access_key=AWS_SECRET_ACCESS_KEY,
-    region_name=AWS_REGION
-)
-table = dynamodb.Table(DYNAMODB_TABLE)
-
-async def save_result(result: AnalysisResult) -> None:
-    """
-    分析結果をDynamoDBに保存する
-    """
-    item = {
-        'query': result.query,
-        'date_from': result.date_from,
-        'date_to': result.date_to,
-        'sentiment': {
-            'positive': result.sentiment.positive,
-            'negative': result.sentiment.negative,
-            'neutral': result.sentiment.neutral,
-            'mixed': result.sentiment.mixed
-        },
-        'total_articles': result.total_articles,
-        'created_at': datetime.now().isoformat()
-    }
-    
-    table.put_item(Item=item)
+logger = get_logger("db")
+
+# (query, window)の組
+ResultKey = Tuple[str, str]
+
+# 内部のアイテム（記事ごとの結果・日別集計・ウォッチリスト）のqueryの先頭に付ける文字。
+# 制御文字を含む検索キーワードは受け付けないため、ユーザーのクエリと同じキーにならない
+INTERNAL_PREFIX = "\x1f"
+# 分析結果のwindow（"YYYY-MM-DD#YYYY-MM-DD#..."）
+_RESULT_WINDOW = re.compile(r"^\d{4}-\d{2}-\d{2}#\d{4}-\d{2}-\d{2}#")
+
+
+def is_result_window(window: str) -> bool:
+    return bool(_RESULT_WINDOW.match(window))
 
-def get_result(query: str, date_from: Optional[str] = None, date_to: Optional[str] = None) -> Optional[AnalysisResult]:
+
+def fetch_variant(languages: str = NEWS_API_LANGUAGES, weighting: Optional[str] = None) -> str:
     """
-    DynamoDBから分析結果を取得する
+    集計結果を変える取得・集計の設定（取得する言語と重複記事の重み付け）を表す文字列を返す
     """
-    # 完全一致検索
-    if date_from and date_to:
-        response = table.get_item(
-            Key={
-                'query': query,
-                'date_from': date_from,
-                'date_to': date_to
-            }
+    if weighting is None:
+        weighting = DEDUPE_WEIGHTING if DEDUPE_ENABLED else "none"
+    return ",".join(sorted(language or "all" for language in parse_languages(languages))) + "#" + weighting
+
+
+# 保存済みの分析結果・日別集計は同じ取得・集計の設定のものだけを使う
+FETCH_VARIANT = fetch_variant()
+
+
+def make_window(date_from: str, date_to: str, paginate: bool = False, revision: str = "") -> str:
+    """
+    期間と取得モード、取得・集計の設定、分析条件（scoring_revision）から保存用のソートキーを作成する
+    """
+    return f"{date_from}#{date_to}#{'all' if paginate else 'page'}#{FETCH_VARIANT}#{revision}"
+
+
+def result_to_item(result: AnalysisResult, paginate: bool = False, revision: str = "") -> Dict[str, Any]:
+    """
+    分析結果を保存用のアイテムに変換する
+    """
+    item = result.model_dump()
+    item['window'] = make_window(result.date_from, result.date_to, paginate, revision)
+    item['created_at'] = result.created_at or datetime.now().isoformat()
+    return item
+
+
+def item_to_result(item: Dict[str, Any]) -> AnalysisResult:
+    """
+    保存されたアイテムを分析結果に変換する
+    """
+    item = {key: value for key, value in item.items() if key != 'window'}
+    return AnalysisResult.model_validate(item)
+
+
+class SQLiteResultStore:
+    """
+    AWSなしで動かすためのローカル保存先
+    """
+
+    def __init__(self, path: str = RESULT_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "query TEXT NOT NULL, window TEXT NOT NULL, item TEXT NOT NULL, created_at TEXT NOT NULL, "
+            "PRIMARY KEY (query, window))"
         )
-        item = response.get('Item')
-        if item:
-            return AnalysisResult.parse_obj(item)
-    
-    # クエリのみの検索（最新の結果を返す）
-    else:
-        response = table.query(
-            KeyConditionExpression='query = :q',
-            ExpressionAttributeValues={':q': query},
+        self._conn.commit()
+
+    def put(self, item: Dict[str, Any]) -> None:
+        self.put_many([item])
+
+    def put_many(self, items: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO results (query, window, item, created_at) VALUES (?, ?, ?, ?)",
+                [
+                    (item['query'], item['window'], json.dumps(item, ensure_ascii=False), item['created_at'])
+                    for item in items
+                ]
+            )
+            self._conn.commit()
+
+    def get(self, query: str, window: str) -> Optional[Dict[str, Any]]:
+        return self.get_many([(query, window)]).get((query, window))
+
+    def get_many(self, keys: List[ResultKey]) -> Dict[ResultKey, Dict[str, Any]]:
+        found = {}
+        with self._lock:
+            for query, window in keys:
+                row = self._conn.execute(
+                    "SELECT item FROM results WHERE query = ? AND window = ?", (query, window)
+                ).fetchone()
+                if row:
+                    found[(query, window)] = json.loads(row[0])
+        return found
+
+    def latest(self, query: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT item FROM results WHERE query = ? AND window GLOB ? ORDER BY created_at DESC LIMIT 1",
+                (query, "[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]#*")
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+class MemoryResultStore:
+    """
+    テストやAWSなしの動作確認用のメモリ上の保存先
+    """
+
+    def __init__(self):
+        self._items: Dict[ResultKey, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        # 呼び出し回数（バッチ化の確認用）
+        self.calls = {'put_many': 0, 'get_many': 0}
+
+    def put(self, item: Dict[str, Any]) -> None:
+        self.put_many([item])
+
+    def put_many(self, items: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            self.calls['put_many'] += 1
+            for item in items:
+                self._items[(item['query'], item['window'])] = json.loads(json.dumps(item))
+
+    def get(self, query: str, window: str) -> Optional[Dict[str, Any]]:
+        return self.get_many([(query, window)]).get((query, window))
+
+    def get_many(self, keys: List[ResultKey]) -> Dict[ResultKey, Dict[str, Any]]:
+        with self._lock:
+            self.calls['get_many'] += 1
+            return {key: self._items[key] for key in keys if key in self._items}
+
+    def latest(self, query: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            items = [
+                item for (q, window), item in self._items.items() if q == query and is_result_window(window)
+            ]
+        return max(items, key=lambda item: item['created_at']) if items else None
+
+
+class DynamoDBResultStore:
+    """
+    DynamoDBの保存先（パーティションキー: query、ソートキー: window）
+
+    boto3のリソースはスレッドセーフではないため、スレッドごとに作成する
+    """
+
+    def __init__(
+        self,
+        table_name: str = DYNAMODB_TABLE,
+        endpoint_url: Optional[str] = DYNAMODB_ENDPOINT_URL,
+        max_pool_connections: int = DB_WORKERS
+    ):
+        logger.info(
+            "DynamoDBの設定",
+            extra=fields(
+                credentials_configured=bool(AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY),
+                region=AWS_REGION,
+                table=table_name,
+                endpoint_url=endpoint_url
+            )
+        )
+
+        if not endpoint_url and (not AWS_ACCESS_KEY_ID or not AWS_SECRET_ACCESS_KEY):
+            raise ValueError("AWS認証情報が設定されていません。.envファイルを確認してください。")
+
+        self.table_name = table_name
+        self.endpoint_url = endpoint_url
+        self.max_pool_connections = max_pool_connections
+        self._local = threading.local()
+
+    @property
+    def dynamodb(self):
+        """
+        現在のスレッド用のリソースを初回利用時に作成する
+        """
+        resource = getattr(self._local, 'resource', None)
+        if resource is None:
+            import boto3
+            from botocore.config import Config
+
+            session = boto3.session.Session(
+                aws_access_key_id=AWS_ACCESS_KEY_ID or "local",
+                aws_secret_access_key=AWS_SECRET_ACCESS_KEY or "local",
+                region_name=AWS_REGION
+            )
+            resource = session.resource(
+                'dynamodb',
+                endpoint_url=self.endpoint_url,
+                config=Config(
+                    max_pool_connections=self.max_pool_connections,
+                    retries={'max_attempts': 5, 'mode': 'adaptive'}
+                )
+            )
+            self._local.resource = resource
+        return resource
+
+    @property
+    def table(self):
+        return self.dynamodb.Table(self.table_name)
+
+    def create_table(self) -> None:
+        """
+        テーブルを作成する（DynamoDB Localでの利用向け）
+        """
+        self.dynamodb.create_table(
+            TableName=self.table_name,
+            KeySchema=[
+                {'AttributeName': 'query', 'KeyType': 'HASH'},
+                {'AttributeName': 'window', 'KeyType': 'RANGE'}
+            ],
+            AttributeDefinitions=[
+                {'AttributeName': 'query', 'AttributeType': 'S'},
+                {'AttributeName': 'window', 'AttributeType': 'S'}
+            ],
+            BillingMode='PAY_PER_REQUEST'
+        )
+
+    @staticmethod
+    def _encode(item: Dict[str, Any]) -> Dict[str, Any]:
+        # DynamoDBはfloatを受け付けないためDecimalに変換する
+        return json.loads(json.dumps(item), parse_float=Decimal)
+
+    @staticmethod
+    def _decode(item: Dict[str, Any]) -> Dict[str, Any]:
+        return json.loads(json.dumps(item, default=lambda d: int(d) if d == d.to_integral_value() else float(d)))
+
+    def put(self, item: Dict[str, Any]) -> None:
+        self.put_many([item])
+
+    def put_many(self, items: List[Dict[str, Any]]) -> None:
+        """
+        batch_writerで25件ずつまとめて書き込む（同じキーは最後の値で上書き）
+        """
+        with self.table.batch_writer(overwrite_by_pkeys=['query', 'window']) as writer:
+            for item in items:
+                writer.put_item(Item=self._encode(item))
+
+    def get(self, query: str, window: str) -> Optional[Dict[str, Any]]:
+        return self.get_many([(query, window)]).get((query, window))
+
+    def get_many(self, keys: List[ResultKey]) -> Dict[ResultKey, Dict[str, Any]]:
+        """
+        BatchGetItemで100件ずつまとめて読み込む（未処理のキーは再試行する）
+        """
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        for start in range(0, len(unique_keys), 100):
+            request = {
+                self.table_name: {
+                    'Keys': [{'query': query, 'window': window} for query, window in unique_keys[start:start + 100]]
+                }
+            }
+            attempt = 0
+            while request:
+                response = self.dynamodb.batch_get_item(RequestItems=request)
+                for item in response.get('Responses', {}).get(self.table_name, []):
+                    item = self._decode(item)
+                    found[(item['query'], item['window'])] = item
+                request = response.get('UnprocessedKeys') or None
+                if request:
+                    attempt += 1
+                    time.sleep(min(0.05 * (2 ** attempt), 1.0))
+        return found
+
+    def latest(self, query: str) -> Optional[Dict[str, Any]]:
+        # 分析結果のwindow（日付で始まる）だけを対象にする
+        response = self.table.query(
+            KeyConditionExpression='#q = :q AND #w BETWEEN :lo AND :hi',
+            ExpressionAttributeNames={'#q': 'query', '#w': 'window'},
+            ExpressionAttributeValues={':q': query, ':lo': "0000-00-00#", ':hi': "9999-99-99#\uffff"},
             ScanIndexForward=False,  # 降順
             Limit=1
         )
         items = response.get('Items', [])
-        if items:
-            return AnalysisResult.parse_obj(items[0])
-    
-    return None 
\ No newline at end of file
+        return self._decode(items[0]) if items else None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """
+    設定に応じた保存先を初回利用時に作成して返す（保存しない設定の場合はNone）
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            backend = RESULT_STORE or ('dynamodb' if AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY else 'sqlite')
+            if backend == 'dynamodb':
+                _store = DynamoDBResultStore()
+            elif backend == 'sqlite':
+                _store = SQLiteResultStore()
+            elif backend == 'memory':
+                _store = MemoryResultStore()
+            elif backend == 'none':
+                _store = False
+            else:
+                raise ValueError(f"不明な保存先です: {backend}")
+        return _store or None
+
+
+class ResultRepository:
+    """
+    保存先への非同期アクセス層
+
+    同期的な保存先の呼び出しは専用スレッドで実行してイベントループを止めず、
+    書き込みはDB_FLUSH_SIZE件またはDB_FLUSH_INTERVAL_MSごとにまとめて行う
+    """
+
+    def __init__(
+        self,
+        store_factory=get_store,
+        workers: int = DB_WORKERS,
+        flush_size: int = DB_FLUSH_SIZE,
+        flush_interval_ms: float = DB_FLUSH_INTERVAL_MS
+    ):
+        self.store_factory = store_factory
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="result-store")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._flusher: Optional[asyncio.Task] = None
+
+    async def _call(self, method: str, *args):
+        """
+        保存先のメソッドを専用スレッドで実行する（保存しない設定の場合はNone）
+        """
+        loop = asyncio.get_running_loop()
+
+        def run():
+            store = self.store_factory()
+            return getattr(store, method)(*args) if store is not None else None
+
+        return await loop.run_in_executor(self._executor, run)
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._flusher is None or self._flusher.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._flusher = loop.create_task(self._run())
+
+    async def put(self, item: Dict[str, Any]) -> None:
+        """
+        書き込みキューに追加し、書き込みが完了するまで待つ
+        """
+        self._ensure_started()
+        future = self._loop.create_future()
+        self._queue.put_nowait((item, future))
+        await future
+
+    async def put_many(self, items: Iterable[Dict[str, Any]]) -> None:
+        """
+        複数のアイテムを書き込みキューに追加し、全ての書き込みが完了するまで待つ
+        """
+        self._ensure_started()
+        futures = []
+        for item in items:
+            future = self._loop.create_future()
+            self._queue.put_nowait((item, future))
+            futures.append(future)
+        if futures:
+            await asyncio.gather(*futures)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.flush_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                await self._call('put_many', [item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_result(None)
+
+    async def get(self, query: str, window: str) -> Optional[Dict[str, Any]]:
+        return (await self.get_many([(query, window)])).get((query, window))
+
+    async def get_many(self, keys: Iterable[ResultKey]) -> Dict[ResultKey, Dict[str, Any]]:
+        keys = list(keys)
+        if not keys:
+            return {}
+        return await self._call('get_many', keys) or {}
+
+    async def latest(self, query: str) -> Optional[Dict[str, Any]]:
+        return await self._call('latest', query)
+
+
+repository = ResultRepository()
+
+
+async def save_result(result: AnalysisResult, paginate: bool = False, revision: str = "") -> None:
+    """
+    分析結果を保存する（他の書き込みとまとめて専用スレッドで実行される）
+    """
+    await repository.put(result_to_item(result, paginate, revision))
+
+async def get_result(
+    query: str,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    paginate: bool = False,
+    revision: str = ""
+) -> Optional[AnalysisResult]:
+    """
+    保存された分析結果を取得する（内部のキー空間のqueryは対象外）
+    """
+    if query.startswith(INTERNAL_PREFIX):
+        return None
+    # 完全一致検索
+    if date_from and date_to:
+        item = await repository.get(query, make_window(date_from, date_to, paginate, revision))
+    # クエリのみの検索（最新の結果を返す）
+    else:
+        item = await repository.latest(query)
+
+    return item_to_result(item) if item else None
+
+async def get_results(
+    windows: Iterable[Tuple[str, str, str]],
+    paginate: bool = False,
+    revision: str = ""
+) -> Dict[Tuple[str, str, str], AnalysisResult]:
+    """
+    複数の(query, date_from, date_to)の分析結果をまとめて取得する
+    """
+    windows = list(windows)
+    items = await repository.get_many(
+        (query, make_window(date_from, date_to, paginate, revision)) for query, date_from, date_to in windows
+    )
+    found = {}
+    for query, date_from, date_to in windows:
+        item = items.get((query, make_window(date_from, date_to, paginate, revision)))
+        if item:
+            found[(query, date_from, date_to)] = item_to_result(item)
+    return found
+
+
+# 記事ごとの結果と日別集計は分析結果と同じテーブルに内部のキー空間で保存する
+ARTICLE_PREFIX = INTERNAL_PREFIX + "article#"
+DAY_PREFIX = INTERNAL_PREFIX + "day#"
+
+
+def article_id(url: str) -> str:
+    """
+    記事URLから記事IDを作成する
+    """
+    return hashlib.sha256((url or "").strip().encode("utf-8")).hexdigest()
+
+def is_fresh(item: Dict[str, Any], ttl: float) -> bool:
+    """
+    保存からttl秒以内のアイテムかどうか（ttlが0以下の場合は常に有効）
+    """
+    if ttl <= 0:
+        return True
+    return datetime.fromisoformat(item['created_at']) > datetime.now() - timedelta(seconds=ttl)
+
+async def get_article_records(urls: Iterable[str], revision: str) -> Dict[str, Dict[str, Any]]:
+    """
+    記事URLごとの保存済み感情分析結果をまとめて取得する
+
+    revision（分析条件）が同じで、RECORD_TTL以内に保存された結果だけを返す
+    """
+    urls = list(dict.fromkeys(urls))
+    window = "article#" + revision
+    items = await repository.get_many((ARTICLE_PREFIX + article_id(url), window) for url in urls)
+    found = {}
+    for url in urls:
+        item = items.get((ARTICLE_PREFIX + article_id(url), window))
+        if item and is_fresh(item, RECORD_TTL):
+            found[url] = item
+    return found
+
+async def save_article_records(records: Iterable[Dict[str, Any]], revision: str) -> None:
+    """
+    記事ごとの感情分析結果（url, published_at, sentiment, score, rating）を分析条件ごとに保存する
+    """
+    now = datetime.now().isoformat()
+    window = "article#" + revision
+    await repository.put_many(
+        {**record, 'query': ARTICLE_PREFIX + article_id(record['url']), 'window': window, 'created_at': now}
+        for record in records
+    )
+
+async def get_day_buckets(query: str, days: Iterable[str], revision: str) -> Dict[str, Dict[str, Any]]:
+    """
+    クエリの日別集計をまとめて取得する
+
+    取得・集計の設定とrevisionが同じで、RECORD_TTL以内に保存された集計だけを返す
+    """
+    days = list(days)
+    keys = {day: (DAY_PREFIX + query, f"{day}#{FETCH_VARIANT}#{revision}") for day in days}
+    items = await repository.get_many(keys.values())
+    return {
+        day: items[key]['sentiment']
+        for day, key in keys.items()
+        if key in items and is_fresh(items[key], RECORD_TTL)
+    }
+
+async def save_day_buckets(query: str, buckets: Dict[str, Dict[str, Any]], revision: str) -> None:
+    """
+    クエリの日別集計（positive/negative/neutral/total）を分析条件ごとに保存する
+    """
+    now = datetime.now().isoformat()
+    await repository.put_many(
+        {
+            'query': DAY_PREFIX + query,
+            'window': f"{day}#{FETCH_VARIANT}#{revision}",
+            'sentiment': bucket,
+            'created_at': now
+        }
+        for day, bucket in buckets.items()
+    )
+
+# ウォッチリストのキーワード一覧と、キーワードごとの取得状態・累積集計
+WATCH_PREFIX = INTERNAL_PREFIX + "watch#"
+WATCHLIST_KEY = (INTERNAL_PREFIX + "watchlist", "keywords")
+
+async def get_watch_keywords() -> List[str]:
+    """
+    APIで登録されたウォッチリストのキーワードを取得する
+    """
+    item = await repository.get(*WATCHLIST_KEY)
+    return list(item['keywords']) if item else []
+
+async def save_watch_keywords(keywords: Iterable[str]) -> None:
+    """
+    ウォッチリストのキーワードを保存する
+    """
+    query, window = WATCHLIST_KEY
+    await repository.put({
+        'query': query, 'window': window, 'keywords': list(keywords), 'created_at': datetime.now().isoformat()
+    })
+
+async def get_watch_states(keywords: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    キーワードごとの取得状態と累積集計をまとめて取得する
+    """
+    keywords = list(keywords)
+    items = await repository.get_many((WATCH_PREFIX + keyword, "state") for keyword in keywords)
+    return {
+        keyword: items[(WATCH_PREFIX + keyword, "state")]['state']
+        for keyword in keywords
+        if (WATCH_PREFIX + keyword, "state") in items
+    }
+
+async def save_watch_states(states: Dict[str, Dict[str, Any]]) -> None:
+    """
+    キーワードごとの取得状態と累積集計を保存する
+    """
+    now = datetime.now().isoformat()
+    await repository.put_many(
+        {'query': WATCH_PREFIX + keyword, 'window': "state", 'state': state, 'created_at': now}
+        for keyword, state in states.items()
+    )
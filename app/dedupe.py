@@ -0,0 +1,166 @@
+import os
+import re
+import hashlib
+import unicodedata
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import numpy as np
+
+# 重複記事をまとめるかどうか
+DEDUPE_ENABLED = os.getenv("DEDUPE_ENABLED", "1") == "1"
+# 類似記事とみなすSimHash（64ビット）のハミング距離の上限
+DEDUPE_MAX_DISTANCE = int(os.getenv("DEDUPE_MAX_DISTANCE", "3"))
+# 集計での重み付け（member: 全ての転載記事を数える / cluster: 類似記事のまとまりを1件として数える）
+DEDUPE_WEIGHTING = os.getenv("DEDUPE_WEIGHTING", "member")
+
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 3
+# 計測・広告用のクエリパラメータ
+_TRACKING_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid|mc_cid|mc_eid|ref|cmpid|ocid|smid)$", re.IGNORECASE)
+_TOKEN = re.compile(r"\w+")
+
+
+def normalize_url(url: str) -> str:
+    """
+    記事URLを比較用に正規化する（スキーム・www・計測用パラメータ・末尾のスラッシュを除く）
+    """
+    parts = urlsplit((url or "").strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode(sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _TRACKING_PARAMS.match(key)
+    ))
+    return urlunsplit(("", host, parts.path.rstrip("/"), query, ""))
+
+
+def normalize_title(title: str, source: str = "") -> str:
+    """
+    タイトルを比較用に正規化する（末尾の「 - 情報源名」を除き、記号と空白を詰める）
+    """
+    title = unicodedata.normalize("NFKC", title or "").lower()
+    source = unicodedata.normalize("NFKC", source or "").lower().strip()
+    if source:
+        title = re.sub(r"\s*[-|–—:]\s*" + re.escape(source) + r"\s*$", "", title)
+    return " ".join(_TOKEN.findall(title))
+
+
+def simhash(text: str) -> Optional[int]:
+    """
+    単語3-gramのSimHash（64ビット）を求める（単語が無い場合はNone）
+    """
+    tokens = _TOKEN.findall(unicodedata.normalize("NFKC", text or "").lower())
+    if not tokens:
+        return None
+    shingles = [
+        " ".join(tokens[i:i + SHINGLE_SIZE])
+        for i in range(max(1, len(tokens) - SHINGLE_SIZE + 1))
+    ]
+    hashes = np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+            for shingle in shingles
+        ),
+        dtype=np.uint64,
+        count=len(shingles)
+    )
+    # 各ビットについて1の数が過半数かどうかで指紋を決める
+    bits = np.unpackbits(hashes.view(np.uint8)).reshape(len(shingles), SIMHASH_BITS)
+    votes = bits.sum(axis=0) * 2 > len(shingles)
+    return int.from_bytes(np.packbits(votes).tobytes(), "big")
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class ArticleDeduper:
+    """
+    記事を順に受け取り、重複・類似記事のまとまり（クラスタ）に振り分ける
+
+    正規化URLが同じ記事は同一記事として除外し、正規化タイトルが同じ記事と
+    タイトル＋概要のSimHashが近い記事は同じクラスタにまとめる。
+    SimHashはmax_distance+1個のバンドに分け、いずれかのバンドが一致する記事だけを比較する
+    """
+
+    def __init__(self, max_distance: int = DEDUPE_MAX_DISTANCE):
+        self.max_distance = max_distance
+        self.bands = max_distance + 1
+        self._band_bits = SIMHASH_BITS // self.bands
+        self._urls: Dict[str, int] = {}
+        self._titles: Dict[str, int] = {}
+        self._band_index: Dict[Tuple[int, int], List[int]] = {}
+        self._fingerprints: List[Optional[int]] = []
+        self.sizes: List[int] = []
+        self.duplicate_urls = 0
+
+    def _band_keys(self, fingerprint: int) -> List[Tuple[int, int]]:
+        mask = (1 << self._band_bits) - 1
+        return [(band, (fingerprint >> (band * self._band_bits)) & mask) for band in range(self.bands)]
+
+    def _find(self, fingerprint: Optional[int]) -> Optional[int]:
+        if fingerprint is None:
+            return None
+        for key in self._band_keys(fingerprint):
+            for cluster in self._band_index.get(key, ()):
+                if hamming(fingerprint, self._fingerprints[cluster]) <= self.max_distance:
+                    return cluster
+        return None
+
+    def add(self, article: Dict[str, Any]) -> Optional[int]:
+        """
+        記事のクラスタ番号を返す（同じURLの記事が既にある場合はNone）
+        """
+        url = normalize_url(article.get("url") or "")
+        if url and url in self._urls:
+            self.duplicate_urls += 1
+            return None
+
+        source = (article.get("source") or {}).get("name") or ""
+        title = normalize_title(article.get("title") or "", source)
+        cluster = self._titles.get(title) if title else None
+        fingerprint = None
+        if cluster is None:
+            fingerprint = simhash(f"{title} {article.get('description') or ''}")
+            cluster = self._find(fingerprint)
+        if cluster is None:
+            cluster = len(self.sizes)
+            self.sizes.append(0)
+            self._fingerprints.append(fingerprint)
+            if fingerprint is not None:
+                for key in self._band_keys(fingerprint):
+                    self._band_index.setdefault(key, []).append(cluster)
+
+        self.sizes[cluster] += 1
+        if url:
+            self._urls[url] = cluster
+        if title:
+            self._titles.setdefault(title, cluster)
+        return cluster
+
+    def stats(self) -> Dict[str, int]:
+        articles = sum(self.sizes)
+        return {
+            'clusters': len(self.sizes),
+            'near_duplicates': articles - len(self.sizes),
+            'duplicate_urls': self.duplicate_urls,
+        }
+
+
+def dedupe_articles(
+    articles: List[Dict[str, Any]],
+    max_distance: int = DEDUPE_MAX_DISTANCE
+) -> Tuple[List[Dict[str, Any]], List[int], Dict[str, int]]:
+    """
+    同じURLの記事を除き、残りの記事とそれぞれのクラスタ番号・統計を返す
+    """
+    deduper = ArticleDeduper(max_distance)
+    kept = []
+    clusters = []
+    for article in articles:
+        cluster = deduper.add(article)
+        if cluster is not None:
+            kept.append(article)
+            clusters.append(cluster)
+    return kept, clusters, deduper.stats()
@@ -1,19 +1,41 @@
 import os
-import requests
-from typing import List, Dict, Any
+import math
+import time
+import asyncio
+import unicodedata
+import aiohttp
+from typing import AsyncIterator, Callable, List, Dict, Any, Optional, Tuple
 from fastapi import HTTPException
 from datetime import datetime, timedelta
 from .model import Article
+from .logs import fields, get_logger
+from .metrics import ERRORS, NEWS_API_LATENCY
 
 NEWS_API_KEY = os.getenv("NEWS_API_KEY")
-NEWS_API_BASE_URL = "https://newsapi.org/v2/everything"
+# News APIのエンドポイント（プロキシやベンチマーク用のフェイクサーバーを使う場合に変更する）
+NEWS_API_BASE_URL = os.getenv("NEWS_API_BASE_URL", "https://newsapi.org/v2/everything")
+# 1リクエストのタイムアウト（秒）
+NEWS_API_TIMEOUT = float(os.getenv("NEWS_API_TIMEOUT", "10"))
+# 429/5xx時の最大リトライ回数
+NEWS_API_MAX_RETRIES = int(os.getenv("NEWS_API_MAX_RETRIES", "3"))
+# News APIへの同時接続数の上限
+NEWS_API_CONCURRENCY = int(os.getenv("NEWS_API_CONCURRENCY", "4"))
+# リトライ時の初回待ち時間（秒）。以降は指数的に増やす
+NEWS_API_BACKOFF = float(os.getenv("NEWS_API_BACKOFF", "0.5"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# ページ分割取得での最大記事数・最大リクエスト数（APIクォータ）・最大日数
+NEWS_MAX_ARTICLES = int(os.getenv("NEWS_MAX_ARTICLES", "1000"))
+NEWS_MAX_REQUESTS = int(os.getenv("NEWS_MAX_REQUESTS", "50"))
+NEWS_MAX_DAYS = int(os.getenv("NEWS_MAX_DAYS", "30"))
+NEWS_PAGE_SIZE = 100
+# News APIの利用枠（NEWS_API_BUDGET_PERIOD秒あたりのリクエスト数、0で無制限）と、一度に使える最大リクエスト数
+NEWS_API_BUDGET = int(os.getenv("NEWS_API_BUDGET", "100"))
+NEWS_API_BUDGET_PERIOD = float(os.getenv("NEWS_API_BUDGET_PERIOD", "86400"))
+NEWS_API_BUDGET_BURST = int(os.getenv("NEWS_API_BUDGET_BURST", "10"))
+# 取得する記事の言語（カンマ区切り、allで指定しない）。News APIは1リクエストで1言語のため言語ごとにリクエストする
+NEWS_API_LANGUAGES = os.getenv("NEWS_API_LANGUAGES", "en")
 
-# デバッグ情報の出力
-print("\n=== News API設定の確認 ===")
-print(f"NEWS_API_KEY: {'設定されています' if NEWS_API_KEY else '未設定'}")
-if NEWS_API_KEY:
-    print(f"NEWS_API_KEYの長さ: {len(NEWS_API_KEY)}")
-    print(f"NEWS_API_KEYの先頭4文字: {NEWS_API_KEY[:4]}...")
+logger = get_logger("fetcher")
 
 def validate_dates(date_from: str, date_to: str) -> tuple[str, str]:
     """
@@ -32,96 +54,548 @@ def validate_dates(date_from: str, date_to: str) -> tuple[str, str]:
     # 日付の範囲をチェック
     if from_date > to_date:
         from_date, to_date = to_date, from_date
-        print(f"警告: 開始日が終了日より後になっています。日付を入れ替えます。")
+        logger.warning("開始日が終了日より後になっています。日付を入れ替えます。")
     
     # 未来の日付を現在の日付に調整
     if from_date > today:
         from_date = today
-        print(f"警告: 開始日が未来の日付のため、現在の日付に調整します。")
+        logger.warning("開始日が未来の日付のため、現在の日付に調整します。")
     
     if to_date > today:
         to_date = today
-        print(f"警告: 終了日が未来の日付のため、現在の日付に調整します。")
+        logger.warning("終了日が未来の日付のため、現在の日付に調整します。")
     
     return from_date.strftime("%Y-%m-%d"), to_date.strftime("%Y-%m-%d")
 
+def split_date_range(date_from: str, date_to: str) -> List[str]:
+    """
+    期間を1日単位に分割する（新しい日付順）
+    """
+    from_date = datetime.strptime(date_from, "%Y-%m-%d")
+    to_date = datetime.strptime(date_to, "%Y-%m-%d")
+    days = (to_date - from_date).days
+    return [
+        (to_date - timedelta(days=offset)).strftime("%Y-%m-%d")
+        for offset in range(days + 1)
+    ]
+
+def parse_languages(value: str) -> List[Optional[str]]:
+    """
+    カンマ区切りの言語をリクエストごとの言語のリストにする（Noneは言語を指定しない）
+    """
+    languages = [language.strip().lower() for language in value.split(",") if language.strip()]
+    if not languages or "all" in languages:
+        return [None]
+    return list(dict.fromkeys(languages))
+
+def validate_query(query: str) -> None:
+    """
+    検索キーワードを検証する（制御文字を含むキーワードは保存先の内部のキーと区別するため受け付けない）
+    """
+    if len(query) < 2:
+        raise ValueError("検索キーワードは2文字以上必要です")
+    if any(unicodedata.category(char) == "Cc" for char in query):
+        raise ValueError("検索キーワードに制御文字は使えません")
+
+def language_params(language: Optional[str]) -> Dict[str, str]:
+    return {'language': language} if language else {}
+
+def newest_first(articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    複数の言語の記事をまとめて公開日時の新しい順に並べる
+    """
+    return sorted(articles, key=lambda article: article.get('publishedAt') or "", reverse=True)
+
+class RateBudget:
+    """
+    News APIのリクエスト数を数えるトークンバケット
+
+    全てのリクエストがconsumeで枠を使い（不足していても拒否はせず、枠を前借りする）、
+    定期取得などの後回しにできる処理はwaitで枠が空くのを待つ
+    """
+
+    def __init__(
+        self,
+        requests: int = NEWS_API_BUDGET,
+        period: float = NEWS_API_BUDGET_PERIOD,
+        burst: int = NEWS_API_BUDGET_BURST,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        # requestsが0以下の場合は待たない（使用数だけを数える）
+        self.unlimited = requests <= 0
+        self.rate = max(0, requests) / period
+        self.capacity = max(1, min(burst, requests))
+        self.clock = clock
+        self._tokens = float(self.capacity)
+        self._updated = clock()
+        self.used = 0
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def consume(self, requests: int = 1) -> None:
+        self._refill()
+        self._tokens -= requests
+        self.used += requests
+
+    def delay(self, requests: int = 1) -> float:
+        """
+        requests件分の枠が空くまでの秒数
+        """
+        if self.unlimited:
+            return 0.0
+        missing = requests - self.available()
+        return max(0.0, missing / self.rate)
+
+    async def wait(self, requests: int = 1) -> None:
+        while True:
+            delay = self.delay(requests)
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'available': round(self.available(), 2),
+            'capacity': self.capacity,
+            'requests_per_hour': None if self.unlimited else round(self.rate * 3600, 2),
+            'used': self.used,
+        }
+
+
+# 全てのNews APIリクエストで共有する利用枠
+news_api_budget = RateBudget()
+
 class NewsFetcher:
-    def __init__(self):
-        self.api_key = os.getenv("NEWS_API_KEY")
-        self.base_url = "https://newsapi.org/v2/everything"
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: str = NEWS_API_BASE_URL,
+        timeout: float = NEWS_API_TIMEOUT,
+        max_retries: int = NEWS_API_MAX_RETRIES,
+        concurrency: int = NEWS_API_CONCURRENCY,
+        backoff: float = NEWS_API_BACKOFF,
+        budget: Optional[RateBudget] = None,
+        languages: str = NEWS_API_LANGUAGES
+    ):
+        self.api_key = api_key or os.getenv("NEWS_API_KEY")
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.concurrency = concurrency
+        self.backoff = backoff
+        self.budget = budget if budget is not None else news_api_budget
+        self.languages = parse_languages(languages)
         
         # APIキーの検証
         if not self.api_key:
             raise ValueError("NEWS_API_KEYが設定されていません")
         
-        print("=== News API設定 ===")
-        print(f"NEWS_API_KEY: {'設定されています' if self.api_key else '未設定'}")
-        print(f"NEWS_API_KEYの長さ: {len(self.api_key)}")
-        print(f"NEWS_API_KEYの先頭4文字: {self.api_key[:4]}...")
+        # イベントループごとに作成する接続プールと同時実行数の制限
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        logger.info(
+            "News API設定",
+            extra=fields(base_url=self.base_url, concurrency=self.concurrency, languages=languages)
+        )
+
+    def _new_session(self) -> aiohttp.ClientSession:
+        """
+        keep-alive付きの接続プールを持つセッションを作成する
+        """
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,
+            keepalive_timeout=30,
+            ttl_dns_cache=300
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """
+        現在のイベントループ用の永続セッションを取得する
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._loop = loop
+            self._session = self._new_session()
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._session
+
+    async def close(self) -> None:
+        """
+        接続プールを閉じる
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _request(
+        self,
+        session: aiohttp.ClientSession,
+        params: Dict[str, Any],
+        semaphore: Optional[asyncio.Semaphore] = None
+    ) -> Tuple[int, Dict[str, Any]]:
+        """
+        News APIへリクエストし、429/5xx・通信エラー時は指数バックオフでリトライする
+
+        1回ごとのレイテンシ（接続の空き待ちを除く）をステータス別に記録する
+        """
+        attempt = 0
+        while True:
+            try:
+                if semaphore is not None:
+                    await semaphore.acquire()
+                self.budget.consume()
+                started = time.perf_counter()
+                try:
+                    async with session.get(self.base_url, params=params) as response:
+                        status = response.status
+                        retry_after = response.headers.get("Retry-After")
+                        try:
+                            data = await response.json(content_type=None)
+                        except ValueError:
+                            # プロキシのHTMLのエラーページなどはステータスだけで判断する
+                            data = {}
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    NEWS_API_LATENCY.observe(time.perf_counter() - started, status="error")
+                    raise
+                finally:
+                    if semaphore is not None:
+                        semaphore.release()
+                NEWS_API_LATENCY.observe(time.perf_counter() - started, status=str(status))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                ERRORS.inc(stage="news_api")
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff * (2 ** attempt)
+                logger.warning(
+                    "News APIへの接続に失敗しました。リトライします。",
+                    extra=fields(error=repr(e), attempt=attempt + 1, delay_s=delay)
+                )
+            else:
+                if status != 200:
+                    ERRORS.inc(stage="news_api")
+                if status not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return status, data or {}
+                delay = self.backoff * (2 ** attempt)
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, float(retry_after))
+                logger.warning(
+                    "News APIがエラーを返しました。リトライします。",
+                    extra=fields(status=status, attempt=attempt + 1, delay_s=delay)
+                )
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def fetch_news_async(self, query: str, date_from: str, date_to: str) -> List[Dict[str, Any]]:
+        """ニュース記事を非同期に取得する"""
+        session = await self._get_session()
+        return await self._fetch(session, query, date_from, date_to, self._semaphore)
 
     def fetch_news(self, query: str, date_from: str, date_to: str) -> List[Dict[str, Any]]:
-        """ニュース記事を取得する"""
+        """ニュース記事を取得する（同期呼び出し用のラッパー）"""
+        async def run():
+            async with self._new_session() as session:
+                return await self._fetch(session, query, date_from, date_to)
+        return asyncio.run(run())
+
+    async def _fetch(
+        self,
+        session: aiohttp.ClientSession,
+        query: str,
+        date_from: str,
+        date_to: str,
+        semaphore: Optional[asyncio.Semaphore] = None
+    ) -> List[Dict[str, Any]]:
         try:
             # 日付の検証
             from_date = datetime.strptime(date_from, "%Y-%m-%d")
             to_date = datetime.strptime(date_to, "%Y-%m-%d")
             
-            # 日付範囲が広すぎる場合は調整（最大30日）
-            if (to_date - from_date).days > 30:
-                from_date = to_date - timedelta(days=30)
-                date_from = from_date.strftime("%Y-%m-%d")
-                print(f"警告: 検索期間が30日を超えています。期間を調整します。")
-            
             # クエリの最適化
-            if len(query) < 2:
-                raise ValueError("検索キーワードは2文字以上必要です")
-            
-            # リクエストパラメータの設定
-            params = {
-                'q': query,
-                'from': date_from,
-                'to': date_to,
-                'language': 'en',  # 英語の記事を取得
-                'sortBy': 'publishedAt',
-                'pageSize': 100,  # 最大記事数を取得
-                'apiKey': self.api_key
-            }
-            
-            print(f"\n=== News APIリクエスト ===")
-            print(f"クエリ: {query}")
-            print(f"期間: {date_from} 〜 {date_to}")
-            print(f"リクエストURL: {self.base_url}")
-            print(f"パラメータ: {params}")
+            validate_query(query)
+        except ValueError as ve:
+            error_msg = str(ve)
+            logger.warning(error_msg)
+            raise HTTPException(status_code=400, detail=error_msg)
+        
+        # 日付範囲が広すぎる場合は調整（最大30日）
+        if (to_date - from_date).days > 30:
+            from_date = to_date - timedelta(days=30)
+            date_from = from_date.strftime("%Y-%m-%d")
+            logger.warning("検索期間が30日を超えています。期間を調整します。")
+        
+        try:
+            # リクエストパラメータの設定（言語ごとに1リクエスト）
+            params = [
+                {
+                    'q': query,
+                    'from': date_from,
+                    'to': date_to,
+                    **language_params(language),
+                    'sortBy': 'publishedAt',
+                    'pageSize': 100,  # 最大記事数を取得
+                    'apiKey': self.api_key
+                }
+                for language in self.languages
+            ]
             
             # APIリクエスト
-            response = requests.get(self.base_url, params=params)
-            
-            print(f"\n=== News APIレスポンス ===")
-            print(f"ステータスコード: {response.status_code}")
-            print(f"レスポンスデータ: {response.json()}")
-            
-            if response.status_code != 200:
-                error_msg = f"News APIエラー: {response.json().get('message', '不明なエラー')}"
-                print(f"エラー: {error_msg}")
-                raise HTTPException(status_code=500, detail=error_msg)
+            responses = await asyncio.gather(*(self._request(session, p, semaphore) for p in params))
             
-            data = response.json()
-            articles = data.get('articles', [])
+            articles = []
+            for status, data in responses:
+                if status != 200:
+                    error_msg = f"News APIエラー: {data.get('message', '不明なエラー')}"
+                    logger.error(error_msg, extra=fields(query=query, date_from=date_from, date_to=date_to, status=status))
+                    raise HTTPException(status_code=500, detail=error_msg)
+                articles.extend(data.get('articles', []))
+            if len(responses) > 1:
+                articles = newest_first(articles)
             
-            print(f"取得した記事数: {len(articles)}")
+            logger.info(
+                "News APIから記事を取得しました",
+                extra=fields(query=query, date_from=date_from, date_to=date_to, articles=len(articles))
+            )
             
             if not articles:
                 error_msg = f"指定された条件（クエリ: {query}, 期間: {date_from} 〜 {date_to}）で記事が見つかりませんでした。\n以下の点を試してみてください：\n1. より具体的なキーワードを使用する\n2. 検索期間を広げる\n3. 検索語を確認する"
-                print(f"警告: 記事が見つかりませんでした")
                 raise HTTPException(status_code=404, detail=error_msg)
             
             return articles
             
-        except ValueError as ve:
-            error_msg = str(ve)
-            print(f"エラー: {error_msg}")
-            raise HTTPException(status_code=400, detail=error_msg)
+        except HTTPException:
+            raise
         except Exception as e:
             error_msg = f"記事の取得中にエラーが発生しました: {str(e)}"
-            print(f"エラー: {error_msg}")
-            raise HTTPException(status_code=500, detail=error_msg) 
\ No newline at end of file
+            logger.exception(error_msg)
+            raise HTTPException(status_code=500, detail=error_msg)
+
+    async def stream_news(
+        self,
+        query: str,
+        date_from: str,
+        date_to: str,
+        max_articles: int = NEWS_MAX_ARTICLES,
+        max_requests: int = NEWS_MAX_REQUESTS,
+        max_days: int = NEWS_MAX_DAYS,
+        days: Optional[List[str]] = None,
+        report: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        期間を1日単位に分割し、各日のページを並列に取得しながら記事を順次返す
+
+        URLで重複を除外し、記事数の上限とリクエスト数（APIクォータ）の上限を守る。
+        daysを指定した場合はその日付だけを取得する。reportを渡すと、全ページを
+        取得できた日付（'complete_days'）と使用リクエスト数（'requests'）を記録する
+        """
+        try:
+            from_date = datetime.strptime(date_from, "%Y-%m-%d")
+            to_date = datetime.strptime(date_to, "%Y-%m-%d")
+            validate_query(query)
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail=str(ve))
+
+        if from_date > to_date:
+            from_date, to_date = to_date, from_date
+        if (to_date - from_date).days >= max_days:
+            from_date = to_date - timedelta(days=max_days - 1)
+            logger.warning(f"検索期間が{max_days}日を超えています。期間を調整します。")
+        if days is None:
+            days = split_date_range(from_date.strftime("%Y-%m-%d"), to_date.strftime("%Y-%m-%d"))
+        if report is None:
+            report = {}
+        report['complete_days'] = []
+
+        session = await self._get_session()
+        semaphore = self._semaphore
+        queue: asyncio.Queue = asyncio.Queue()
+        budget = {'remaining': max_requests}
+        errors = []
+
+        async def fetch_page(day: str, page: int, language: Optional[str]) -> Optional[Dict[str, Any]]:
+            if budget['remaining'] <= 0:
+                return None
+            budget['remaining'] -= 1
+            params = {
+                'q': query,
+                'from': f"{day}T00:00:00",
+                'to': f"{day}T23:59:59",
+                **language_params(language),
+                'sortBy': 'publishedAt',
+                'pageSize': NEWS_PAGE_SIZE,
+                'page': page,
+                'apiKey': self.api_key
+            }
+            status, data = await self._request(session, params, semaphore)
+            if status != 200:
+                # 無料プランの取得上限（maximumResultsReached）などはその日の取得を打ち切る
+                message = data.get('message', '不明なエラー')
+                logger.warning(
+                    "News APIエラー",
+                    extra=fields(day=day, page=page, language=language, status=status, message=message)
+                )
+                errors.append(message)
+                return None
+            await queue.put(data.get('articles', []))
+            return data
+
+        async def fetch_language(day: str, language: Optional[str]) -> bool:
+            first = await fetch_page(day, 1, language)
+            if not first:
+                return False
+            total = min(first.get('totalResults', 0), max_articles)
+            pages = math.ceil(total / NEWS_PAGE_SIZE)
+            # 2ページ目以降は並列に取得する
+            rest = await asyncio.gather(*(fetch_page(day, page, language) for page in range(2, pages + 1)))
+            return total == first.get('totalResults', 0) and all(rest)
+
+        async def fetch_day(day: str) -> None:
+            complete = await asyncio.gather(*(fetch_language(day, language) for language in self.languages))
+            if all(complete):
+                report['complete_days'].append(day)
+
+        async def fetch_all() -> None:
+            try:
+                await asyncio.gather(*(fetch_day(day) for day in days))
+            finally:
+                await queue.put(None)
+
+        logger.info(
+            "News APIから分割取得します",
+            extra=fields(query=query, date_from=days[-1], date_to=days[0], days=len(days))
+        )
+
+        producer = asyncio.create_task(fetch_all())
+        seen = set()
+        count = 0
+        failure = None
+        truncated = False
+        try:
+            while count < max_articles:
+                articles = await queue.get()
+                if articles is None:
+                    break
+                for article in articles:
+                    url = (article.get('url') or '').strip()
+                    if url in seen:
+                        continue
+                    seen.add(url)
+                    count += 1
+                    yield article
+                    if count >= max_articles:
+                        truncated = True
+                        break
+        finally:
+            # 上限到達や呼び出し側の中断時は残りのリクエストを取り消す
+            producer.cancel()
+            try:
+                await producer
+            except asyncio.CancelledError:
+                pass
+            except Exception as e:
+                failure = e
+            report['requests'] = max_requests - budget['remaining']
+            # 上限で打ち切った場合はどの日も全件取得できたとは言えない
+            if truncated or failure is not None:
+                report['complete_days'] = []
+
+        if failure is not None:
+            if count == 0:
+                raise HTTPException(status_code=500, detail=f"記事の取得中にエラーが発生しました: {str(failure)}")
+            logger.warning("一部の記事の取得に失敗しました", extra=fields(error=str(failure)))
+        if count == 0 and errors:
+            raise HTTPException(status_code=500, detail=f"News APIエラー: {errors[0]}")
+        logger.info("記事を取得しました", extra=fields(query=query, articles=count, requests=report['requests']))
+
+    async def fetch_since(
+        self,
+        query: str,
+        since: str,
+        max_articles: int = NEWS_MAX_ARTICLES,
+        max_requests: int = NEWS_MAX_REQUESTS,
+        report: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        since（YYYY-MM-DDTHH:MM:SS、UTC）以降に公開された記事を新しい順に取得する
+
+        ウォッチリストの差分取得用。reportを渡すと、使用リクエスト数（'requests'）と
+        上限のため取得しなかった記事数（'skipped'）を記録する
+        """
+        if report is None:
+            report = {}
+        session = await self._get_session()
+        articles: List[Dict[str, Any]] = []
+        skipped = 0
+        requests = 0
+        try:
+            # 言語ごとに順に取得し、リクエスト数と記事数の上限は全言語で共有する
+            for language in self.languages:
+                found: List[Dict[str, Any]] = []
+                total = 0
+                page = 0
+                while requests < max_requests and len(articles) + len(found) < max_articles:
+                    requests += 1
+                    page += 1
+                    params = {
+                        'q': query,
+                        'from': since,
+                        **language_params(language),
+                        'sortBy': 'publishedAt',
+                        'pageSize': NEWS_PAGE_SIZE,
+                        'page': page,
+                        'apiKey': self.api_key
+                    }
+                    status, data = await self._request(session, params, self._semaphore)
+                    if status != 200:
+                        raise HTTPException(
+                            status_code=500,
+                            detail=f"News APIエラー: {data.get('message', '不明なエラー')}"
+                        )
+                    total = data.get('totalResults', 0)
+                    results = data.get('articles', [])
+                    found.extend(results)
+                    if not results or len(found) >= total:
+                        break
+                found = found[:max_articles - len(articles)]
+                skipped += max(0, total - len(found))
+                articles.extend(found)
+        finally:
+            report['requests'] = requests
+        report['skipped'] = skipped
+        return newest_first(articles) if len(self.languages) > 1 else articles
+
+    async def fetch_news_all(
+        self,
+        query: str,
+        date_from: str,
+        date_to: str,
+        max_articles: int = NEWS_MAX_ARTICLES,
+        max_requests: int = NEWS_MAX_REQUESTS
+    ) -> List[Dict[str, Any]]:
+        """
+        期間全体の記事をページ分割・並列取得でまとめて取得する
+        """
+        articles = [
+            article async for article in self.stream_news(
+                query, date_from, date_to,
+                max_articles=max_articles,
+                max_requests=max_requests
+            )
+        ]
+        if not articles:
+            raise HTTPException(
+                status_code=404,
+                detail=f"指定された条件（クエリ: {query}, 期間: {date_from} 〜 {date_to}）で記事が見つかりませんでした。"
+            )
+        return articles
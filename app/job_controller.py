@@ -1,152 +1,851 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
 from fastapi import APIRouter, HTTPException
-from .model import AnalysisRequest, AnalysisResult
-from .fetcher import NewsFetcher
-from .analyzer import analyze_text
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from .model import AnalysisRequest, AnalysisResult, BatchAnalysisRequest, JobStatus
+from .jobs import Job, JobManager, JobQueueFullError
+from .db import (
+    get_article_records,
+    get_day_buckets,
+    get_result,
+    save_article_records,
+    save_day_buckets,
+    save_result
+)
+from .fetcher import NewsFetcher, split_date_range
+from .aggregate import summarize
+from .dedupe import DEDUPE_ENABLED, DEDUPE_WEIGHTING, ArticleDeduper, dedupe_articles
+from .watchlist import WATCHLIST_ENABLED, Watchlist
+from .batch import BATCH_CONCURRENCY, BATCH_MAX_QUERIES, default_window, run_batch
+from .language import JAPANESE_SEGMENTATION, LANGUAGE_MODELS
+from .text import ANALYZE_CONTENT, article_text
+from .analyzer import (
+    MODEL_PRELOAD,
+    analyze_texts,
+    analyzer_loader,
+    close_analyzer,
+    get_analyzer,
+    scheduler
+)
+from . import metrics, startup
+from .logs import fields, get_logger
+from .metrics import ARTICLES_PER_REQUEST, ERRORS
 import traceback
 import sys
 from datetime import datetime, timedelta
 
 router = APIRouter()
 
-# NewsFetcherのインスタンスを作成
-news_fetcher = NewsFetcher()
+# ストリーミング分析で1回に推論する最大記事数
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "16"))
+# 同一条件の分析結果を再利用する時間（秒）
+SINGLEFLIGHT_TTL = float(os.getenv("SINGLEFLIGHT_TTL", "30"))
 
-@router.post("/analyze", response_model=AnalysisResult)
-async def analyze_sentiment(query: str, date_from: str, date_to: str):
+logger = get_logger("api")
+
+# NewsFetcherのインスタンス（最初に使う時に作成する）
+_news_fetcher: Optional[NewsFetcher] = None
+# バックグラウンドでのモデル読み込みタスク
+_preload_task: Optional[asyncio.Task] = None
+
+def get_news_fetcher() -> NewsFetcher:
+    global _news_fetcher
+    if _news_fetcher is None:
+        _news_fetcher = NewsFetcher()
+    return _news_fetcher
+
+@router.on_event("startup")
+async def preload_model():
     """
-    ニュース記事を取得し、感情分析を実行する
+    起動を待たせずにバックグラウンドでモデルを読み込む
+    """
+    global _preload_task
+    if MODEL_PRELOAD and _preload_task is None:
+        _preload_task = asyncio.get_running_loop().create_task(analyzer_loader.load_in_background())
+
+@router.on_event("startup")
+async def start_watchlist():
+    """
+    ウォッチリストの定期取得を開始する
+    """
+    if WATCHLIST_ENABLED:
+        watchlist.start()
+
+@router.on_event("shutdown")
+async def stop_watchlist():
+    await watchlist.stop()
+
+@router.on_event("shutdown")
+async def close_news_fetcher():
+    """
+    News APIの接続プールを閉じる
+    """
+    if _news_fetcher is not None:
+        await _news_fetcher.close()
+
+@router.on_event("shutdown")
+def close_inference_workers():
+    """
+    推論ワーカープロセスを停止する
+    """
+    close_analyzer()
+
+def normalize_dates(date_from: str, date_to: str) -> Tuple[str, str]:
+    """
+    日付をバリデーションし、順序・未来日・最大期間を調整する
     """
     try:
-        print(f"\n=== 分析開始 ===")
-        print(f"クエリ: {query}")
-        print(f"期間: {date_from} 〜 {date_to}")
+        from_date = datetime.strptime(date_from, "%Y-%m-%d")
+        to_date = datetime.strptime(date_to, "%Y-%m-%d")
+        today = datetime.now()
         
-        # 日付のバリデーション
-        try:
-            from_date = datetime.strptime(date_from, "%Y-%m-%d")
-            to_date = datetime.strptime(date_to, "%Y-%m-%d")
-            today = datetime.now()
-            
-            # 日付の範囲チェック
-            if from_date > to_date:
-                print("警告: 開始日が終了日より後になっています。日付を入れ替えます。")
-                from_date, to_date = to_date, from_date
-                date_from = from_date.strftime("%Y-%m-%d")
-                date_to = to_date.strftime("%Y-%m-%d")
-            
-            # 未来の日付を現在の日付に調整
-            if from_date > today:
-                print("警告: 開始日が未来の日付のため、現在の日付に調整します。")
-                from_date = today
-                date_from = from_date.strftime("%Y-%m-%d")
-            
-            if to_date > today:
-                print("警告: 終了日が未来の日付のため、現在の日付に調整します。")
-                to_date = today
-                date_to = to_date.strftime("%Y-%m-%d")
-            
-            # 日付の範囲が広すぎる場合は調整
-            max_days = 30
-            if (to_date - from_date).days > max_days:
-                print(f"警告: 検索期間が{max_days}日を超えています。期間を調整します。")
-                from_date = to_date - timedelta(days=max_days)
-                date_from = from_date.strftime("%Y-%m-%d")
-            
-            print(f"調整後の期間: {date_from} 〜 {date_to}")
-            
-        except ValueError as e:
-            print(f"日付のバリデーションエラー: {str(e)}")
-            raise HTTPException(
-                status_code=400,
-                detail=f"日付の形式が正しくありません。YYYY-MM-DD形式で指定してください。"
-            )
+        # 日付の範囲チェック
+        if from_date > to_date:
+            logger.warning("開始日が終了日より後になっています。日付を入れ替えます。")
+            from_date, to_date = to_date, from_date
+            date_from = from_date.strftime("%Y-%m-%d")
+            date_to = to_date.strftime("%Y-%m-%d")
         
-        # ニュース記事を取得
-        try:
-            articles = news_fetcher.fetch_news(query, date_from, date_to)
-        except Exception as e:
-            print(f"記事取得エラー: {str(e)}")
-            print("エラーの詳細:")
-            print(traceback.format_exc())
-            raise HTTPException(
-                status_code=500,
-                detail=f"記事の取得中にエラーが発生しました: {str(e)}"
-            )
+        # 未来の日付を現在の日付に調整
+        if from_date > today:
+            logger.warning("開始日が未来の日付のため、現在の日付に調整します。")
+            from_date = today
+            date_from = from_date.strftime("%Y-%m-%d")
         
-        if not articles:
-            print("警告: 記事が見つかりませんでした")
-            raise HTTPException(
-                status_code=404,
-                detail=f"指定された条件（クエリ: {query}, 期間: {date_from} 〜 {date_to}）で記事が見つかりませんでした。\n別のキーワードや期間を試してみてください。"
-            )
+        if to_date > today:
+            logger.warning("終了日が未来の日付のため、現在の日付に調整します。")
+            to_date = today
+            date_to = to_date.strftime("%Y-%m-%d")
         
-        print(f"取得した記事数: {len(articles)}")
+        # 日付の範囲が広すぎる場合は調整
+        max_days = 30
+        if (to_date - from_date).days > max_days:
+            logger.warning(f"検索期間が{max_days}日を超えています。期間を調整します。")
+            from_date = to_date - timedelta(days=max_days)
+            date_from = from_date.strftime("%Y-%m-%d")
         
-        # 各記事を個別に分析
-        try:
-            sentiment_results = []
-            for article in articles:
-                text = f"{article.get('title', '')} {article.get('description', '')}"
-                print(f"分析対象テキストの長さ: {len(text)}文字")
-                
-                sentiment = await analyze_text(text)
-                sentiment_results.append(sentiment)
-                print(f"感情分析結果: {sentiment}")
-            
-            # 結果を集計
-            sentiment_data = {
-                "positive": sum(1 for s in sentiment_results if s.get("sentiment") == "positive"),
-                "negative": sum(1 for s in sentiment_results if s.get("sentiment") == "negative"),
-                "neutral": sum(1 for s in sentiment_results if s.get("sentiment") == "neutral"),
-                "total": len(sentiment_results)
-            }
-            
-        except Exception as e:
-            print(f"感情分析エラー: {str(e)}")
-            print("エラーの詳細:")
-            print(traceback.format_exc())
-            raise HTTPException(
-                status_code=500,
-                detail=f"記事の処理中にエラーが発生しました: {str(e)}"
-            )
+        return date_from, date_to
         
-        # 結果を作成
-        result = AnalysisResult(
-            query=query,
-            date_from=date_from,
-            date_to=date_to,
-            article_count=len(articles),
-            sentiment=sentiment_data
+    except ValueError as e:
+        logger.warning("日付のバリデーションエラー", extra=fields(error=str(e)))
+        raise HTTPException(
+            status_code=400,
+            detail=f"日付の形式が正しくありません。YYYY-MM-DD形式で指定してください。"
+        )
+
+class SingleFlight:
+    """
+    同じキーの同時呼び出しで1回の計算を共有し、結果を短時間だけ再利用する
+    """
+
+    def __init__(self, ttl: float = SINGLEFLIGHT_TTL, max_entries: int = 1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._recent: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        # 統計情報
+        self.leaders = 0
+        self.followers = 0
+        self.recent_hits = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        now = time.monotonic()
+        entry = self._recent.get(key)
+        if entry is not None:
+            if entry[0] > now:
+                self.recent_hits += 1
+                return entry[1]
+            del self._recent[key]
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.followers += 1
+        # 1人の呼び出し元がキャンセルしても他の待機者の計算は継続する
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if self.ttl <= 0 or task.cancelled() or task.exception() is not None:
+            return
+        self._recent[key] = (time.monotonic() + self.ttl, task.result())
+        self._recent.move_to_end(key)
+        while len(self._recent) > self.max_entries:
+            self._recent.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'inflight': len(self._inflight),
+            'recent': len(self._recent),
+            'leaders': self.leaders,
+            'followers': self.followers,
+            'recent_hits': self.recent_hits,
+        }
+
+analysis_flight = SingleFlight()
+
+async def run_analysis(query: str, date_from: str, date_to: str, paginate: bool = False) -> AnalysisResult:
+    """
+    ニュース記事を取得し、感情分析して集計する
+    """
+    # ニュース記事を取得
+    try:
+        if paginate:
+            articles = await get_news_fetcher().fetch_news_all(query, date_from, date_to)
+        else:
+            articles = await get_news_fetcher().fetch_news_async(query, date_from, date_to)
+    except HTTPException:
+        raise
+    except Exception as e:
+        ERRORS.inc(stage="fetch")
+        logger.exception("記事取得エラー", extra=fields(query=query))
+        raise HTTPException(
+            status_code=500,
+            detail=f"記事の取得中にエラーが発生しました: {str(e)}"
+        )
+
+    if not articles:
+        raise HTTPException(
+            status_code=404,
+            detail=f"指定された条件（クエリ: {query}, 期間: {date_from} 〜 {date_to}）で記事が見つかりませんでした。\n別のキーワードや期間を試してみてください。"
+        )
+
+    ARTICLES_PER_REQUEST.observe(len(articles), endpoint="analyze")
+
+    # 重複・類似記事をまとめ、まとまりごとに1回だけ分析する
+    try:
+        dedupe_stats = None
+        if DEDUPE_ENABLED:
+            articles, clusters, dedupe_stats = dedupe_articles(articles)
+        else:
+            clusters = list(range(len(articles)))
+        leaders: Dict[int, int] = {}
+        for i, cluster in enumerate(clusters):
+            leaders.setdefault(cluster, i)
+
+        texts = [article_text(articles[i]) for i in leaders.values()]
+        logger.info(
+            "感情分析を実行します",
+            extra=fields(query=query, articles=len(articles), texts=len(texts))
+        )
+
+        scored = dict(zip(leaders, await analyze_texts(texts)))
+        counted = [
+            i for i, cluster in enumerate(clusters)
+            if DEDUPE_WEIGHTING != "cluster" or leaders[cluster] == i
+        ]
+
+        # 結果を集計（件数・平均評価・情報源別/日別の内訳）
+        summary = summarize(
+            [scored[clusters[i]] for i in counted],
+            sources=[article_source(articles[i]) for i in counted],
+            days=[(articles[i].get("publishedAt") or "")[:10] for i in counted]
+        )
+        if dedupe_stats is not None:
+            summary["stats"]["dedupe"] = {**dedupe_stats, 'weighting': DEDUPE_WEIGHTING}
+
+    except Exception as e:
+        ERRORS.inc(stage="analyze")
+        logger.exception("感情分析エラー", extra=fields(query=query))
+        raise HTTPException(
+            status_code=500,
+            detail=f"記事の処理中にエラーが発生しました: {str(e)}"
         )
+
+    # 結果を作成
+    result = AnalysisResult(
+        query=query,
+        date_from=date_from,
+        date_to=date_to,
+        article_count=summary["counts"]["total"],
+        sentiment=summary["counts"],
+        stats=summary["stats"]
+    )
+
+    return result
+
+# 書き込み中の保存タスク（完了前にGCされないよう参照を保持する）
+_pending_saves = set()
+
+def is_closed_window(date_to: str) -> bool:
+    """
+    期間が過去で確定しているか（今日を含まないか）を判定する
+    """
+    return date_to < datetime.now().strftime("%Y-%m-%d")
+
+def _on_saved(task: asyncio.Task) -> None:
+    _pending_saves.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        ERRORS.inc(stage="store")
+        logger.error("分析結果の保存エラー", extra=fields(error=str(task.exception())))
+
+def run_in_background(coro: Awaitable[Any]) -> None:
+    """
+    保存処理をリクエストの処理とは別に行う
+    """
+    task = asyncio.ensure_future(coro)
+    _pending_saves.add(task)
+    task.add_done_callback(_on_saved)
+
+def save_in_background(result: AnalysisResult, paginate: bool = False, revision: str = "") -> None:
+    """
+    分析結果の保存をリクエストの処理とは別に行う
+    """
+    run_in_background(save_result(result, paginate, revision))
+
+async def load_stored_result(
+    query: str,
+    date_from: str,
+    date_to: str,
+    paginate: bool = False,
+    revision: str = ""
+) -> Optional[AnalysisResult]:
+    """
+    確定済みの過去期間であれば同じ分析条件で保存済みの分析結果を返す
+    """
+    if not is_closed_window(date_to):
+        return None
+    try:
+        return await get_result(query, date_from, date_to, paginate, revision)
+    except Exception as e:
+        ERRORS.inc(stage="store")
+        logger.warning("保存済み分析結果の取得に失敗しました", extra=fields(error=str(e)))
+        return None
+
+async def analyze_with_store(query: str, date_from: str, date_to: str, paginate: bool = False) -> AnalysisResult:
+    """
+    同じ分析条件の保存済みの結果があればそれを返し、なければ分析して結果を保存する
+    """
+    revision = await current_revision()
+    stored = await load_stored_result(query, date_from, date_to, paginate, revision)
+    if stored is not None:
+        logger.info("保存済みの分析結果を返します", extra=fields(query=query, date_from=date_from, date_to=date_to))
+        return stored
+
+    result = await run_analysis(query, date_from, date_to, paginate)
+    result.created_at = datetime.now().isoformat()
+    save_in_background(result, paginate, revision)
+    return result
+
+@router.on_event("shutdown")
+async def flush_pending_saves():
+    """
+    書き込み中の分析結果の保存を待つ
+    """
+    if _pending_saves:
+        await asyncio.gather(*_pending_saves, return_exceptions=True)
+
+async def analyze_query(query: str, date_from: str, date_to: str, paginate: bool = False) -> AnalysisResult:
+    """
+    日付を調整し、保存済みの結果または同一条件の実行中の分析を共有して分析する
+    """
+    # 日付のバリデーション
+    date_from, date_to = normalize_dates(date_from, date_to)
+    
+    # 同一条件の同時リクエストは1回の計算を共有する
+    return await analysis_flight.do(
+        (query, date_from, date_to, paginate),
+        lambda: analyze_with_store(query, date_from, date_to, paginate)
+    )
+
+@router.post("/analyze", response_model=AnalysisResult)
+async def analyze_sentiment(query: str, date_from: str, date_to: str, paginate: bool = False):
+    """
+    ニュース記事を取得し、感情分析を実行する
+
+    paginate=Trueの場合は期間を日単位に分割し、全ページを並列に取得する
+    """
+    try:
+        result = await analyze_query(query, date_from, date_to, paginate)
         
-        print("=== 分析完了 ===")
+        logger.info(
+            "分析完了",
+            extra=fields(query=query, date_from=date_from, date_to=date_to, articles=result.article_count)
+        )
         return result
         
     except HTTPException as he:
-        print(f"HTTPエラー: {he.detail}")
+        logger.warning("HTTPエラー", extra=fields(query=query, status_code=he.status_code, detail=he.detail))
         raise he
     except Exception as e:
-        print(f"予期せぬエラー: {str(e)}")
-        print("エラーの詳細:")
-        print(traceback.format_exc())
+        ERRORS.inc(stage="api")
+        logger.exception("予期せぬエラー", extra=fields(query=query))
         raise HTTPException(
             status_code=500,
             detail=f"予期せぬエラーが発生しました: {str(e)}"
         )
 
+@router.post("/analyze/batch")
+async def analyze_sentiment_batch(request: BatchAnalysisRequest, concurrency: int = BATCH_CONCURRENCY):
+    """
+    複数のクエリをまとめて分析し、完了した順に1行1クエリのJSONL（NDJSON）で返す
+
+    取得はNews APIの利用枠の範囲で並行して行い、推論は全クエリの記事をまとめたバッチで行う
+    """
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="分析するクエリがありません")
+    if len(request.queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"クエリは{BATCH_MAX_QUERIES}件までです")
+    window = default_window()
+    items = [
+        {
+            'query': item.query,
+            'date_from': item.date_from or window['date_from'],
+            'date_to': item.date_to or window['date_to'],
+        }
+        for item in request.queries
+    ]
+
+    async def analyze(query: str, date_from: str, date_to: str) -> AnalysisResult:
+        return await analyze_query(query, date_from, date_to, request.paginate)
+
+    async def rows():
+        async for row in run_batch(items, analyze, concurrency=max(1, min(concurrency, BATCH_CONCURRENCY))):
+            yield json.dumps(row, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+def article_source(article: Dict[str, Any]) -> str:
+    """
+    記事の情報源名を返す
+    """
+    return (article.get("source") or {}).get("name") or ""
+
+def empty_counts() -> Dict[str, int]:
+    return {"positive": 0, "negative": 0, "neutral": 0, "total": 0}
+
+def add_counts(counts: Dict[str, int], other: Dict[str, int]) -> None:
+    for key in counts:
+        counts[key] += int(other.get(key, 0))
+
+def scoring_revision(analyzer) -> str:
+    """
+    保存済みの記事ごとの結果・日別集計を再利用できる分析条件を表す文字列を返す
+
+    モデルとそのリビジョン・推論設定、言語別のモデル、日本語の分割、本文の有無のどれかが変わると別の値になる
+    """
+    condition = [
+        analyzer.model_name,
+        analyzer.cache_revision,
+        sorted(LANGUAGE_MODELS.items()),
+        JAPANESE_SEGMENTATION,
+        ANALYZE_CONTENT,
+    ]
+    return hashlib.sha256(json.dumps(condition).encode("utf-8")).hexdigest()[:16]
+
+async def current_revision() -> str:
+    """
+    現在の分析器の分析条件を返す
+    """
+    return scoring_revision(await asyncio.to_thread(get_analyzer))
+
+async def load_day_buckets(query: str, days: List[str], revision: str) -> Dict[str, Dict[str, Any]]:
+    """
+    保存済みの日別集計を取得する（取得できない場合は空として扱う）
+    """
+    if not days:
+        return {}
+    try:
+        return await get_day_buckets(query, days, revision)
+    except Exception as e:
+        ERRORS.inc(stage="store")
+        logger.warning("日別集計の取得に失敗しました", extra=fields(error=str(e)))
+        return {}
+
+async def load_article_records(urls: List[str], revision: str) -> Dict[str, Dict[str, Any]]:
+    """
+    保存済みの記事ごとの結果を取得する（取得できない場合は空として扱う）
+    """
+    try:
+        return await get_article_records((url for url in urls if url), revision)
+    except Exception as e:
+        ERRORS.inc(stage="store")
+        logger.warning("記事ごとの結果の取得に失敗しました", extra=fields(error=str(e)))
+        return {}
+
+async def stream_analysis(
+    query: str,
+    date_from: str,
+    date_to: str,
+    batch_size: int = STREAM_BATCH_SIZE
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    記事の取得→感情分析→集計をパイプライン化し、途中経過を順次返す
+
+    取得は別タスクで進め、届いた記事から最大batch_size件ずつ分析する。
+    過去の日付で日別集計が保存済みの日は取得せず、集計をそのまま使う。
+    保存済みの記事は再分析しない（保存済みの結果は現在と同じ分析条件のものだけを使う）
+    """
+    days = split_date_range(date_from, date_to)
+    today = datetime.now().strftime("%Y-%m-%d")
+    # 分析条件はモデルの設定から決まるため、読み込みを別スレッドで待つ
+    revision = await current_revision()
+    cached = await load_day_buckets(query, [day for day in days if day < today], revision)
+    missing_days = [day for day in days if day not in cached]
+
+    counts = empty_counts()
+    daily = {}
+    for day, bucket in cached.items():
+        add_counts(counts, bucket)
+        daily[day] = {key: int(bucket.get(key, 0)) for key in counts}
+    if cached:
+        logger.info("保存済みの日別集計を使用します", extra=fields(query=query, days=len(cached)))
+        yield {"event": "articles", "results": [], "sentiment": dict(counts), "cached_days": sorted(cached)}
+
+    report: Dict[str, Any] = {}
+    error_days = set()
+    # 今回取得した記事ごとの結果（詳細な統計の集計用）
+    rows: List[Dict[str, Any]] = []
+    sources: List[str] = []
+    row_days: List[str] = []
+    # 重複・類似記事のまとまりと、まとまりごとの分析結果
+    deduper = ArticleDeduper() if DEDUPE_ENABLED else None
+    cluster_sentiments: Dict[int, Optional[Dict[str, Any]]] = {}
+    counted_clusters = set()
+    if missing_days:
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        async def produce():
+            try:
+                async for article in get_news_fetcher().stream_news(
+                    query, date_from, date_to, days=missing_days, report=report
+                ):
+                    await queue.put(article)
+            except Exception as e:
+                await queue.put(e)
+            finally:
+                await queue.put(done)
+
+        producer = asyncio.create_task(produce())
+        finished = False
+        fetched = 0
+        try:
+            while not finished:
+                # 最初の1件を待ち、その時点で届いている記事をまとめる
+                batch = [await queue.get()]
+                while len(batch) < batch_size and not queue.empty():
+                    batch.append(queue.get_nowait())
+                if batch[-1] is done:
+                    batch.pop()
+                    finished = True
+                for item in batch:
+                    if isinstance(item, Exception):
+                        raise item
+                if not batch:
+                    continue
+                fetched += len(batch)
+
+                # 同じURLの記事を除き、類似記事のまとまり（クラスタ）に振り分ける
+                clustered = []
+                for article in batch:
+                    cluster = deduper.add(article) if deduper is not None else None
+                    if deduper is None or cluster is not None:
+                        clustered.append((article, cluster))
+
+                # 保存済みの記事と、分析済みのクラスタに属する記事は再分析しない
+                stored = await load_article_records([article.get("url") for article, _ in clustered], revision)
+                to_score = []
+                for article, cluster in clustered:
+                    if article.get("url") in stored:
+                        if cluster is not None:
+                            cluster_sentiments.setdefault(cluster, stored[article.get("url")])
+                    elif cluster is None or cluster not in cluster_sentiments:
+                        to_score.append((article, cluster))
+                        if cluster is not None:
+                            cluster_sentiments[cluster] = None
+                scored = await analyze_texts([article_text(article) for article, _ in to_score])
+                own = {}
+                for (article, cluster), sentiment in zip(to_score, scored):
+                    own[id(article)] = sentiment
+                    if cluster is not None:
+                        cluster_sentiments[cluster] = sentiment
+
+                results = []
+                new_records = []
+                for article, cluster in clustered:
+                    url = article.get("url")
+                    sentiment = (
+                        stored.get(url) or own.get(id(article))
+                        or cluster_sentiments.get(cluster) or {}
+                    )
+                    label = sentiment.get("sentiment")
+                    if url and url not in stored and label not in (None, "ERROR"):
+                        new_records.append({
+                            "url": url,
+                            "published_at": article.get("publishedAt"),
+                            "sentiment": label,
+                            "score": sentiment.get("score"),
+                            "rating": sentiment.get("rating"),
+                            "probs": sentiment.get("probs")
+                        })
+                    results.append({
+                        "title": article.get("title"),
+                        "url": url,
+                        "published_at": article.get("publishedAt"),
+                        "sentiment": label,
+                        "score": sentiment.get("score"),
+                        "rating": sentiment.get("rating"),
+                        "probs": sentiment.get("probs"),
+                        "cluster": cluster
+                    })
+                    # cluster重み付けではクラスタの最初の記事だけを数える
+                    if DEDUPE_WEIGHTING == "cluster" and cluster is not None:
+                        if cluster in counted_clusters:
+                            continue
+                        counted_clusters.add(cluster)
+                    day = (article.get("publishedAt") or "")[:10]
+                    bucket = daily.setdefault(day, empty_counts())
+                    for target in (counts, bucket):
+                        if label in target:
+                            target[label] += 1
+                        target["total"] += 1
+                    if label == "ERROR":
+                        error_days.add(day)
+                    rows.append(sentiment)
+                    sources.append(article_source(article))
+                    row_days.append(day)
+                if new_records:
+                    run_in_background(save_article_records(new_records, revision))
+                yield {"event": "articles", "results": results, "sentiment": dict(counts)}
+        finally:
+            producer.cancel()
+            ARTICLES_PER_REQUEST.observe(fetched, endpoint="stream")
+
+        # 全件取得できた過去の日だけ日別集計を保存する（記事が0件の日も保存する）
+        closed = [
+            day for day in report.get('complete_days', [])
+            if day < today and day not in error_days
+        ]
+        if closed:
+            run_in_background(save_day_buckets(
+                query, {day: daily.get(day, empty_counts()) for day in closed}, revision
+            ))
+
+    if counts["total"] == 0:
+        raise HTTPException(
+            status_code=404,
+            detail=f"指定された条件（クエリ: {query}, 期間: {date_from} 〜 {date_to}）で記事が見つかりませんでした。\n別のキーワードや期間を試してみてください。"
+        )
+
+    result = AnalysisResult(
+        query=query,
+        date_from=date_from,
+        date_to=date_to,
+        article_count=counts["total"],
+        sentiment=counts,
+        daily={day: daily[day] for day in sorted(daily) if day},
+        # 保存済みの日別集計を使った日は含まない（statsのarticlesが対象記事数）
+        stats=summarize(rows, sources=sources, days=row_days)["stats"]
+    )
+    if deduper is not None:
+        result.stats["dedupe"] = {**deduper.stats(), 'weighting': DEDUPE_WEIGHTING}
+    yield {"event": "done", "result": result.model_dump()}
+
+@router.get("/analyze/stream")
+async def analyze_sentiment_stream(query: str, date_from: str, date_to: str):
+    """
+    感情分析の途中経過をServer-Sent Eventsで配信する
+    """
+    date_from, date_to = normalize_dates(date_from, date_to)
+
+    async def events():
+        try:
+            async for event in stream_analysis(query, date_from, date_to):
+                yield f"event: {event['event']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+        except HTTPException as he:
+            error = {"event": "error", "status_code": he.status_code, "detail": he.detail}
+            yield f"event: error\ndata: {json.dumps(error, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            ERRORS.inc(stage="api")
+            logger.exception("ストリーミング分析エラー", extra=fields(query=query))
+            error = {"event": "error", "status_code": 500, "detail": f"予期せぬエラーが発生しました: {str(e)}"}
+            yield f"event: error\ndata: {json.dumps(error, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def run_analysis_job(job: Job) -> Dict[str, Any]:
+    """
+    バックグラウンドジョブとして取得と分析を実行し、進捗を更新する
+    """
+    params = job.params
+    revision = await current_revision()
+    stored = await load_stored_result(params["query"], params["date_from"], params["date_to"], True, revision)
+    if stored is not None:
+        return stored.model_dump()
+
+    async for event in stream_analysis(params["query"], params["date_from"], params["date_to"]):
+        if event["event"] == "articles":
+            job.progress = {"processed": event["sentiment"]["total"], "sentiment": event["sentiment"]}
+        elif event["event"] == "done":
+            result = AnalysisResult(**event["result"])
+            result.created_at = datetime.now().isoformat()
+            save_in_background(result, True, revision)
+            return result.model_dump()
+
+job_manager = JobManager(run_analysis_job)
+
+async def score_articles(articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    記事の感情分析を他のリクエストとまとめて行う
+    """
+    return await analyze_texts([article_text(article) for article in articles])
+
+watchlist = Watchlist(get_news_fetcher, score_articles)
+
+@router.post("/jobs", response_model=JobStatus, status_code=202)
+async def create_job(query: str, date_from: str, date_to: str):
+    """
+    分析ジョブを登録し、ジョブIDをすぐに返す
+
+    同じ条件のジョブが実行待ち・実行中の場合はそのジョブを返す
+    """
+    date_from, date_to = normalize_dates(date_from, date_to)
+    params = {"query": query, "date_from": date_from, "date_to": date_to}
+    try:
+        job = job_manager.submit((query, date_from, date_to), params)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return job.to_dict()
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    """
+    ジョブの状態・進捗・結果を取得する
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="ジョブが見つかりません")
+    return job.to_dict()
+
+@router.get("/watchlist")
+async def get_watchlist():
+    """
+    ウォッチリストのキーワードごとの累積集計と、定期取得・利用枠の状態を取得する
+    """
+    await watchlist.load()
+    return {
+        **watchlist.stats(),
+        'items': [watchlist.get(keyword) for keyword in watchlist.keywords],
+    }
+
+@router.post("/watchlist", status_code=201)
+async def add_watchlist_keyword(keyword: str):
+    """
+    キーワードを定期取得の対象に追加する
+    """
+    keyword = keyword.strip()
+    if len(keyword) < 2:
+        raise HTTPException(status_code=400, detail="検索キーワードは2文字以上必要です")
+    return await watchlist.add(keyword)
+
+@router.get("/watchlist/{keyword}")
+async def get_watchlist_keyword(keyword: str):
+    """
+    キーワードの累積集計を取得する
+    """
+    await watchlist.load()
+    item = watchlist.get(keyword)
+    if item is None:
+        raise HTTPException(status_code=404, detail="ウォッチリストにないキーワードです")
+    return item
+
+@router.delete("/watchlist/{keyword}")
+async def remove_watchlist_keyword(keyword: str):
+    """
+    キーワードを定期取得の対象から外す
+    """
+    if not await watchlist.remove(keyword):
+        raise HTTPException(status_code=404, detail="ウォッチリストにないキーワードです")
+    return {'keyword': keyword, 'status': 'removed'}
+
+@router.post("/watchlist/{keyword}/poll")
+async def poll_watchlist_keyword(keyword: str):
+    """
+    キーワードの差分取得をすぐに実行する（利用枠が無い場合は429）
+    """
+    await watchlist.load()
+    if keyword not in watchlist.keywords:
+        raise HTTPException(status_code=404, detail="ウォッチリストにないキーワードです")
+    delay = watchlist.budget.delay()
+    if delay > 0:
+        raise HTTPException(
+            status_code=429,
+            detail="News APIの利用枠が不足しています",
+            headers={"Retry-After": str(int(delay) + 1)}
+        )
+    return await watchlist.poll(keyword)
+
 @router.get("/results/{query}")
 async def get_analysis_results(query: str):
     """
     過去の分析結果を取得する
     """
     try:
-        results = get_result(query)
+        results = await get_result(query)
         if not results:
             raise HTTPException(status_code=404, detail="No results found")
         return results
+    except HTTPException:
+        raise
     except Exception as e:
         error_detail = traceback.format_exc()
         raise HTTPException(
             status_code=500,
             detail=f"Error retrieving results: {str(e)}\n\nDetails:\n{error_detail}"
-        ) 
\ No newline at end of file
+        ) 
+
+@router.get("/analyzer/stats")
+async def get_analyzer_stats():
+    """
+    マイクロバッチスケジューラ・結果キャッシュ・リクエスト集約の統計情報を取得する
+    """
+    loaded = analyzer_loader.loaded
+    return {
+        **scheduler.stats(),
+        **analyzer_loader.status(),
+        'backend': get_analyzer().backend_info() if loaded else None,
+        'cache': get_analyzer().cache.stats() if loaded else None,
+        'singleflight': analysis_flight.stats()
+    }
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Prometheus形式のメトリクスを返す
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/healthz")
+async def healthz():
+    """
+    プロセスが応答できるかを返す（モデルの読み込み状態に関係なく200）
+    """
+    return {'status': 'ok'}
+
+@router.get("/readyz")
+async def readyz():
+    """
+    モデルの読み込み（とウォームアップ）が完了し、推論を受け付けられるかを返す
+    """
+    ready = analyzer_loader.ready
+    body = {
+        'status': 'ready' if ready else 'not_ready',
+        **analyzer_loader.status(),
+        'startup': startup.timings(),
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
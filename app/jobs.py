@@ -0,0 +1,165 @@
+import os
+import time
+import uuid
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from .logs import fields, get_logger
+from .metrics import ERRORS
+
+# ジョブを実行するワーカー数
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# 実行待ちジョブの上限
+JOB_QUEUE_SIZE = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+# 完了したジョブを保持する時間（秒）
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "3600"))
+
+logger = get_logger("jobs")
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobQueueFullError(Exception):
+    """実行待ちジョブが上限に達した"""
+
+
+class Job:
+    """
+    バックグラウンドで実行する分析ジョブ
+    """
+
+    def __init__(self, key: Hashable, params: Dict[str, Any]):
+        self.job_id = uuid.uuid4().hex
+        self.key = key
+        self.params = params
+        self.status = PENDING
+        self.progress: Dict[str, Any] = {}
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'params': self.params,
+            'progress': self.progress,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    上限付きキューとワーカープールでジョブを実行する
+
+    同じキーのジョブが実行待ち・実行中の場合は新しいジョブを作らず既存のジョブを返す
+    """
+
+    def __init__(
+        self,
+        runner: Callable[[Job], Awaitable[Any]],
+        workers: int = JOB_WORKERS,
+        max_queue: int = JOB_QUEUE_SIZE,
+        result_ttl: float = JOB_RESULT_TTL
+    ):
+        self.runner = runner
+        self.workers = workers
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self._jobs: Dict[str, Job] = {}
+        self._active: Dict[Hashable, Job] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+
+    def _ensure_started(self) -> None:
+        """
+        現在のイベントループ上でワーカーを起動する
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or not any(not task.done() for task in self._tasks):
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._tasks = [loop.create_task(self._work()) for _ in range(self.workers)]
+            # 以前のループで未完了だったジョブは再開できないため失敗扱いにする
+            for job in self._active.values():
+                job.status = FAILED
+                job.error = "ワーカーが再起動されたためジョブが中断されました"
+                job.finished_at = time.time()
+            self._active.clear()
+
+    def submit(self, key: Hashable, params: Dict[str, Any]) -> Job:
+        """
+        ジョブを登録し、すぐに返す
+        """
+        self._ensure_started()
+        self._purge()
+
+        existing = self._active.get(key)
+        if existing is not None:
+            return existing
+
+        job = Job(key, params)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise JobQueueFullError("実行待ちのジョブが上限に達しています")
+        self._jobs[job.job_id] = job
+        self._active[key] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def _purge(self) -> None:
+        """
+        保持期間を過ぎた完了済みジョブを削除する
+        """
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and now - job.finished_at > self.result_ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            job.status = RUNNING
+            job.started_at = time.time()
+            try:
+                job.result = await self.runner(job)
+                job.status = SUCCEEDED
+            except Exception as e:
+                ERRORS.inc(stage="job")
+                logger.exception("ジョブ実行エラー", extra=fields(job_id=job.job_id))
+                job.error = str(getattr(e, 'detail', None) or e)
+                job.status = FAILED
+            finally:
+                job.finished_at = time.time()
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+
+    def stats(self) -> Dict[str, Any]:
+        counts = {PENDING: 0, RUNNING: 0, SUCCEEDED: 0, FAILED: 0}
+        for job in self._jobs.values():
+            counts[job.status] += 1
+        return {
+            'workers': self.workers,
+            'queue_depth': self._queue.qsize() if self._queue else 0,
+            'max_queue': self.max_queue,
+            **counts,
+        }
@@ -0,0 +1,176 @@
+import os
+import re
+import threading
+import unicodedata
+from typing import Callable, Dict, List, Optional, Tuple
+from .logs import fields, get_logger
+
+# テキストの言語を推定し、言語ごとにまとめて推論するかどうか
+LANGUAGE_DETECTION = os.getenv("LANGUAGE_DETECTION", "1") == "1"
+# 文字種から判断できない（ラテン文字などの）テキストの言語
+DEFAULT_LANGUAGE = os.getenv("DEFAULT_LANGUAGE", "en")
+# 日本語のテキストをMeCab（fugashi）で形態素に分割してからトークン化するかどうか
+# （既定のモデルは分割前の文で学習されているため、分割はそれに合わせたモデルを使う場合に指定する）
+JAPANESE_SEGMENTATION = os.getenv("JAPANESE_SEGMENTATION", "0") == "1"
+# 言語ごとに使うモデル（例: "ja=org/japanese-model,ko=org/korean-model@v2"、リビジョンの省略時はmain）。
+# ラベルは既定のモデルと同じ1-5の評価であること
+SENTIMENT_LANGUAGE_MODELS = os.getenv("SENTIMENT_LANGUAGE_MODELS", "")
+# 言語の推定に使う先頭の文字数
+DETECT_CHARS = 200
+
+logger = get_logger("language")
+
+_KANA = re.compile(r"[\u3040-\u30ff\uff66-\uff9f]")
+_LATIN = re.compile(r"[A-Za-z\u00c0-\u024f]")
+# 文字種で言語が決まる文字（漢字は日本語の判定にも使う）
+_SCRIPTS = [
+    ('zh', re.compile(r"[\u4e00-\u9fff\u3400-\u4dbf]")),
+    ('ko', re.compile(r"[\uac00-\ud7af\u1100-\u11ff\u3130-\u318f]")),
+    ('ru', re.compile(r"[\u0400-\u04ff]")),
+    ('ar', re.compile(r"[\u0600-\u06ff]")),
+    ('he', re.compile(r"[\u0590-\u05ff]")),
+    ('el', re.compile(r"[\u0370-\u03ff]")),
+    ('th', re.compile(r"[\u0e00-\u0e7f]")),
+]
+# 単語を空白で区切らない言語（推定トークン数は文字数から求める）
+_UNSPACED = {'ja', 'zh', 'th'}
+
+
+def parse_language_models(value: str = SENTIMENT_LANGUAGE_MODELS) -> Dict[str, str]:
+    """
+    "ja=model,ko=model"形式の設定を言語→モデル名の辞書にする
+    """
+    models = {}
+    for entry in value.split(","):
+        language, _, model = entry.partition("=")
+        if language.strip() and model.strip():
+            models[language.strip().lower()] = model.strip()
+    return models
+
+
+def split_revision(spec: str) -> Tuple[str, str]:
+    """
+    "モデル名@リビジョン"をモデル名とリビジョンに分ける（リビジョンの省略時はmain）
+    """
+    model, _, revision = spec.partition("@")
+    return model, revision or "main"
+
+
+LANGUAGE_MODELS = parse_language_models()
+
+
+def detect_language(text: str, default: str = DEFAULT_LANGUAGE) -> str:
+    """
+    先頭DETECT_CHARS文字の文字種から言語を推定する
+
+    かなを含めば日本語、それ以外はラテン文字より多い文字種の言語とする（漢字だけのテキストは中国語）。
+    ラテン文字のテキスト（英語・ドイツ語など）は区別せずdefaultを返す
+    """
+    sample = text[:DETECT_CHARS]
+    latin = len(_LATIN.findall(sample))
+    counts = {language: len(pattern.findall(sample)) for language, pattern in _SCRIPTS}
+    kana = len(_KANA.findall(sample))
+    if kana and kana + counts['zh'] >= latin:
+        return 'ja'
+    language, count = max(counts.items(), key=lambda item: item[1])
+    return language if count > latin else default
+
+
+class JapaneseSegmenter:
+    """
+    MeCab（fugashi）で日本語のテキストを形態素に分割する
+
+    fugashiは最初に使う時に読み込み、辞書はunidic-lite、無ければipadicを使う。
+    どちらも使えない場合はNFKC正規化だけを行う
+    """
+
+    def __init__(self):
+        self._tagger = None
+        self._lock = threading.Lock()
+        self.available: Optional[bool] = None
+
+    def _load(self) -> None:
+        try:
+            import fugashi
+            try:
+                self._tagger = fugashi.Tagger()
+            except RuntimeError:
+                import ipadic
+                self._tagger = fugashi.GenericTagger(ipadic.MECAB_ARGS)
+            self.available = True
+        except (ImportError, RuntimeError) as e:
+            self.available = False
+            logger.warning("MeCabを使用できないため日本語は正規化のみ行います", extra=fields(error=str(e)))
+
+    def words(self, text: str) -> List[str]:
+        """
+        NFKC正規化したテキストを形態素の表層形のリストにする
+        """
+        text = unicodedata.normalize("NFKC", text)
+        # MeCabのTaggerはスレッドセーフではないため排他する
+        with self._lock:
+            if self.available is None:
+                self._load()
+            if self._tagger is None:
+                return [text] if text.strip() else []
+            return [word.surface for word in self._tagger(text)]
+
+
+japanese_segmenter = JapaneseSegmenter()
+
+
+def estimate_tokens(text: str, language: Optional[str]) -> int:
+    """
+    トークナイザーを実行せずにテキストのトークン数を見積もる（空白で区切らない言語は文字数、それ以外は単語数）
+    """
+    if language in _UNSPACED:
+        return len("".join(text.split()))
+    return len(text.split())
+
+
+def prepare(text: str, language: str) -> Tuple[str, int]:
+    """
+    言語に応じた前処理を行い、(モデルに渡すテキスト, 推定トークン数)を返す
+
+    日本語は形態素を空白で区切る。推定トークン数は同じ長さのテキストを
+    同じバッチにまとめるための目安で、トークナイザーは実行しない
+    """
+    if language == 'ja' and JAPANESE_SEGMENTATION:
+        words = japanese_segmenter.words(text)
+        if japanese_segmenter.available:
+            return " ".join(words), len(words)
+        text = "".join(words)
+    return text, estimate_tokens(text, language)
+
+
+def group_by_language(texts: List[str]) -> Dict[Optional[str], List[Tuple[int, str]]]:
+    """
+    テキストを言語ごとの(元の位置, 前処理後のテキスト)のリストにまとめる
+
+    各言語のリストは推定トークン数の順に並べるため、順に区切ると長さの近いテキストが
+    同じバッチに入る。LANGUAGE_DETECTION=0の場合は全テキストを言語Noneにまとめる
+    """
+    if not LANGUAGE_DETECTION:
+        return {None: list(enumerate(texts))}
+    groups: Dict[Optional[str], List[Tuple[int, int, str]]] = {}
+    for index, text in enumerate(texts):
+        language = detect_language(text)
+        prepared, length = prepare(text, language)
+        groups.setdefault(language, []).append((length, index, prepared))
+    return {
+        language: [(index, prepared) for _, index, prepared in sorted(items, key=lambda item: item[0])]
+        for language, items in groups.items()
+    }
+
+
+def route_batch(texts: List[str], analyze_group: Callable[[Optional[str], List[str]], List[dict]]) -> List[dict]:
+    """
+    テキストを言語ごとにまとめてanalyze_group(言語, テキスト)で推論し、結果を元の順に戻す
+
+    結果の'text'は前処理前の元のテキストにする
+    """
+    results: List[Optional[dict]] = [None] * len(texts)
+    for language, items in group_by_language(texts).items():
+        for (index, _), result in zip(items, analyze_group(language, [prepared for _, prepared in items])):
+            results[index] = {**result, 'text': texts[index]}
+    return results
@@ -0,0 +1,108 @@
+import os
+import sys
+import json
+import random
+import logging
+from datetime import datetime, timezone
+
+# ログレベル（DEBUG / INFO / WARNING / ERROR）
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# 出力形式（json: 1行1件のJSON / text: 人が読む形式）
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+# 記事・バッチごとなど頻度の高いログ（sample=True）を出力する割合（WARNING以上は常に出力）
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+
+_configured = False
+
+
+def fields(sample: bool = False, **values) -> dict:
+    """
+    ログに付ける構造化フィールド（loggerのextra引数に渡す）
+
+    sample=Trueのログは頻度の高い処理のものとしてLOG_SAMPLE_RATEの割合だけ出力する
+    """
+    return {'fields': values, 'sample': sample}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    ログを1行のJSONにする
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            **getattr(record, 'fields', {}),
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """
+    ログを「時刻 レベル ロガー名 メッセージ key=value ...」の形式にする
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        extra = getattr(record, 'fields', {})
+        if extra:
+            text += " " + " ".join(f"{key}={value}" for key, value in extra.items())
+        return text
+
+
+class SamplingFilter(logging.Filter):
+    """
+    sample=TrueのWARNING未満のログを一定の割合だけ通す
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, 'sample', False) and record.levelno < logging.WARNING:
+            return random.random() < self.rate
+        return True
+
+
+def configure(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, sample_rate: float = LOG_SAMPLE_RATE) -> None:
+    """
+    socialearのロガーに出力先を設定する（1回だけ）
+    """
+    global _configured
+    if _configured:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(TextFormatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    handler.addFilter(SamplingFilter(sample_rate))
+    root = logging.getLogger("socialear")
+    root.addHandler(handler)
+    root.setLevel(level)
+    root.propagate = False
+    _configured = True
+
+
+def redirect_to_stderr() -> None:
+    """
+    ログの出力先を標準エラー出力にする（CLIで標準出力に結果を書き出す場合）
+    """
+    configure()
+    for handler in logging.getLogger("socialear").handlers:
+        if isinstance(handler, logging.StreamHandler):
+            handler.setStream(sys.stderr)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    モジュール用のロガーを返す（例: get_logger("fetcher") → socialear.fetcher）
+    """
+    configure()
+    return logging.getLogger(f"socialear.{name}")
@@ -1,14 +1,18 @@
+import os
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
 from dotenv import load_dotenv
-import gradio as gr
-from .ui import create_ui
+from .startup import stage
 
 # .envファイルを読み込む
 load_dotenv()
 
-from .job_controller import router
+# Gradio UIを/uiに登録するかどうか（0の場合はgradioを読み込まない）
+ENABLE_UI = os.getenv("ENABLE_UI", "1") == "1"
+
+with stage("import_api"):
+    from .job_controller import router
 
 app = FastAPI(title="SocialEar API")
 
@@ -21,17 +25,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# ルートパスへのアクセスを/uiにリダイレクト
+# ルートパスへのアクセスを/ui（UIが無効の場合はAPIドキュメント）にリダイレクト
 @app.get("/")
 async def root():
-    return RedirectResponse(url="/ui")
+    return RedirectResponse(url="/ui" if ENABLE_UI else "/docs")
 
 # ルーターの登録
 app.include_router(router)
 
 # Gradioインターフェースの登録
-interface = create_ui()
-app = gr.mount_gradio_app(app, interface, path="/ui")
+if ENABLE_UI:
+    with stage("mount_ui"):
+        import gradio as gr
+        from .ui import create_ui
+
+        interface = create_ui()
+        app = gr.mount_gradio_app(app, interface, path="/ui")
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,191 @@
+import bisect
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# 秒単位のレイテンシ用のバケット
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# 件数用のバケット
+COUNT_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048)
+# 割合用のバケット
+RATIO_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0)
+
+_registry: List["_Metric"] = []
+_registry_lock = threading.Lock()
+
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """
+    単調増加するカウンタ
+    """
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """
+    出力時に関数で値を求めるゲージ
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, function: Callable[[], float]):
+        super().__init__(name, documentation)
+        self.function = function
+
+    def samples(self) -> List[str]:
+        return [f"{self.name} {_format_value(self.function())}"]
+
+
+class Histogram(_Metric):
+    """
+    累積バケット・合計・件数を持つヒストグラム
+    """
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # ラベルごとの[各バケットの件数..., +Infの件数], 合計
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def count(self, **labels) -> int:
+        entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def render(metrics: Optional[List[_Metric]] = None) -> str:
+    """
+    Prometheusのテキスト形式で全メトリクスを出力する
+    """
+    with _registry_lock:
+        targets = list(metrics if metrics is not None else _registry)
+    return "\n".join(metric.render() for metric in targets) + "\n"
+
+
+# アプリケーションのメトリクス
+NEWS_API_LATENCY = Histogram(
+    "socialear_news_api_request_seconds", "News APIへの1リクエストのレイテンシ", labels=("status",)
+)
+TOKENIZE_SECONDS = Histogram("socialear_tokenize_seconds", "1バッチのトークン化にかかった時間")
+INFERENCE_SECONDS = Histogram("socialear_inference_seconds", "モデル実行1回（token_budget以内の1バッチ）にかかった時間")
+INFERENCE_TOKENS = Counter(
+    "socialear_inference_tokens_total", "モデルに入力したトークン数（real: 実際のトークン、padded: パディングを含む）", labels=("kind",)
+)
+PADDING_EFFICIENCY = Histogram(
+    "socialear_padding_efficiency", "1バッチの推論で実際のトークンがパディングを含むトークンに占める割合", buckets=RATIO_BUCKETS
+)
+SCHEDULER_BATCH_SIZE = Histogram("socialear_scheduler_batch_size", "マイクロバッチのテキスト数", buckets=COUNT_BUCKETS)
+QUEUE_WAIT_SECONDS = Histogram("socialear_queue_wait_seconds", "テキストが推論されるまでのキューでの待ち時間")
+ARTICLES_PER_REQUEST = Histogram(
+    "socialear_articles_per_request", "1回の分析で処理した記事数", labels=("endpoint",), buckets=COUNT_BUCKETS
+)
+CACHE_LOOKUPS = Counter("socialear_cache_lookups_total", "感情分析キャッシュの検索結果", labels=("result",))
+ERRORS = Counter("socialear_errors_total", "処理段階ごとのエラー数", labels=("stage",))
+
+
+def observe_predict(
+    tokenize_s: float,
+    inference_s: float,
+    real_tokens: int = 0,
+    padded_tokens: int = 0,
+    batch_inference_s: Sequence[float] = ()
+) -> None:
+    """
+    1バッチ分のトークン化の所要時間とパディングを含むトークン数、モデル実行ごとの所要時間を記録する
+
+    batch_inference_sを省略した場合はinference_sを1回のモデル実行として記録する
+    """
+    TOKENIZE_SECONDS.observe(tokenize_s)
+    for seconds in batch_inference_s or [inference_s]:
+        INFERENCE_SECONDS.observe(seconds)
+    if padded_tokens:
+        INFERENCE_TOKENS.inc(real_tokens, kind="real")
+        INFERENCE_TOKENS.inc(padded_tokens, kind="padded")
+        PADDING_EFFICIENCY.observe(real_tokens / padded_tokens)
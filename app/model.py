@@ -1,12 +1,14 @@
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 class Sentiment(BaseModel):
     """感情分析のスコア"""
     sentiment: str
     score: float
-    text: str
+    rating: Optional[int] = None
+    probs: Optional[List[float]] = None
+    text: Optional[str] = None
 
 class Article(BaseModel):
     """ニュース記事"""
@@ -22,6 +24,17 @@ class AnalysisRequest(BaseModel):
     date_from: str
     date_to: str
 
+class BatchQuery(BaseModel):
+    """一括分析の1件分（期間を省略した場合は直近の期間）"""
+    query: str
+    date_from: Optional[str] = None
+    date_to: Optional[str] = None
+
+class BatchAnalysisRequest(BaseModel):
+    """一括分析リクエスト"""
+    queries: List[BatchQuery]
+    paginate: bool = False
+
 class AnalysisResult(BaseModel):
     """分析結果"""
     query: str
@@ -29,4 +42,18 @@ class AnalysisResult(BaseModel):
     date_to: str
     article_count: int
     sentiment: Dict[str, Any]
-    created_at: Optional[str] = None 
\ No newline at end of file
+    daily: Optional[Dict[str, Dict[str, int]]] = None
+    stats: Optional[Dict[str, Any]] = None
+    created_at: Optional[str] = None 
+
+class JobStatus(BaseModel):
+    """バックグラウンドジョブの状態"""
+    job_id: str
+    status: str
+    params: Dict[str, Any]
+    progress: Dict[str, Any] = {}
+    result: Optional[AnalysisResult] = None
+    error: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
@@ -0,0 +1,39 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+from .logs import fields, get_logger
+
+# プロセスの起動（このモジュールの読み込み）時刻
+_started = time.monotonic()
+# 起動処理の段階ごとの所要時間（ミリ秒）
+_timings: Dict[str, float] = {}
+
+logger = get_logger("startup")
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    起動処理の1段階の所要時間を記録する
+    """
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        elapsed = (time.monotonic() - started) * 1000
+        _timings[name] = elapsed
+        logger.info("起動処理", extra=fields(stage=name, elapsed_ms=round(elapsed, 1)))
+
+
+def record(name: str, elapsed_ms: float) -> None:
+    _timings[name] = elapsed_ms
+
+
+def timings() -> dict:
+    """
+    段階ごとの所要時間と、起動からの経過時間を返す
+    """
+    return {
+        'stages_ms': dict(_timings),
+        'uptime_ms': (time.monotonic() - _started) * 1000,
+    }
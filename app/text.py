@@ -0,0 +1,20 @@
+import os
+import re
+from typing import Any, Dict
+
+# 記事本文（content）も分析対象に含めるかどうか
+ANALYZE_CONTENT = os.getenv("ANALYZE_CONTENT", "0") == "1"
+# News APIのcontent末尾に付く省略表記（例: "... [+1234 chars]"）
+_TRUNCATION_MARK = re.compile(r"\s*\[\+\d+ chars\]\s*$")
+
+
+def article_text(article: Dict[str, Any]) -> str:
+    """
+    記事から分析対象のテキストを作成する
+
+    ANALYZE_CONTENT=1の場合は本文も含める（長文はウィンドウに分割して分析される）
+    """
+    text = f"{article.get('title', '')} {article.get('description', '')}"
+    if ANALYZE_CONTENT and article.get('content'):
+        text += " " + _TRUNCATION_MARK.sub("", article['content'])
+    return text
@@ -1,12 +1,26 @@
 import gradio as gr
 from datetime import datetime, timedelta
-from .job_controller import analyze_sentiment
+from .job_controller import normalize_dates, stream_analysis
+from .logs import fields, get_logger
+
+logger = get_logger("ui")
 
 def create_ui():
     """Gradioインターフェースを作成"""
     
+    def format_progress(counts: dict, done: bool = False) -> str:
+        """途中経過を表示用の文字列にする"""
+        status = "分析完了" if done else "分析中..."
+        return (
+            f"{status}\n"
+            f"処理済み記事数: {counts['total']}\n"
+            f"Positive: {counts['positive']}\n"
+            f"Negative: {counts['negative']}\n"
+            f"Neutral: {counts['neutral']}"
+        )
+
     async def process_input(query: str, days_ago: int):
-        """ユーザー入力を処理"""
+        """ユーザー入力を処理し、途中経過を順次表示する"""
         try:
             # 現在の日付を取得
             today = datetime.now()
@@ -14,20 +28,18 @@ def create_ui():
             date_from = (today - timedelta(days=days_ago)).strftime("%Y-%m-%d")
             date_to = today.strftime("%Y-%m-%d")
             
-            print(f"=== 日付計算 ===")
-            print(f"現在の日付: {today.strftime('%Y-%m-%d')}")
-            print(f"取得期間: {date_from} 〜 {date_to}")
-            
-            # 感情分析を実行
-            result = await analyze_sentiment(query, date_from, date_to)
-            return str(result)
+            # 感情分析を実行し、バッチごとに結果を表示
+            date_from, date_to = normalize_dates(date_from, date_to)
+            async for event in stream_analysis(query, date_from, date_to):
+                if event["event"] == "articles":
+                    yield format_progress(event["sentiment"])
+                elif event["event"] == "done":
+                    result = event["result"]
+                    yield format_progress(result["sentiment"], done=True)
         except Exception as e:
             error_msg = f"エラーが発生しました: {str(e)}"
-            print(f"UIエラー: {error_msg}")
-            print("エラーの詳細:")
-            import traceback
-            print(traceback.format_exc())
-            return error_msg
+            logger.exception("UIエラー", extra=fields(query=query))
+            yield error_msg
 
     # UIの作成
     with gr.Blocks(
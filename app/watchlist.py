@@ -0,0 +1,348 @@
+import os
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from .db import get_watch_keywords, get_watch_states, save_watch_keywords, save_watch_states
+from .fetcher import NEWS_API_BUDGET, NEWS_API_BUDGET_PERIOD, RateBudget, news_api_budget
+from .logs import fields, get_logger
+from .metrics import ARTICLES_PER_REQUEST, ERRORS, Counter
+
+# 定期取得するキーワード（カンマ区切り。APIで追加したキーワードは保存先に記録される）
+WATCHLIST = [keyword.strip() for keyword in os.getenv("WATCHLIST", "").split(",") if keyword.strip()]
+# 定期取得を行うかどうか
+WATCHLIST_ENABLED = os.getenv("WATCHLIST_ENABLED", "1") == "1"
+# キーワードごとの取得間隔（秒）。利用枠に収まらない場合は自動的に延ばす
+WATCHLIST_INTERVAL = float(os.getenv("WATCHLIST_INTERVAL", "900"))
+# 初回取得で遡る時間（時間）
+WATCHLIST_LOOKBACK_HOURS = float(os.getenv("WATCHLIST_LOOKBACK_HOURS", "24"))
+# 1回の取得で使う最大リクエスト数と最大記事数
+WATCHLIST_MAX_REQUESTS = int(os.getenv("WATCHLIST_MAX_REQUESTS", "3"))
+WATCHLIST_MAX_ARTICLES = int(os.getenv("WATCHLIST_MAX_ARTICLES", "300"))
+# 日別集計を保持する日数
+WATCHLIST_RETENTION_DAYS = int(os.getenv("WATCHLIST_RETENTION_DAYS", "30"))
+
+WATCHLIST_POLLS = Counter("socialear_watchlist_polls_total", "ウォッチリストの取得回数", labels=("result",))
+
+logger = get_logger("watchlist")
+
+
+def utc_timestamp(moment: datetime) -> str:
+    """
+    News APIのfrom・publishedAtと比較できる形式（YYYY-MM-DDTHH:MM:SS、UTC）にする
+    """
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def new_state(keyword: str) -> Dict[str, Any]:
+    """
+    キーワードの取得状態と累積集計の初期値
+    """
+    return {
+        'keyword': keyword,
+        # 取得済みの最新の公開日時と、その時刻に公開された記事のURL（次回の取得で再度返されるため）
+        'last_seen': None,
+        'boundary_urls': [],
+        'counts': {'positive': 0, 'negative': 0, 'neutral': 0, 'total': 0},
+        'daily': {},
+        # 1-5の評価ごとの記事数と確率の合計（平均評価・平均分布の計算用）
+        'ratings': [0] * 5,
+        'prob_sums': [0.0] * 5,
+        'scored': 0,
+        'polls': 0,
+        'requests': 0,
+        'skipped': 0,
+        'last_polled_at': None,
+        'last_error': None,
+    }
+
+
+def new_articles(state: Dict[str, Any], articles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    前回までに集計した記事を除き、公開日時の古い順に並べる
+    """
+    last_seen = state['last_seen']
+    boundary = set(state['boundary_urls'])
+    seen = set()
+    fresh = []
+    for article in articles:
+        published = (article.get('publishedAt') or '')[:19]
+        url = (article.get('url') or '').strip()
+        if url in seen:
+            continue
+        seen.add(url)
+        if last_seen and (published < last_seen or (published == last_seen and url in boundary)):
+            continue
+        fresh.append(article)
+    fresh.sort(key=lambda article: article.get('publishedAt') or '')
+    return fresh
+
+
+def apply_results(
+    state: Dict[str, Any],
+    articles: List[Dict[str, Any]],
+    sentiments: List[Dict[str, Any]],
+    retention_days: int = WATCHLIST_RETENTION_DAYS
+) -> None:
+    """
+    新しい記事の感情分析結果を累積集計に加え、取得済みの位置を進める
+    """
+    counts = state['counts']
+    for article, sentiment in zip(articles, sentiments):
+        label = sentiment.get('sentiment')
+        day = (article.get('publishedAt') or '')[:10]
+        bucket = state['daily'].setdefault(day, {'positive': 0, 'negative': 0, 'neutral': 0, 'total': 0})
+        for target in (counts, bucket):
+            if label in target:
+                target[label] += 1
+            target['total'] += 1
+        rating = sentiment.get('rating')
+        if rating:
+            state['ratings'][int(rating) - 1] += 1
+            probs = sentiment.get('probs') or [1.0 if i == int(rating) - 1 else 0.0 for i in range(5)]
+            state['prob_sums'] = [total + p for total, p in zip(state['prob_sums'], probs)]
+            state['scored'] += 1
+
+    days = sorted(state['daily'])
+    for day in days[:max(0, len(days) - retention_days)]:
+        del state['daily'][day]
+
+    if articles:
+        latest = max((article.get('publishedAt') or '')[:19] for article in articles)
+        if latest and (state['last_seen'] is None or latest > state['last_seen']):
+            state['boundary_urls'] = []
+            state['last_seen'] = latest
+        state['boundary_urls'] = sorted(set(state['boundary_urls']) | {
+            (article.get('url') or '').strip()
+            for article in articles
+            if (article.get('publishedAt') or '')[:19] == state['last_seen']
+        })
+
+
+def summarize_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    累積集計を返却用にまとめる（平均評価・平均分布を含む）
+    """
+    scored = state['scored']
+    return {
+        'keyword': state['keyword'],
+        'sentiment': state['counts'],
+        'daily': {day: state['daily'][day] for day in sorted(state['daily'])},
+        'mean_rating': round(sum((i + 1) * p for i, p in enumerate(state['prob_sums'])) / scored, 4) if scored else None,
+        'rating_distribution': [round(p / scored, 4) for p in state['prob_sums']] if scored else None,
+        'rating_counts': state['ratings'],
+        'last_seen': state['last_seen'],
+        'last_polled_at': state['last_polled_at'],
+        'last_error': state['last_error'],
+        'polls': state['polls'],
+        'requests': state['requests'],
+        'skipped': state['skipped'],
+    }
+
+
+class Watchlist:
+    """
+    キーワードごとに前回の取得以降の記事だけを定期的に取得・分析し、累積集計を更新する
+
+    取得はNews APIの共有の利用枠（RateBudget）が空くのを待って1キーワードずつ行い、
+    キーワード数に応じて取得間隔を延ばして利用枠に収める
+    """
+
+    def __init__(
+        self,
+        fetcher_factory: Callable[[], Any],
+        score: Callable[[List[Dict[str, Any]]], Awaitable[List[Dict[str, Any]]]],
+        keywords: Optional[List[str]] = None,
+        interval: float = WATCHLIST_INTERVAL,
+        lookback_hours: float = WATCHLIST_LOOKBACK_HOURS,
+        max_requests: int = WATCHLIST_MAX_REQUESTS,
+        max_articles: int = WATCHLIST_MAX_ARTICLES,
+        budget: RateBudget = news_api_budget,
+        budget_requests: int = NEWS_API_BUDGET,
+        budget_period: float = NEWS_API_BUDGET_PERIOD
+    ):
+        self.fetcher_factory = fetcher_factory
+        self.score = score
+        self.keywords: List[str] = list(dict.fromkeys(WATCHLIST if keywords is None else keywords))
+        self.base_interval = interval
+        self.lookback = timedelta(hours=lookback_hours)
+        self.max_requests = max_requests
+        self.max_articles = max_articles
+        self.budget = budget
+        self.budget_requests = budget_requests
+        self.budget_period = budget_period
+        self.states: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._next_due: Dict[str, float] = {}
+        self._changed: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loaded = False
+
+    def interval(self) -> float:
+        """
+        各キーワードの取得間隔（全キーワードを1回ずつ取得するのに必要な利用枠が回復する時間以上）
+        """
+        if self.budget_requests <= 0 or not self.keywords:
+            return self.base_interval
+        refill = self.budget_period / self.budget_requests
+        return max(self.base_interval, refill * len(self.keywords))
+
+    async def load(self) -> None:
+        """
+        保存されたキーワードと累積集計を読み込む
+        """
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            stored = await get_watch_keywords()
+            self.keywords = list(dict.fromkeys(self.keywords + stored))
+            self.states.update(await get_watch_states(self.keywords))
+        except Exception as e:
+            ERRORS.inc(stage="store")
+            logger.warning("ウォッチリストの読み込みに失敗しました", extra=fields(error=str(e)))
+
+    def start(self) -> None:
+        """
+        定期取得をバックグラウンドで開始する
+        """
+        if self._task is None or self._task.done():
+            self._changed = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _schedule(self) -> None:
+        """
+        新しいキーワードの初回取得時刻を取得間隔内で均等にずらして決める
+        """
+        loop = asyncio.get_running_loop()
+        interval = self.interval()
+        for keyword in list(self._next_due):
+            if keyword not in self.keywords:
+                del self._next_due[keyword]
+        for i, keyword in enumerate(self.keywords):
+            if keyword not in self._next_due:
+                self._next_due[keyword] = loop.time() + interval * i / len(self.keywords)
+
+    async def _run(self) -> None:
+        await self.load()
+        loop = asyncio.get_running_loop()
+        while True:
+            self._schedule()
+            if not self._next_due:
+                await self._changed.wait()
+                self._changed.clear()
+                continue
+            keyword = min(self._next_due, key=self._next_due.get)
+            delay = self._next_due[keyword] - loop.time()
+            if delay > 0:
+                # キーワードの追加・削除があれば予定を組み直す
+                try:
+                    await asyncio.wait_for(self._changed.wait(), delay)
+                    self._changed.clear()
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.budget.wait()
+            if keyword in self.keywords:
+                try:
+                    await self.poll(keyword)
+                except Exception:
+                    # エラーはpoll内で記録済み。次の予定時刻に再度取得する
+                    pass
+            self._next_due[keyword] = loop.time() + self.interval()
+
+    def _notify(self) -> None:
+        if self._changed is not None:
+            self._changed.set()
+
+    async def add(self, keyword: str) -> Dict[str, Any]:
+        await self.load()
+        if keyword not in self.keywords:
+            self.keywords.append(keyword)
+            await save_watch_keywords(self.keywords)
+            self._notify()
+        return summarize_state(self.states.get(keyword) or new_state(keyword))
+
+    async def remove(self, keyword: str) -> bool:
+        """
+        キーワードを定期取得の対象から外す（累積集計は保存先に残る）
+        """
+        await self.load()
+        if keyword not in self.keywords:
+            return False
+        self.keywords.remove(keyword)
+        await save_watch_keywords(self.keywords)
+        self._notify()
+        return True
+
+    def get(self, keyword: str) -> Optional[Dict[str, Any]]:
+        if keyword not in self.keywords:
+            return None
+        return summarize_state(self.states.get(keyword) or new_state(keyword))
+
+    async def poll(self, keyword: str) -> Dict[str, Any]:
+        """
+        前回の取得以降に公開された記事を取得し、新しい記事だけを分析して累積集計に加える
+        """
+        lock = self._locks.setdefault(keyword, asyncio.Lock())
+        async with lock:
+            state = self.states.get(keyword) or new_state(keyword)
+            since = state['last_seen'] or utc_timestamp(datetime.now(timezone.utc) - self.lookback)
+            report: Dict[str, Any] = {}
+            max_requests = max(1, min(self.max_requests, int(self.budget.available())))
+            state['polls'] += 1
+            state['last_polled_at'] = datetime.now().isoformat()
+            try:
+                articles = await self.fetcher_factory().fetch_since(
+                    keyword, since,
+                    max_articles=self.max_articles,
+                    max_requests=max_requests,
+                    report=report
+                )
+                fresh = new_articles(state, articles)
+                sentiments = await self.score(fresh) if fresh else []
+            except Exception as e:
+                state['requests'] += report.get('requests', 0)
+                state['last_error'] = str(getattr(e, 'detail', None) or e)
+                self.states[keyword] = state
+                WATCHLIST_POLLS.inc(result="error")
+                ERRORS.inc(stage="watchlist")
+                logger.warning("ウォッチリストの取得に失敗しました", extra=fields(keyword=keyword, error=state['last_error']))
+                raise
+
+            apply_results(state, fresh, sentiments)
+            state['requests'] += report.get('requests', 0)
+            state['skipped'] += report.get('skipped', 0)
+            state['last_error'] = None
+            self.states[keyword] = state
+            WATCHLIST_POLLS.inc(result="ok")
+            ARTICLES_PER_REQUEST.observe(len(fresh), endpoint="watchlist")
+            logger.info(
+                "ウォッチリストを更新しました",
+                extra=fields(
+                    keyword=keyword, since=since, fetched=len(articles), new=len(fresh),
+                    requests=report.get('requests', 0), skipped=report.get('skipped', 0)
+                )
+            )
+            try:
+                await save_watch_states({keyword: state})
+            except Exception as e:
+                ERRORS.inc(stage="store")
+                logger.warning("ウォッチリストの保存に失敗しました", extra=fields(keyword=keyword, error=str(e)))
+            return summarize_state(state)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'running': self._task is not None and not self._task.done(),
+            'keywords': list(self.keywords),
+            'interval_s': self.interval(),
+            'budget': self.budget.stats(),
+        }
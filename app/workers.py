@@ -0,0 +1,398 @@
+import os
+import queue
+import threading
+import multiprocessing
+from typing import Dict, List, Optional, Tuple
+from .cache import SentimentCache, cached_batch, make_cache_key
+from .language import LANGUAGE_MODELS, estimate_tokens, route_batch
+from .logs import fields, get_logger
+from .metrics import ERRORS, observe_predict
+
+# 推論ワーカープロセス数（0の場合はAPIプロセス内で推論する）
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "0"))
+# 1バッチの推論を待つ最大時間（秒）。超えた場合はワーカーを再起動する
+INFERENCE_WORKER_TIMEOUT = float(os.getenv("INFERENCE_WORKER_TIMEOUT", "120"))
+# ワーカーの起動（モデルの読み込み）を待つ最大時間（秒）
+INFERENCE_WORKER_START_TIMEOUT = float(os.getenv("INFERENCE_WORKER_START_TIMEOUT", "600"))
+# ワーカーをCPUコアに固定するかどうか
+INFERENCE_WORKER_PIN = os.getenv("INFERENCE_WORKER_PIN", "1") == "1"
+# 空いているワーカーの応答を確認する間隔（秒）。0以下の場合は推論時にだけ確認する
+INFERENCE_WORKER_CHECK_INTERVAL = float(os.getenv("INFERENCE_WORKER_CHECK_INTERVAL", "30"))
+
+logger = get_logger("workers")
+
+
+def available_cores() -> List[int]:
+    """
+    このプロセスが使用できるCPUコアの一覧を返す
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def split_cores(workers: int, cores: Optional[List[int]] = None) -> List[List[int]]:
+    """
+    CPUコアをワーカー数で連続した区間に分割する
+
+    ワーカー数がコア数以上の場合は1コアずつ順番に割り当てる
+    """
+    cores = sorted(cores if cores is not None else available_cores())
+    if not cores:
+        return [[] for _ in range(workers)]
+    if workers >= len(cores):
+        return [[cores[i % len(cores)]] for i in range(workers)]
+    size, extra = divmod(len(cores), workers)
+    groups = []
+    start = 0
+    for i in range(workers):
+        end = start + size + (1 if i < extra else 0)
+        groups.append(cores[start:end])
+        start = end
+    return groups
+
+
+def _worker_main(conn, cores: List[int]) -> None:
+    """
+    推論ワーカープロセスの本体
+
+    割り当てられたコアに固定してモデルを1つ読み込み、パイプで受け取ったバッチを推論する
+    """
+    if cores and INFERENCE_WORKER_PIN and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    try:
+        # 演算スレッド数は指定が無ければ割り当てコア数に合わせる
+        from .backends import INTRA_OP_THREADS, configure_threads
+        if cores and INTRA_OP_THREADS <= 0:
+            configure_threads(intra_op=len(cores))
+        # 結果のキャッシュを持たないモデルを1つ読み込む（キャッシュは親プロセスで行う）
+        from .analyzer import MODEL_WARMUP, WARMUP_TEXTS, SentimentAnalyzer
+        analyzer = SentimentAnalyzer(cache=SentimentCache(max_entries=0, db_path=None))
+        if MODEL_WARMUP:
+            # 再起動したワーカーも含め、準備完了を返す前にダミーのバッチで1回推論する
+            analyzer._predict(WARMUP_TEXTS)
+        conn.send(("ready", {
+            'pid': os.getpid(),
+            'model_name': analyzer.model_name,
+            'cache_revision': analyzer.cache_revision,
+            'token_budget': analyzer.token_budget,
+            **analyzer.backend_info(),
+        }))
+    except Exception as e:
+        conn.send(("error", f"モデルの読み込みに失敗しました: {str(e)}"))
+        return
+
+    while True:
+        try:
+            op, payload = conn.recv()
+        except (EOFError, OSError):
+            break
+        if op == "stop":
+            break
+        if op == "ping":
+            conn.send(("ok", os.getpid()))
+        elif op == "describe":
+            # 言語別のモデルを読み込み、結果のキャッシュキーに使うモデル名とリビジョンを返す
+            try:
+                model = analyzer.for_language(payload)
+                conn.send(("ok", {'model_name': model.model_name, 'cache_revision': model.cache_revision}))
+            except Exception as e:
+                conn.send(("error", str(e)))
+        elif op == "predict":
+            try:
+                # 所要時間は親プロセスのメトリクスに記録するため結果と一緒に返す
+                texts, language = payload
+                model = analyzer.for_language(language)
+                results = model._predict(texts)
+                conn.send(("ok", (results, model.last_timings)))
+            except Exception as e:
+                conn.send(("error", str(e)))
+
+
+class _Worker:
+    """
+    推論ワーカープロセス1つ分の状態
+    """
+
+    def __init__(self, index: int, cores: List[int]):
+        self.index = index
+        self.cores = cores
+        self.process = None
+        self.conn = None
+        self.info: dict = {}
+        self.restarts = 0
+        self.batches = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+
+class InferencePool:
+    """
+    CPUコアに固定した複数のプロセスでモデルを実行する推論ワーカープール
+
+    SentimentAnalyzerと同じインターフェース（analyze_batch・cache・backend_info）を持つ。
+    キャッシュはこのプロセスで確認し、キャッシュに無いテキストだけを空いているワーカーに送る。
+    ワーカーが異常終了・無応答の場合は再起動し、処理中だったバッチを1回だけ再送する。
+    空いているワーカーはcheck_intervalごとに応答を確認し、応答しなければ再起動する
+    """
+
+    def __init__(
+        self,
+        workers: int = INFERENCE_WORKERS,
+        batch_size: int = 32,
+        cache: Optional[SentimentCache] = None,
+        timeout: float = INFERENCE_WORKER_TIMEOUT,
+        start_timeout: float = INFERENCE_WORKER_START_TIMEOUT,
+        check_interval: float = INFERENCE_WORKER_CHECK_INTERVAL
+    ):
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.start_timeout = start_timeout
+        self.check_interval = check_interval
+        self.cache = cache if cache is not None else SentimentCache()
+        self.model_name: Optional[str] = None
+        self.cache_revision: Optional[str] = None
+        self.token_budget = 0
+        # 言語→その言語を推論するモデルの(モデル名, キャッシュ用のリビジョン)
+        self._language_models: Dict[str, Tuple[str, str]] = {}
+        # ワーカーがfork後にスレッドやモデルを引き継がないようspawnで起動する
+        self._context = multiprocessing.get_context("spawn")
+        self._workers = [
+            _Worker(i, cores) for i, cores in enumerate(split_cores(workers))
+        ]
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        self._stop_checks: Optional[threading.Event] = None
+
+    @property
+    def size(self) -> int:
+        return len(self._workers)
+
+    def _launch(self, worker: _Worker) -> None:
+        parent_conn, child_conn = self._context.Pipe()
+        worker.process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, worker.cores),
+            name=f"inference-worker-{worker.index}",
+            daemon=True
+        )
+        worker.process.start()
+        child_conn.close()
+        worker.conn = parent_conn
+
+    def _await_ready(self, worker: _Worker) -> None:
+        """
+        ワーカーのモデル読み込み完了を待つ
+        """
+        if not worker.conn.poll(self.start_timeout):
+            self._stop(worker)
+            raise RuntimeError(f"推論ワーカー{worker.index}が{self.start_timeout}秒以内に起動しませんでした")
+        try:
+            status, payload = worker.conn.recv()
+        except (EOFError, OSError):
+            self._stop(worker)
+            raise RuntimeError(f"推論ワーカー{worker.index}が起動中に終了しました")
+        if status != "ready":
+            self._stop(worker)
+            raise RuntimeError(payload)
+        worker.info = payload
+        logger.info("推論ワーカーを起動しました", extra=fields(worker=worker.index, pid=payload['pid'], cores=worker.cores))
+
+    def _stop(self, worker: _Worker) -> None:
+        """
+        ワーカーを停止する（応答しない場合は強制終了）
+        """
+        if worker.conn is not None:
+            try:
+                worker.conn.send(("stop", None))
+            except (EOFError, OSError):
+                pass
+            worker.conn.close()
+            worker.conn = None
+        if worker.process is not None:
+            worker.process.join(5)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+            worker.process = None
+
+    def _restart(self, worker: _Worker) -> None:
+        self._stop(worker)
+        worker.restarts += 1
+        logger.warning("推論ワーカーを再起動します", extra=fields(worker=worker.index, restarts=worker.restarts))
+        self._launch(worker)
+        self._await_ready(worker)
+
+    def start(self) -> None:
+        """
+        全ワーカーを起動する（モデルの読み込みは並列に行う）
+        """
+        with self._lock:
+            if self._started:
+                return
+            for worker in self._workers:
+                self._launch(worker)
+            try:
+                for worker in self._workers:
+                    self._await_ready(worker)
+            except Exception:
+                for worker in self._workers:
+                    self._stop(worker)
+                raise
+            info = self._workers[0].info
+            self.model_name = info['model_name']
+            self.cache_revision = info['cache_revision']
+            self.token_budget = info['token_budget']
+            for worker in self._workers:
+                self._idle.put(worker)
+            self._started = True
+            if self.check_interval > 0:
+                self._stop_checks = threading.Event()
+                threading.Thread(
+                    target=self._check_loop, args=(self._stop_checks,), name="inference-worker-check", daemon=True
+                ).start()
+
+    def close(self) -> None:
+        """
+        全ワーカーを停止する
+        """
+        with self._lock:
+            if self._stop_checks is not None:
+                self._stop_checks.set()
+                self._stop_checks = None
+            for worker in self._workers:
+                self._stop(worker)
+            self._idle = queue.Queue()
+            self._started = False
+
+    def analyze_batch(self, texts: List[str], batch_size: int = None) -> List[dict]:
+        """
+        複数テキストの感情分析をワーカーで実行する
+
+        キャッシュに結果があるテキストはワーカーに送らない
+        """
+        self.start()
+        batch_size = batch_size or self.batch_size
+        return route_batch(texts, lambda language, group: self._analyze_group(language, group, batch_size))
+
+    def _analyze_group(self, language: Optional[str], texts: List[str], batch_size: int) -> List[dict]:
+        model_name, cache_revision = self._language_model(language)
+        keys = [make_cache_key(text, model_name, cache_revision) for text in texts]
+        lengths = [estimate_tokens(text, language) for text in texts]
+        return cached_batch(
+            self.cache, texts, keys, lambda batch: self._predict(batch, language), batch_size, lengths, self.token_budget
+        )
+
+    def _language_model(self, language: Optional[str]) -> Tuple[str, str]:
+        """
+        languageを推論するモデルの(モデル名, キャッシュ用のリビジョン)を返す
+
+        言語別のモデルは最初に使う時にワーカーで読み込んで問い合わせるため、
+        プロセス内で推論する場合（for_language）と同じキャッシュキーになる
+        """
+        if not language or not LANGUAGE_MODELS.get(language):
+            return self.model_name, self.cache_revision
+        if language not in self._language_models:
+            worker = self._idle.get()
+            try:
+                info = self._request(worker, "describe", language, self.start_timeout)
+            finally:
+                self._idle.put(worker)
+            self._language_models[language] = (info['model_name'], info['cache_revision'])
+        return self._language_models[language]
+
+    def _predict(self, texts: List[str], language: Optional[str] = None) -> List[dict]:
+        """
+        空いているワーカーを1つ確保して1バッチを推論する（languageのモデルはワーカーで選ぶ）
+        """
+        worker = self._idle.get()
+        try:
+            return self._call(worker, texts, language)
+        finally:
+            self._idle.put(worker)
+
+    def _call(self, worker: _Worker, texts: List[str], language: Optional[str] = None) -> List[dict]:
+        results, timings = self._request(worker, "predict", (texts, language), self.timeout)
+        worker.batches += 1
+        observe_predict(**timings)
+        return results
+
+    def _request(self, worker: _Worker, op: str, payload, timeout: float):
+        """
+        ワーカーに1つの操作を送り、応答を返す
+
+        異常終了・無応答のワーカーは再起動し、同じ操作を1回だけ再送する
+        """
+        error = None
+        for _ in range(2):
+            try:
+                if not worker.alive:
+                    raise EOFError("プロセスが終了しています")
+                worker.conn.send((op, payload))
+                if not worker.conn.poll(timeout):
+                    raise TimeoutError(f"{timeout}秒以内に応答がありません")
+                status, reply = worker.conn.recv()
+            except (EOFError, OSError) as e:
+                error = e
+                ERRORS.inc(stage="worker")
+                logger.warning("推論ワーカーが応答しません", extra=fields(worker=worker.index, error=str(e)))
+                self._restart(worker)
+                continue
+            if status != "ok":
+                raise RuntimeError(reply)
+            return reply
+        raise RuntimeError(f"推論ワーカー{worker.index}での推論に失敗しました: {str(error)}")
+
+    def _check_loop(self, stop: threading.Event) -> None:
+        while not stop.wait(self.check_interval):
+            self.check()
+
+    def check(self) -> int:
+        """
+        空いているワーカーの応答を確認し、異常終了・無応答のワーカーを再起動する
+
+        推論中のワーカーは推論の応答で確認されるため対象にしない。確認したワーカー数を返す
+        """
+        idle = []
+        while len(idle) < self.size:
+            try:
+                idle.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        for worker in idle:
+            try:
+                self._request(worker, "ping", None, self.timeout)
+            except Exception as e:
+                logger.warning("推論ワーカーの確認に失敗しました", extra=fields(worker=worker.index, error=str(e)))
+            finally:
+                self._idle.put(worker)
+        return len(idle)
+
+    def health(self) -> List[dict]:
+        """
+        各ワーカーの状態を返す
+        """
+        return [
+            {
+                'index': worker.index,
+                'pid': worker.process.pid if worker.process is not None else None,
+                'alive': worker.alive,
+                'cores': worker.cores,
+                'restarts': worker.restarts,
+                'batches': worker.batches,
+            }
+            for worker in self._workers
+        ]
+
+    def backend_info(self) -> dict:
+        info = self._workers[0].info if self._started else {}
+        return {
+            'backend': info.get('backend'),
+            'agreement': info.get('agreement'),
+            'intra_op_threads': info.get('intra_op_threads'),
+            'inter_op_threads': info.get('inter_op_threads'),
+            'workers': self.health(),
+        }
@@ -0,0 +1,513 @@
+"""
+取得→分析→集計の性能を計測するベンチマーク
+
+フェイクのNews APIサーバー（合成記事または記録済みの記事を返す）を起動し、
+以下を計測してJSONで出力する。ネットワーク接続なしで実行できる（--modelを省略すると
+ランダムな重みの小さいBERTモデルを一時ディレクトリに作成して使う）
+
+- startup: アプリのimport時間（別プロセス）、torch・transformersのimport時間、SentimentAnalyzerの作成時間
+- analyzer: SentimentAnalyzer.analyze_batchのスループット・バッチごとのレイテンシ・パディング効率
+- fetcher: NewsFetcher.fetch_news_async / fetch_news_all / fetch_news（同期）のスループット・レイテンシ
+- analyze: POST /analyzeのエンドツーエンドのスループット・レイテンシ・マイクロバッチの大きさ
+
+使い方:
+    python scripts/benchmark.py --output bench.json
+    python scripts/benchmark.py --compare bench.json   # 前回の結果との比較を表示
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import resource
+import tempfile
+import subprocess
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+SOURCES = ["Reuters", "Associated Press", "BBC News", "Bloomberg", "The Guardian", "CNBC", "TechCrunch", "Al Jazeera"]
+SUBJECTS = ["Shares", "The company", "Investors", "The central bank", "Regulators", "The startup", "Consumers", "Analysts"]
+POSITIVE = ["surge after record profits", "welcome the strong results", "praise the new product", "rally on upbeat guidance"]
+NEGATIVE = ["slump after weak earnings", "warn of layoffs", "criticize the failed launch", "fall amid fraud allegations"]
+NEUTRAL = ["meet on Tuesday", "publish the quarterly report", "discuss the schedule", "announce a board meeting"]
+FILLER = (
+    "The announcement came as markets weighed the latest economic data and officials signaled "
+    "that further changes were possible in the coming months according to people familiar with the matter"
+).split()
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def latency_summary(values_ms: List[float]) -> Dict[str, float]:
+    return {
+        'count': len(values_ms),
+        'p50_ms': round(percentile(values_ms, 0.50), 2),
+        'p95_ms': round(percentile(values_ms, 0.95), 2),
+        'p99_ms': round(percentile(values_ms, 0.99), 2),
+        'max_ms': round(max(values_ms, default=0.0), 2),
+    }
+
+
+def peak_rss_mb() -> float:
+    """
+    このプロセスの最大常駐メモリ（MB）
+    """
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linuxはキロバイト、macOSはバイト
+    return round(usage / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def synthetic_corpus(count: int, days: int, duplicate_ratio: float, content_words: int, seed: int) -> List[Dict[str, Any]]:
+    """
+    News APIの形式の合成記事を作成する（duplicate_ratioの割合は他の記事の転載）
+    """
+    rng = random.Random(seed)
+    end = datetime.now().date() - timedelta(days=1)
+    articles = []
+    for i in range(count):
+        day = end - timedelta(days=rng.randrange(days))
+        published = datetime.combine(day, datetime.min.time()) + timedelta(seconds=rng.randrange(86400))
+        source = rng.choice(SOURCES)
+        if articles and rng.random() < duplicate_ratio:
+            original = rng.choice(articles)
+            title = original['title'].rsplit(" - ", 1)[0]
+            description = original['description']
+        else:
+            phrase = rng.choice(POSITIVE + NEGATIVE + NEUTRAL)
+            title = f"{rng.choice(SUBJECTS)} {phrase} ({i})"
+            description = " ".join(
+                [rng.choice(SUBJECTS).lower(), phrase] + rng.sample(FILLER, rng.randint(8, len(FILLER)))
+            ) + "."
+        body = " ".join(rng.choice(FILLER) for _ in range(content_words))
+        articles.append({
+            'source': {'id': None, 'name': source},
+            'author': None,
+            'title': f"{title} - {source}",
+            'description': description,
+            'url': f"https://news.example.com/{source.lower().replace(' ', '-')}/{i}",
+            'publishedAt': published.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            'content': f"{body[:200]}… [+{max(0, len(body) - 200)} chars]",
+        })
+    articles.sort(key=lambda article: article['publishedAt'], reverse=True)
+    return articles
+
+
+async def start_fake_news_api(articles: List[Dict[str, Any]], latency_ms: float):
+    """
+    News APIの/v2/everythingを模したサーバーを起動する（期間・ページで絞り込む）
+    """
+    from aiohttp import web
+
+    async def everything(request):
+        if latency_ms > 0:
+            await asyncio.sleep(latency_ms / 1000)
+        query = request.query
+        date_from = query.get('from', '')[:19]
+        date_to = query.get('to', '9999')[:19]
+        if len(date_to) == 10:
+            date_to += "T23:59:59"
+        matched = [a for a in articles if date_from <= a['publishedAt'][:19] <= date_to]
+        page = int(query.get('page', '1'))
+        size = int(query.get('pageSize', '100'))
+        return web.json_response({
+            'status': 'ok',
+            'totalResults': len(matched),
+            'articles': matched[(page - 1) * size:page * size],
+        })
+
+    app = web.Application()
+    app.router.add_get("/v2/everything", everything)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/v2/everything"
+
+
+def make_tiny_model(directory: str) -> str:
+    """
+    ダウンロード不要なランダムな重みの小さいBERTモデルを作成する（ラベルは本番モデルと同じ形式）
+    """
+    from transformers import BertConfig, BertForSequenceClassification, BertTokenizerFast
+
+    words = sorted({
+        word.lower().strip(".,()")
+        for text in SUBJECTS + POSITIVE + NEGATIVE + NEUTRAL + FILLER + SOURCES
+        for word in text.split()
+    })
+    vocab_file = os.path.join(directory, "vocab.txt")
+    with open(vocab_file, "w") as f:
+        f.write("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + words + list("0123456789-().,")))
+    labels = ["1 star", "2 stars", "3 stars", "4 stars", "5 stars"]
+    config = BertConfig(
+        vocab_size=len(words) + 20,
+        hidden_size=128,
+        num_hidden_layers=2,
+        num_attention_heads=2,
+        intermediate_size=256,
+        num_labels=5,
+        id2label=dict(enumerate(labels)),
+        label2id={label: i for i, label in enumerate(labels)}
+    )
+    path = os.path.join(directory, "model")
+    BertForSequenceClassification(config).save_pretrained(path)
+    BertTokenizerFast(vocab_file).save_pretrained(path)
+    return path
+
+
+STARTUP_CODE = """
+import json, time, resource
+started = time.perf_counter()
+import app.main
+app_import_s = time.perf_counter() - started
+started = time.perf_counter()
+import torch, transformers
+torch_import_s = time.perf_counter() - started
+from app.analyzer import SentimentAnalyzer
+from app.cache import SentimentCache
+started = time.perf_counter()
+analyzer = SentimentAnalyzer(cache=SentimentCache(max_entries=0, db_path=None))
+model_load_s = time.perf_counter() - started
+print(json.dumps({
+    'app_import_s': app_import_s,
+    'torch_import_s': torch_import_s,
+    'model_load_s': model_load_s,
+    'backend': analyzer.backend.name,
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+}))
+"""
+
+
+def bench_startup() -> Dict[str, Any]:
+    """
+    新しいプロセスでアプリのimport（モデルは読み込まない）・torchのimport・モデルの作成の時間を計測する
+    """
+    env = {**os.environ, 'ENABLE_UI': '0', 'MODEL_PRELOAD': '0'}
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", STARTUP_CODE], cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    process_s = time.perf_counter() - started
+    if output.returncode != 0:
+        return {'error': output.stderr.strip().splitlines()[-1:]}
+    measured = json.loads(output.stdout.strip().splitlines()[-1])
+    return {
+        'app_import_s': round(measured['app_import_s'], 3),
+        'torch_import_s': round(measured['torch_import_s'], 3),
+        'model_load_s': round(measured['model_load_s'], 3),
+        'process_s': round(process_s, 3),
+        'backend': measured['backend'],
+        'peak_rss_mb': round(measured['max_rss_kb'] / (1024 * 1024 if sys.platform == "darwin" else 1024), 1),
+    }
+
+
+def bench_analyzer(analyzer, texts: List[str], batch_size: int) -> Dict[str, Any]:
+    """
+    キャッシュなしでanalyze_batchを実行し、スループットとパディング効率を計測する
+
+    スケジューラと同じくSCHEDULER_MAX_BATCH_SIZE件ずつ渡し、batch_sizeは1回の推論の最大件数とする
+    """
+    from app.analyzer import MAX_LENGTH, SCHEDULER_MAX_BATCH_SIZE
+
+    from app.metrics import INFERENCE_TOKENS
+
+    analyzer._predict(texts[:batch_size])  # ウォームアップ
+    real_before = INFERENCE_TOKENS.value(kind="real")
+    padded_before = INFERENCE_TOKENS.value(kind="padded")
+    latencies = []
+    started = time.perf_counter()
+    for start in range(0, len(texts), SCHEDULER_MAX_BATCH_SIZE):
+        batch_started = time.perf_counter()
+        analyzer.analyze_batch(texts[start:start + SCHEDULER_MAX_BATCH_SIZE], batch_size=batch_size)
+        latencies.append((time.perf_counter() - batch_started) * 1000)
+    elapsed = time.perf_counter() - started
+    # 長さ順のバッチで実際にモデルに入力したトークン数とパディングを含むトークン数の比
+    real = INFERENCE_TOKENS.value(kind="real") - real_before
+    padded = INFERENCE_TOKENS.value(kind="padded") - padded_before
+
+    # 比較用: 入力順にbatch_size件ずつ区切った場合の比
+    unsorted_real = unsorted_padded = windows = 0
+    for start in range(0, len(texts), batch_size):
+        encoded = analyzer.tokenizer(
+            texts[start:start + batch_size], truncation=True, max_length=MAX_LENGTH,
+            padding=True, return_overflowing_tokens=analyzer.max_chunks > 1,
+            stride=analyzer.chunk_stride if analyzer.max_chunks > 1 else 0
+        )
+        mask = encoded['attention_mask']
+        windows += len(mask)
+        unsorted_real += sum(sum(row) for row in mask)
+        unsorted_padded += len(mask) * len(mask[0])
+    return {
+        'texts': len(texts),
+        'batch_size': batch_size,
+        'scheduler_batch_size': SCHEDULER_MAX_BATCH_SIZE,
+        'articles_per_s': round(len(texts) / elapsed, 2),
+        'batch_latency': latency_summary(latencies),
+        'token_budget': analyzer.token_budget,
+        'padding_efficiency': round(real / padded, 4) if padded else None,
+        'unsorted_padding_efficiency': round(unsorted_real / unsorted_padded, 4) if unsorted_padded else None,
+        'windows_per_text': round(windows / len(texts), 3) if texts else None,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+async def bench_fetcher(base_url: str, days: List[str], requests: int, concurrency: int) -> Dict[str, Any]:
+    """
+    NewsFetcherで1ページ取得（fetch_news_async）と全ページ取得（fetch_news_all）、
+    同期呼び出し用の1ページ取得（fetch_news、呼び出しごとにセッションを作成）を計測する
+
+    fetch_newsは同期のUIと同じく別スレッドから呼び出す
+    """
+    from app.fetcher import NewsFetcher
+
+    fetcher = NewsFetcher(api_key="benchmark", base_url=base_url)
+    results = {}
+    try:
+        for name in ("fetch_news_async", "fetch_news_all", "fetch_news"):
+            if name == "fetch_news":
+                async def method(*args):
+                    return await asyncio.to_thread(fetcher.fetch_news, *args)
+            else:
+                method = getattr(fetcher, name)
+            semaphore = asyncio.Semaphore(concurrency)
+            latencies = []
+            articles = 0
+
+            async def one(i: int):
+                nonlocal articles
+                async with semaphore:
+                    started = time.perf_counter()
+                    fetched = await method(f"benchmark {i}", days[-1], days[0])
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    articles += len(fetched)
+
+            started = time.perf_counter()
+            await asyncio.gather(*[one(i) for i in range(requests)])
+            elapsed = time.perf_counter() - started
+            results[name] = {
+                'requests': requests,
+                'articles': articles,
+                'articles_per_s': round(articles / elapsed, 2),
+                'latency': latency_summary(latencies),
+            }
+    finally:
+        await fetcher.close()
+    results['peak_rss_mb'] = peak_rss_mb()
+    return results
+
+
+async def bench_analyze(days: List[str], requests: int, concurrency: int, paginate: bool) -> Dict[str, Any]:
+    """
+    POST /analyzeをエンドツーエンドで計測する（取得・重複除去・推論・集計を含む）
+    """
+    import httpx
+    from fastapi import FastAPI
+    from app import job_controller
+    from app.analyzer import analyzer_loader, scheduler
+
+    analyzer_loader.load()
+    app = FastAPI()
+    app.include_router(job_controller.router)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    articles = 0
+    errors = 0
+    batches_before = scheduler.stats()['batches']
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None) as client:
+        async def one(i: int):
+            nonlocal articles, errors
+            async with semaphore:
+                params = {
+                    'query': f"benchmark {i}",
+                    'date_from': days[-1],
+                    'date_to': days[0],
+                    'paginate': str(paginate).lower(),
+                }
+                started = time.perf_counter()
+                response = await client.post("/analyze", params=params)
+                latencies.append((time.perf_counter() - started) * 1000)
+                if response.status_code == 200:
+                    articles += response.json()['article_count']
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*[one(i) for i in range(requests)])
+        elapsed = time.perf_counter() - started
+    await job_controller.close_news_fetcher()
+
+    stats = scheduler.stats()
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'paginate': paginate,
+        'errors': errors,
+        'articles': articles,
+        'articles_per_s': round(articles / elapsed, 2),
+        'requests_per_s': round(requests / elapsed, 2),
+        'latency': latency_summary(latencies),
+        'scheduler': {
+            'batches': stats['batches'] - batches_before,
+            'avg_batch_size': round(stats['avg_batch_size'], 2),
+            'max_batch_size': stats['max_batch_size'],
+            'wait_ms_p95': round(stats['wait_ms_p95'], 2),
+            'inference_ms_p95': round(stats['inference_ms_p95'], 2),
+        },
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def flatten(data: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> None:
+    """
+    前回の結果と数値指標を比較して表示する
+    """
+    before = flatten(baseline.get('results', {}))
+    after = flatten(current.get('results', {}))
+    print(f"\n=== 比較: {baseline.get('commit')} → {current.get('commit')} ===")
+    for name in sorted(set(before) & set(after)):
+        old, new = before[name], after[name]
+        change = f"{(new - old) / old:+.1%}" if old else "n/a"
+        print(f"{name:55s} {old:>12} → {new:>12} ({change})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="取得→分析→集計のベンチマーク")
+    parser.add_argument("--model", help="感情分析モデル（省略時はランダムな重みの小さいモデルを作成）")
+    parser.add_argument("--articles", type=int, default=2000, help="合成記事の件数")
+    parser.add_argument("--days", type=int, default=7, help="記事を分布させる日数")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.2, help="転載記事の割合")
+    parser.add_argument("--content-words", type=int, default=0, help="本文の単語数（ANALYZE_CONTENT=1の計測用）")
+    parser.add_argument("--fixture", help="記録済みの記事（News APIの応答JSONまたは記事の配列）")
+    parser.add_argument("--save-fixture", help="使用した記事をJSONに保存する")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=20, help="/analyzeと取得の計測でのリクエスト数")
+    parser.add_argument("--concurrency", type=int, default=4, help="同時リクエスト数")
+    parser.add_argument("--api-latency-ms", type=float, default=20, help="フェイクNews APIの応答遅延")
+    parser.add_argument("--no-paginate", action="store_true", help="/analyzeを1ページのみの取得で計測する")
+    parser.add_argument("--sections", default="startup,analyzer,fetcher,analyze")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="結果のJSONの出力先（省略時は標準出力）")
+    parser.add_argument("--compare", help="比較する前回の結果のJSON")
+    args = parser.parse_args()
+    sections = set(args.sections.split(","))
+
+    if args.fixture:
+        with open(args.fixture) as f:
+            data = json.load(f)
+        articles = data['articles'] if isinstance(data, dict) else data
+    else:
+        articles = synthetic_corpus(args.articles, args.days, args.duplicate_ratio, args.content_words, args.seed)
+    if args.save_fixture:
+        with open(args.save_fixture, "w") as f:
+            json.dump({'status': 'ok', 'totalResults': len(articles), 'articles': articles}, f, ensure_ascii=False)
+    days = sorted({article['publishedAt'][:10] for article in articles}, reverse=True)
+
+    workdir = tempfile.mkdtemp(prefix="socialear-bench-")
+    model = args.model or make_tiny_model(workdir)
+
+    async def serve_and_run():
+        runner, base_url = await start_fake_news_api(articles, args.api_latency_ms)
+        # アプリのモジュールは設定を読み込み時に参照するため、importより前に設定する
+        os.environ.update({
+            'SENTIMENT_MODEL': model,
+            'SENTIMENT_BATCH_SIZE': str(args.batch_size),
+            'NEWS_API_KEY': os.getenv('NEWS_API_KEY', 'benchmark'),
+            'NEWS_API_BASE_URL': base_url,
+            'RESULT_STORE': 'none',
+            'SINGLEFLIGHT_TTL': '0',
+            'SENTIMENT_CACHE_SIZE': '0',
+            'SENTIMENT_CACHE_DB': '',
+            'MODEL_WARMUP': '1',
+        })
+        results: Dict[str, Any] = {}
+        try:
+            loop = asyncio.get_running_loop()
+            if "startup" in sections:
+                results['startup'] = await loop.run_in_executor(None, bench_startup)
+            if "analyzer" in sections:
+                from app.analyzer import SentimentAnalyzer
+                from app.cache import SentimentCache
+                from app.text import article_text
+                analyzer = SentimentAnalyzer(cache=SentimentCache(max_entries=0, db_path=None))
+                texts = [article_text(article) for article in articles]
+                results['analyzer'] = bench_analyzer(analyzer, texts, args.batch_size)
+            if "fetcher" in sections:
+                results['fetcher'] = await bench_fetcher(base_url, days, args.requests, args.concurrency)
+            if "analyze" in sections:
+                results['analyze'] = await bench_analyze(days, args.requests, args.concurrency, not args.no_paginate)
+        finally:
+            await runner.cleanup()
+        return results
+
+    results = asyncio.run(serve_and_run())
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec="seconds"),
+        'python': sys.version.split()[0],
+        'cpu_count': os.cpu_count(),
+        'config': {
+            'model': args.model or "tiny-random-bert",
+            'articles': len(articles),
+            'days': len(days),
+            'batch_size': args.batch_size,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'api_latency_ms': args.api_latency_ms,
+            'env': {
+                name: os.environ[name]
+                for name in ("SENTIMENT_BACKEND", "INFERENCE_WORKERS", "SENTIMENT_MAX_CHUNKS",
+                             "ANALYZE_CONTENT", "DEDUPE_ENABLED", "DEDUPE_WEIGHTING")
+                if name in os.environ
+            },
+        },
+        'results': results,
+    }
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+        print(f"結果を保存しました: {args.output}")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import pytest
+from app.aggregate import probability_matrix, summarize
+
+
+def test_summarize_counts_and_stats():
+    """件数・平均評価・信頼度で重み付けした件数を求める"""
+    results = [
+        {'sentiment': 'positive', 'score': 0.8, 'rating': 5, 'probs': [0.0, 0.0, 0.0, 0.2, 0.8]},
+        {'sentiment': 'negative', 'score': 0.6, 'rating': 1, 'probs': [0.6, 0.4, 0.0, 0.0, 0.0]},
+        {'sentiment': 'neutral', 'score': 1.0, 'rating': 3},
+        {'sentiment': 'ERROR', 'score': 0.0},
+    ]
+    summary = summarize(results)
+    assert summary['counts'] == {'negative': 1, 'neutral': 1, 'positive': 1, 'total': 4}
+
+    stats = summary['stats']
+    assert stats['articles'] == 3
+    assert stats['errors'] == 1
+    # 期待値: 4.8, 1.4, 3.0
+    assert stats['mean_rating'] == pytest.approx((4.8 + 1.4 + 3.0) / 3, abs=1e-4)
+    assert stats['weighted'] == {'negative': 0.6, 'neutral': 1.0, 'positive': 0.8}
+    assert stats['rating_percentiles']['p50'] == pytest.approx(3.0)
+    assert sum(stats['rating_distribution']) == pytest.approx(1.0, abs=1e-3)
+
+
+def test_summarize_breakdowns():
+    """情報源別・日別の内訳を求める"""
+    results = [
+        {'sentiment': 'positive', 'score': 0.9, 'rating': 4},
+        {'sentiment': 'negative', 'score': 0.9, 'rating': 2},
+        {'sentiment': 'positive', 'score': 0.9, 'rating': 5},
+    ]
+    stats = summarize(
+        results,
+        sources=["BBC", "CNN", "BBC"],
+        days=["2024-01-01", "2024-01-01", "2024-01-02"]
+    )['stats']
+    assert stats['by_source']['BBC'] == {
+        'negative': 0, 'neutral': 0, 'positive': 2, 'total': 2, 'mean_rating': 4.5
+    }
+    assert stats['by_source']['CNN']['negative'] == 1
+    assert stats['by_day']['2024-01-01']['total'] == 2
+    assert stats['by_day']['2024-01-02']['mean_rating'] == 5.0
+
+
+def test_empty_results():
+    summary = summarize([], sources=[], days=[])
+    assert summary['counts']['total'] == 0
+    assert summary['stats']['mean_rating'] is None
+    assert probability_matrix([]).shape == (0, 5)
@@ -0,0 +1,308 @@
+import time
+import asyncio
+import threading
+import pytest
+from app.analyzer import AnalyzerLoader, BatchScheduler
+
+
+def test_scheduler_batches_concurrent_requests():
+    """同時に投入されたテキストは1回の推論にまとめられる"""
+    calls = []
+
+    def batch_fn(texts):
+        calls.append(list(texts))
+        return [{'text': text} for text in texts]
+
+    async def main():
+        scheduler = BatchScheduler(batch_fn, max_batch_size=8, max_wait_ms=20)
+        results = await asyncio.gather(*[scheduler.submit(f"t{i}") for i in range(5)])
+        assert [r['text'] for r in results] == [f"t{i}" for i in range(5)]
+        assert scheduler.stats()['batches'] == 1
+
+    asyncio.run(main())
+    assert calls == [["t0", "t1", "t2", "t3", "t4"]]
+
+
+def test_scheduler_runs_batches_in_parallel_up_to_concurrency():
+    """concurrencyの数までバッチを同時に推論する"""
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def batch_fn(texts):
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.pop()
+        return [{'text': text} for text in texts]
+
+    async def main():
+        scheduler = BatchScheduler(batch_fn, max_batch_size=2, max_wait_ms=1, concurrency=2)
+        results = await scheduler.submit_many([f"t{i}" for i in range(8)])
+        assert [r['text'] for r in results] == [f"t{i}" for i in range(8)]
+
+    asyncio.run(main())
+    assert max(peak) == 2
+
+
+def test_scheduler_cuts_batches_at_max_size_and_max_wait():
+    """max_batch_size件に達するか、max_wait_msが経過した時点でバッチを区切る"""
+    calls = []
+
+    def batch_fn(texts):
+        calls.append(list(texts))
+        return [{'text': text} for text in texts]
+
+    async def main():
+        scheduler = BatchScheduler(batch_fn, max_batch_size=3, max_wait_ms=30)
+        await scheduler.submit_many([f"t{i}" for i in range(7)])
+        # 1件だけの場合もmax_wait_msまで後続を待ってから推論する
+        started = time.monotonic()
+        await scheduler.submit("late")
+        return time.monotonic() - started
+
+    waited = asyncio.run(main())
+    assert calls == [["t0", "t1", "t2"], ["t3", "t4", "t5"], ["t6"], ["late"]]
+    assert 0.025 <= waited < 1
+
+
+def test_scheduler_propagates_errors_to_every_waiting_caller():
+    """推論に失敗したバッチの全ての呼び出し元に例外を返し、次のバッチは通常どおり推論する"""
+    def batch_fn(texts):
+        if "bad" in texts:
+            raise RuntimeError("model failed")
+        return [{'text': text} for text in texts]
+
+    async def main():
+        scheduler = BatchScheduler(batch_fn, max_batch_size=8, max_wait_ms=20)
+        outcomes = await asyncio.gather(
+            scheduler.submit("a"), scheduler.submit("bad"), scheduler.submit("c"), return_exceptions=True
+        )
+        after = await scheduler.submit("ok")
+        return outcomes, after
+
+    outcomes, after = asyncio.run(main())
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+    assert after == {'text': "ok"}
+
+
+def test_loader_creates_instance_once_and_warms_up():
+    """モデルは最初に必要になった時に1回だけ作成され、ウォームアップ後にreadyになる"""
+    created = []
+
+    class FakeAnalyzer:
+        def __init__(self):
+            self.predicted = []
+            created.append(self)
+
+        def _predict(self, texts):
+            self.predicted.append(texts)
+            return []
+
+    loader = AnalyzerLoader(FakeAnalyzer, warmup=True)
+    assert loader.status()['model'] == "loading"
+    asyncio.run(loader.load_in_background())
+    assert loader.ready
+    assert loader.get() is loader.get()
+    assert len(created) == 1
+    assert len(created[0].predicted) == 1
+
+
+def test_loader_reports_failure():
+    """読み込みに失敗した場合はエラーを返す"""
+    def factory():
+        raise RuntimeError("model not found")
+
+    loader = AnalyzerLoader(factory)
+    asyncio.run(loader.load_in_background())
+    assert not loader.ready
+    assert loader.status() == {'model': "failed", 'error': "model not found"}
+
+
+def test_lazy_loader_is_ready_until_load_fails():
+    """起動時に読み込まない場合は読み込み前から受け付け、失敗した場合だけ受け付けない"""
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("model not found")
+        return object()
+
+    loader = AnalyzerLoader(factory, warmup=True, preload=False)
+    assert loader.ready and loader.status()['model'] == "lazy"
+    with pytest.raises(RuntimeError):
+        loader.get()
+    assert not loader.ready
+    loader.get()
+    assert loader.ready and loader.status()['model'] == "ready"
+
+
+def make_tiny_model(tmp_path):
+    """good・badだけの語彙を持つ小さいBERTモデルを保存する"""
+    from transformers import BertConfig, BertForSequenceClassification, BertTokenizerFast
+
+    vocab_file = tmp_path / "vocab.txt"
+    vocab_file.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "good", "bad"]))
+    tokenizer = BertTokenizerFast(str(vocab_file))
+    labels = ["1 star", "2 stars", "3 stars", "4 stars", "5 stars"]
+    config = BertConfig(
+        vocab_size=7,
+        hidden_size=16,
+        num_hidden_layers=1,
+        num_attention_heads=2,
+        intermediate_size=32,
+        num_labels=5,
+        id2label=dict(enumerate(labels)),
+        label2id={label: i for i, label in enumerate(labels)}
+    )
+    model_dir = tmp_path / "model"
+    BertForSequenceClassification(config).save_pretrained(model_dir)
+    tokenizer.save_pretrained(model_dir)
+    return model_dir
+
+
+class CountingBackend:
+    """ウィンドウ内のgood/badの数で1つ星か5つ星を返す"""
+    name = "torch"
+
+    def __init__(self):
+        self.shapes = []
+
+    def predict_logits(self, encoded):
+        import numpy as np
+
+        ids = encoded["input_ids"].numpy()
+        self.shapes.append(ids.shape)
+        logits = np.zeros((len(ids), 5), dtype=np.float32)
+        logits[:, 0] = (ids == 6).sum(axis=1)
+        logits[:, 4] = (ids == 5).sum(axis=1)
+        return logits
+
+
+def test_long_text_is_scored_over_all_windows(tmp_path):
+    """長文は先頭だけでなく全ウィンドウの確率分布の平均で評価される"""
+    from app.analyzer import SentimentAnalyzer
+    from app.cache import SentimentCache
+
+    model_dir = make_tiny_model(tmp_path)
+    text = "good " * 600 + "bad " * 1400
+    results = {}
+    for max_chunks in (1, 8):
+        analyzer = SentimentAnalyzer(
+            model_name=str(model_dir),
+            cache=SentimentCache(db_path=None),
+            batch_size=2,
+            max_chunks=max_chunks
+        )
+        analyzer.backend = CountingBackend()
+        results[max_chunks] = analyzer._predict([text, "good"])
+
+    assert results[1][0]['rating'] == 5
+    assert results[8][0]['rating'] == 1
+    assert results[8][1]['rating'] == 5
+
+
+def test_plan_batches_by_token_budget():
+    """短い順に並べ、件数×最長のトークン数が予算を超えず、件数がbatch_size以下の範囲でまとめる"""
+    from app.batching import plan_batches
+
+    lengths = [500, 10, 12, 300, 11, 600]
+    assert plan_batches(lengths, token_budget=40, batch_size=32) == [[1, 4, 2], [3], [0], [5]]
+    assert plan_batches(lengths, token_budget=1024, batch_size=32) == [[1, 4, 2], [3, 0], [5]]
+    assert plan_batches(lengths, token_budget=1024, batch_size=2) == [[1, 4], [2, 3], [0], [5]]
+    assert plan_batches(lengths, token_budget=0, batch_size=4) == [[1, 4, 2, 3], [0, 5]]
+
+
+def test_length_bucketing_keeps_results_in_input_order(tmp_path):
+    """長さ順にまとめて推論しても結果は入力の順に返り、入力順に区切るよりパディングが減る"""
+    from app.analyzer import SentimentAnalyzer
+    from app.cache import SentimentCache
+    from app.metrics import INFERENCE_SECONDS
+
+    model_dir = make_tiny_model(tmp_path)
+    texts = ["good " * 200 + "bad", "bad", "good good " * 50, "bad " * 300 + "good", "good", "bad bad"]
+    ratings = {}
+    padding = {}
+    for budget in (0, 512):
+        analyzer = SentimentAnalyzer(
+            model_name=str(model_dir), cache=SentimentCache(db_path=None), batch_size=2, token_budget=budget
+        )
+        analyzer.backend = CountingBackend()
+        observed = INFERENCE_SECONDS.count()
+        results = analyzer._predict(texts)
+        assert [result['text'] for result in results] == texts
+        # モデル実行の時間はバッチごとに記録される
+        assert len(analyzer.last_timings['batch_inference_s']) == len(analyzer.backend.shapes) > 1
+        assert INFERENCE_SECONDS.count() - observed == len(analyzer.backend.shapes)
+        ratings[budget] = [result['rating'] for result in results]
+        padding[budget] = analyzer.last_timings['padded_tokens']
+        assert analyzer.last_timings['real_tokens'] == sum(len(t.split()) + 2 for t in texts)
+        if budget:
+            assert all(rows * width <= budget for rows, width in analyzer.backend.shapes)
+
+    assert ratings[0] == ratings[512] == [5, 1, 5, 1, 5, 1]
+    lengths = [len(text.split()) + 2 for text in texts]
+    unsorted = sum(max(lengths[i:i + 2]) * 2 for i in range(0, len(lengths), 2))
+    assert padding[0] < unsorted and padding[512] < unsorted
+
+
+def test_predict_empty_batch(tmp_path):
+    """空のバッチはトークナイザーもモデルも実行せずに空の結果を返す"""
+    from app.analyzer import SentimentAnalyzer
+    from app.cache import SentimentCache
+
+    analyzer = SentimentAnalyzer(model_name=str(make_tiny_model(tmp_path)), cache=SentimentCache(db_path=None))
+    analyzer.backend = CountingBackend()
+    assert analyzer.predict_encoded(analyzer.encode([])) == []
+    assert analyzer.backend.shapes == []
+
+
+def test_analyze_batch_returns_results_in_input_order(tmp_path):
+    """analyze_batchはbatch_size件以内ずつまとめて推論し、入力の順に結果を返す"""
+    from app.analyzer import SentimentAnalyzer
+    from app.cache import SentimentCache
+
+    analyzer = SentimentAnalyzer(
+        model_name=str(make_tiny_model(tmp_path)), cache=SentimentCache(db_path=None), batch_size=2
+    )
+    analyzer.backend = CountingBackend()
+    texts = ["good", "bad bad", "good good good", "bad", "good bad good"]
+    results = analyzer.analyze_batch(texts)
+    assert [result['text'] for result in results] == texts
+    assert [result['rating'] for result in results] == [5, 1, 5, 1, 5]
+    assert all(rows <= 2 for rows, _ in analyzer.backend.shapes)
+    assert sum(rows for rows, _ in analyzer.backend.shapes) == len(texts)
+    assert analyzer.analyze_batch([]) == []
+
+
+def test_analyze_text_tokenizes_once_and_keeps_input_text(tmp_path):
+    """analyze_textはトークン化を1回だけ行い、デコードせずに入力文字列をそのまま返す"""
+    from app.analyzer import SentimentAnalyzer
+    from app.cache import SentimentCache
+
+    class RecordingTokenizer:
+        def __init__(self, inner):
+            self.inner = inner
+            self.calls = 0
+
+        def __call__(self, *args, **kwargs):
+            self.calls += 1
+            return self.inner(*args, **kwargs)
+
+        def __getattr__(self, name):
+            return getattr(self.inner, name)
+
+        def decode(self, *args, **kwargs):
+            raise AssertionError("デコードは行わない")
+
+    analyzer = SentimentAnalyzer(model_name=str(make_tiny_model(tmp_path)), cache=SentimentCache(db_path=None))
+    analyzer.backend = CountingBackend()
+    analyzer.tokenizer = RecordingTokenizer(analyzer.tokenizer)
+    text = "  GOOD   news!  "
+    result = analyzer.analyze_text(text)
+    assert result['text'] == text
+    assert result['rating'] == 5
+    assert analyzer.tokenizer.calls == 1
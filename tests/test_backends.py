@@ -0,0 +1,58 @@
+import pytest
+from transformers import BertConfig, BertForSequenceClassification, BertTokenizerFast
+from app.backends import TorchBackend, create_backend, label_agreement
+
+VOCAB = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "good", "bad", "news", "market", "the", "."]
+
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory):
+    """ダウンロード不要な小さいBERTモデル"""
+    vocab_file = tmp_path_factory.mktemp("vocab") / "vocab.txt"
+    vocab_file.write_text("\n".join(VOCAB))
+    tokenizer = BertTokenizerFast(str(vocab_file))
+    config = BertConfig(
+        vocab_size=len(VOCAB),
+        hidden_size=16,
+        num_hidden_layers=1,
+        num_attention_heads=2,
+        intermediate_size=32,
+        num_labels=5
+    )
+    return BertForSequenceClassification(config).eval(), tokenizer
+
+
+def test_backends_produce_logits(tiny_model, tmp_path):
+    """各バックエンドが(バッチ, ラベル数)のlogitsを返す"""
+    model, tokenizer = tiny_model
+    encoded = tokenizer(["good news", "the market is bad ."], padding=True, return_tensors="pt")
+    names = ["torch", "torch-int8"]
+    try:
+        import onnxruntime  # noqa: F401
+        import onnx  # noqa: F401
+        names.append("onnx")
+    except ImportError:
+        pass
+    for name in names:
+        if name == "onnx":
+            from app.backends import OnnxBackend
+            backend = OnnxBackend(model, "tiny", cache_dir=str(tmp_path))
+        else:
+            backend = create_backend(name, model, "tiny")
+        assert backend.name == name
+        assert backend.predict_logits(encoded).shape == (2, 5)
+
+
+def test_label_agreement(tiny_model):
+    """同じモデル同士の一致率は1になる"""
+    model, tokenizer = tiny_model
+    baseline = TorchBackend(model)
+    assert label_agreement(baseline, baseline, tokenizer) == 1.0
+    agreement = label_agreement(baseline, create_backend("torch-int8", model, "tiny"), tokenizer)
+    assert 0.0 <= agreement <= 1.0
+
+
+def test_unknown_backend(tiny_model):
+    model, _ = tiny_model
+    with pytest.raises(ValueError):
+        create_backend("tensorrt", model, "tiny")
@@ -0,0 +1,116 @@
+import json
+import threading
+import pytest
+from app.backfill import Backfill, iter_lines, load_checkpoint
+
+
+class FakeAnalyzer:
+    """goodを含むテキストは5つ星、それ以外は1つ星にする"""
+
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+        self.predicted = 0
+        self.encode_threads = set()
+
+    def for_language(self, language):
+        return self
+
+    def encode(self, texts):
+        self.encode_threads.add(threading.current_thread().name)
+        return {'texts': list(texts)}
+
+    def predict_encoded(self, encoded):
+        if self.fail_after is not None and self.predicted >= self.fail_after:
+            raise RuntimeError("推論中に停止しました")
+        self.predicted += 1
+        return [
+            {'sentiment': 'positive', 'score': 0.9, 'rating': 5, 'probs': [0, 0, 0, 0, 1]} if "good" in text
+            else {'sentiment': 'negative', 'score': 0.9, 'rating': 1, 'probs': [1, 0, 0, 0, 0]}
+            for text in encoded['texts']
+        ]
+
+
+def write_dump(path, count):
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            if i == 7:
+                f.write("{broken\n")
+            elif i == 11:
+                f.write("\n")
+            else:
+                word = "good" if i % 2 else "bad"
+                f.write(json.dumps({'id': i, 'title': f"{word} news {i}", 'url': f"https://example.com/{i}"}) + "\n")
+
+
+def read_rows(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_iter_lines_resumes_from_offset(tmp_path):
+    path = tmp_path / "dump.jsonl"
+    path.write_bytes(b"a\nbb\n\nccc")
+    lines = list(iter_lines(str(path)))
+    assert lines == [(0, 2, b"a"), (2, 5, b"bb"), (5, 6, b""), (6, 9, b"ccc")]
+    assert list(iter_lines(str(path), 5)) == lines[2:]
+    assert list(iter_lines(str(path), 9)) == []
+
+
+def test_backfill_writes_rows_in_input_order(tmp_path):
+    dump = tmp_path / "dump.jsonl"
+    write_dump(dump, 20)
+    output = tmp_path / "scores.jsonl"
+    analyzer = FakeAnalyzer()
+    backfill = Backfill(analyzer, str(dump), str(output), batch_size=4, prefetch=1,
+                        text_of=lambda record: record['title'])
+    summary = backfill.run()
+
+    rows = read_rows(output)
+    assert [row.get('id') for row in rows] == [None if i == 7 else i for i in range(20) if i != 11]
+    assert (summary['records'], summary['scored'], summary['errors']) == (19, 18, 1)
+    assert rows[7]['error'] and 'rating' not in rows[7]
+    assert rows[1]['rating'] == 5 and rows[2]['rating'] == 1
+    assert analyzer.encode_threads == {"backfill-producer"}
+    assert load_checkpoint(str(output) + ".checkpoint")['offset'] == dump.stat().st_size
+
+
+def test_backfill_resumes_after_crash_without_duplicates(tmp_path):
+    """中断後の再実行はチェックポイント以降から再開し、途中まで書かれた行は書き直す"""
+    dump = tmp_path / "dump.jsonl"
+    write_dump(dump, 30)
+    output = tmp_path / "scores.jsonl"
+    options = {'batch_size': 3, 'prefetch': 2, 'checkpoint_every': 2, 'text_of': lambda record: record['title']}
+
+    with pytest.raises(RuntimeError):
+        Backfill(FakeAnalyzer(fail_after=5), str(dump), str(output), **options).run()
+    checkpoint = load_checkpoint(str(output) + ".checkpoint")
+    assert checkpoint['records'] == 12
+    assert len(read_rows(output)) == 15
+
+    summary = Backfill(FakeAnalyzer(), str(dump), str(output), **options).run()
+    assert summary['processed'] == 29 - 12
+    resumed = read_rows(output)
+
+    Backfill(FakeAnalyzer(), str(dump), str(tmp_path / "full.jsonl"), **options).run()
+    assert resumed == read_rows(tmp_path / "full.jsonl")
+
+
+def test_backfill_skips_batches_without_valid_records(tmp_path, monkeypatch):
+    """不正な行だけのバッチはトークン化・推論せずにエラー行を書き出す"""
+    from app import language
+
+    monkeypatch.setattr(language, "LANGUAGE_DETECTION", False)
+    dump = tmp_path / "dump.jsonl"
+    dump.write_text("{broken\n[1\n" + json.dumps({'id': 2, 'title': "good news"}) + "\n", encoding="utf-8")
+    output = tmp_path / "scores.jsonl"
+
+    class CountingAnalyzer(FakeAnalyzer):
+        def encode(self, texts):
+            assert texts, "空のバッチをトークン化しました"
+            return super().encode(texts)
+
+    summary = Backfill(CountingAnalyzer(), str(dump), str(output), batch_size=2,
+                       text_of=lambda record: record['title']).run()
+    rows = read_rows(output)
+    assert (summary['scored'], summary['errors']) == (1, 2)
+    assert 'error' in rows[0] and 'error' in rows[1] and rows[2]['rating'] == 5
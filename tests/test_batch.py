@@ -0,0 +1,82 @@
+import asyncio
+import json
+import httpx
+from fastapi import FastAPI, HTTPException
+from app import job_controller
+from app.batch import parse_queries, run_batch
+from app.fetcher import RateBudget
+from app.model import AnalysisResult
+
+
+def make_result(query, date_from, date_to):
+    return AnalysisResult(
+        query=query,
+        date_from=date_from,
+        date_to=date_to,
+        article_count=2,
+        sentiment={"positive": 1, "negative": 1, "neutral": 0, "total": 2},
+        stats={"mean_rating": 3.0}
+    )
+
+
+def test_parse_queries_accepts_jsonl_and_plain_lines():
+    lines = [
+        '{"query": "apple", "date_from": "2024-01-01", "date_to": "2024-01-07"}',
+        "",
+        "# コメント",
+        "banana",
+    ]
+    items = parse_queries(lines, days=3)
+    assert items[0] == {'query': "apple", 'date_from': "2024-01-01", 'date_to': "2024-01-07"}
+    assert items[1]['query'] == "banana"
+    assert items[1]['date_from'] < items[1]['date_to']
+
+
+def test_run_batch_limits_concurrency_and_reports_errors():
+    """同時実行数を守り、失敗したクエリはエラーの行として返す"""
+    running = {'now': 0, 'max': 0}
+
+    async def analyze(query, date_from, date_to):
+        running['now'] += 1
+        running['max'] = max(running['max'], running['now'])
+        await asyncio.sleep(0.01)
+        running['now'] -= 1
+        if query == "missing":
+            raise HTTPException(status_code=404, detail="記事が見つかりませんでした")
+        return make_result(query, date_from, date_to)
+
+    items = [{'query': q, 'date_from': "2024-01-01", 'date_to': "2024-01-02"} for q in ["a", "b", "missing", "c", "d"]]
+
+    async def scenario():
+        return [row async for row in run_batch(items, analyze, concurrency=2, budget=RateBudget(0, 1))]
+
+    rows = sorted(asyncio.run(scenario()), key=lambda row: row['index'])
+    assert running['max'] == 2
+    assert [row['status'] for row in rows] == ["ok", "ok", "error", "ok", "ok"]
+    assert rows[2]['error'] == "記事が見つかりませんでした"
+    assert rows[0]['positive'] == 1 and rows[0]['mean_rating'] == 3.0
+
+
+def test_batch_endpoint_streams_ndjson(monkeypatch):
+    async def analyze_query(query, date_from, date_to, paginate=False):
+        return make_result(query, date_from, date_to)
+
+    monkeypatch.setattr(job_controller, "analyze_query", analyze_query)
+    app = FastAPI()
+    app.include_router(job_controller.router)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            ok = await client.post("/analyze/batch", json={'queries': [
+                {'query': "apple", 'date_from': "2024-01-01", 'date_to': "2024-01-07"},
+                {'query': "banana"},
+            ]})
+            empty = await client.post("/analyze/batch", json={'queries': []})
+            return ok, empty
+
+    ok, empty = asyncio.run(scenario())
+    assert ok.headers['content-type'].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in ok.text.splitlines()]
+    assert sorted(row['query'] for row in rows) == ["apple", "banana"]
+    assert empty.status_code == 400
@@ -0,0 +1,109 @@
+import pytest
+from app import cache as cache_module
+from app.cache import SentimentCache, make_cache_key, normalize_text
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(cache_module, "time", fake)
+    return fake
+
+
+def test_cache_key_normalization():
+    """正規化後に同じテキストは同じキーになる"""
+    assert normalize_text("  Stock\tRISES\n today ") == "stock rises today"
+    key = make_cache_key("Stock rises", "model-a")
+    assert key == make_cache_key("  stock   RISES ", "model-a")
+    assert key != make_cache_key("Stock rises", "model-b")
+    assert key != make_cache_key("Stock rises", "model-a", revision="v2")
+
+
+def test_lru_eviction(clock):
+    """上限を超えると最も古く使われたエントリが削除される"""
+    cache = SentimentCache(max_entries=2, ttl=0, db_path=None)
+    cache.set("a", {'sentiment': 'positive'})
+    cache.set("b", {'sentiment': 'negative'})
+    assert cache.get("a") == {'sentiment': 'positive'}
+    cache.set("c", {'sentiment': 'neutral'})
+    assert cache.get("b") is None
+    assert cache.get_many(["a", "c"]).keys() == {"a", "c"}
+    stats = cache.stats()
+    assert stats['evictions'] == 1
+    assert stats['memory_hits'] == 3
+    assert stats['misses'] == 1
+
+
+def test_ttl_expiry(clock):
+    """有効期限を過ぎたエントリはミスになる"""
+    cache = SentimentCache(max_entries=10, ttl=60, db_path=None)
+    cache.set("a", {'sentiment': 'positive'})
+    clock.now += 59
+    assert cache.get("a") is not None
+    clock.now += 2
+    assert cache.get("a") is None
+
+
+def test_disk_tier(tmp_path, clock):
+    """ディスク層の結果は別インスタンスからも参照できる"""
+    db_path = str(tmp_path / "cache.db")
+    SentimentCache(max_entries=10, ttl=60, db_path=db_path).set("a", {'sentiment': 'negative', 'score': 0.9})
+
+    cache = SentimentCache(max_entries=10, ttl=60, db_path=db_path)
+    assert cache.get("a") == {'sentiment': 'negative', 'score': 0.9}
+    assert cache.get("a") is not None
+    assert cache.stats()['disk_hits'] == 1
+    assert cache.stats()['memory_hits'] == 1
+
+    clock.now += 120
+    assert SentimentCache(max_entries=10, ttl=60, db_path=db_path).get("a") is None
+
+
+def test_disk_tier_deletes_expired_rows(tmp_path, clock):
+    """ディスク層の期限切れの行は読み込み時と登録時に削除される"""
+    db_path = str(tmp_path / "cache.db")
+    cache = SentimentCache(max_entries=10, ttl=60, db_path=db_path)
+    cache.set_many([("a", {'sentiment': 'positive'}), ("b", {'sentiment': 'negative'})])
+
+    def disk_keys():
+        return sorted(key for key, in cache._db.execute("SELECT key FROM sentiment_cache"))
+
+    clock.now += 120
+    assert SentimentCache(max_entries=10, ttl=60, db_path=db_path).get("a") is None
+    assert disk_keys() == ["b"]
+
+    cache.set("c", {'sentiment': 'neutral'})
+    assert disk_keys() == ["c"]
+
+
+def test_cached_batch_groups_misses_by_length():
+    """推定トークン数を渡すと、キャッシュに無いテキストを長さの近い順に件数・予算以内でまとめる"""
+    from app.cache import cached_batch
+
+    cache = SentimentCache(db_path=None)
+    cache.set_many([(make_cache_key("cached", "m"), {'sentiment': 'positive', 'score': 1.0})])
+    texts = ["a " * 50, "b", "cached", "c " * 60, "d d", "b"]
+    keys = [make_cache_key(text, "m") for text in texts]
+    lengths = [len(text.split()) for text in texts]
+    calls = []
+
+    def predict(batch):
+        calls.append(batch)
+        return [{'sentiment': 'neutral', 'score': 0.5} for _ in batch]
+
+    results = cached_batch(cache, texts, keys, predict, batch_size=2, lengths=lengths, token_budget=100)
+    assert calls == [["b", "d d"], ["a " * 50], ["c " * 60]]
+    assert [result['text'] for result in results] == texts
+    assert results[2]['sentiment'] == 'positive'
+
+    calls.clear()
+    cached_batch(SentimentCache(db_path=None), texts, keys, predict, batch_size=2)
+    assert [len(batch) for batch in calls] == [2, 2, 1]
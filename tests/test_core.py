@@ -5,15 +5,14 @@ from app.model import Article, Sentiment, AnalysisResult
 def test_sentiment_model():
     """感情分析モデルのテスト"""
     sentiment = Sentiment(
-        positive=75.5,
-        negative=10.2,
-        neutral=12.3,
-        mixed=2.0
+        sentiment="positive",
+        score=0.75,
+        rating=4
     )
-    assert sentiment.positive == 75.5
-    assert sentiment.negative == 10.2
-    assert sentiment.neutral == 12.3
-    assert sentiment.mixed == 2.0
+    assert sentiment.sentiment == "positive"
+    assert sentiment.score == 0.75
+    assert sentiment.rating == 4
+    assert sentiment.text is None
 
 def test_article_model():
     """記事モデルのテスト"""
@@ -31,21 +30,21 @@ def test_article_model():
 
 def test_analysis_result_model():
     """分析結果モデルのテスト"""
-    sentiment = Sentiment(
-        positive=75.5,
-        negative=10.2,
-        neutral=12.3,
-        mixed=2.0
-    )
+    sentiment = {
+        "positive": 6,
+        "negative": 3,
+        "neutral": 1,
+        "total": 10
+    }
     result = AnalysisResult(
         query="テスト",
         date_from="2023-01-01",
         date_to="2023-12-31",
         sentiment=sentiment,
-        total_articles=10
+        article_count=10
     )
     assert result.query == "テスト"
     assert result.date_from == "2023-01-01"
     assert result.date_to == "2023-12-31"
     assert result.sentiment == sentiment
-    assert result.total_articles == 10 
\ No newline at end of file
+    assert result.article_count == 10 
\ No newline at end of file
@@ -0,0 +1,79 @@
+import asyncio
+from app.db import (
+    MemoryResultStore,
+    ResultRepository,
+    SQLiteResultStore,
+    fetch_variant,
+    item_to_result,
+    make_window,
+    result_to_item
+)
+from app.model import AnalysisResult
+
+
+def make_result(date_from, date_to, positive):
+    return AnalysisResult(
+        query="stock",
+        date_from=date_from,
+        date_to=date_to,
+        article_count=positive,
+        sentiment={"positive": positive, "negative": 0, "neutral": 0, "total": positive},
+        created_at=f"{date_to}T12:00:00"
+    )
+
+
+def test_sqlite_store_round_trip(tmp_path):
+    """保存した分析結果を期間で取得できる"""
+    store = SQLiteResultStore(str(tmp_path / "results.db"))
+    result = make_result("2024-01-01", "2024-01-07", 5)
+    store.put(result_to_item(result))
+
+    item = store.get("stock", make_window("2024-01-01", "2024-01-07"))
+    assert item_to_result(item) == result
+    assert store.get("stock", make_window("2024-01-01", "2024-01-07", paginate=True)) is None
+    assert store.get("other", make_window("2024-01-01", "2024-01-07")) is None
+
+
+def test_sqlite_store_latest(tmp_path):
+    """クエリのみの検索では最新の分析結果を返す"""
+    store = SQLiteResultStore(str(tmp_path / "results.db"))
+    store.put(result_to_item(make_result("2024-01-01", "2024-01-07", 5)))
+    store.put(result_to_item(make_result("2024-01-02", "2024-01-08", 7)))
+
+    assert item_to_result(store.latest("stock")).article_count == 7
+
+
+def test_repository_batches_writes_and_reads():
+    """同時の書き込みはまとめて1回で保存され、読み込みもまとめて行われる"""
+    store = MemoryResultStore()
+    repository = ResultRepository(store_factory=lambda: store, flush_size=25, flush_interval_ms=20)
+    results = [make_result(f"2024-01-{day:02d}", f"2024-01-{day + 6:02d}", day) for day in range(1, 11)]
+
+    async def main():
+        await asyncio.gather(*(repository.put(result_to_item(result)) for result in results))
+        keys = [("stock", make_window(result.date_from, result.date_to)) for result in results]
+        found = await repository.get_many(keys + [("stock", "missing")])
+        latest = await repository.latest("stock")
+        return found, latest
+
+    found, latest = asyncio.run(main())
+    assert store.calls == {'put_many': 1, 'get_many': 1}
+    assert len(found) == 10
+    assert item_to_result(found[("stock", make_window("2024-01-03", "2024-01-09"))]).article_count == 3
+    assert item_to_result(latest).article_count == 10
+
+
+def test_fetch_variant_distinguishes_languages_and_weighting():
+    """取得する言語（順序は問わない）と重複記事の重み付けが異なる結果は別のキーになる"""
+    assert fetch_variant("ja, en", "member") == fetch_variant("en,ja,en", "member") == "en,ja#member"
+    assert fetch_variant("en", "member") != fetch_variant("en", "cluster")
+    assert fetch_variant("all", "member") == "all#member"
+    assert make_window("2024-01-01", "2024-01-07").startswith("2024-01-01#2024-01-07#page#")
+
+
+def test_latest_only_considers_result_windows(tmp_path):
+    """同じqueryに分析結果以外のアイテムがあっても、最新の分析結果を返す"""
+    store = SQLiteResultStore(str(tmp_path / "results.db"))
+    store.put(result_to_item(make_result("2024-01-01", "2024-01-07", 5)))
+    store.put({'query': "stock", 'window': "keywords", 'keywords': [], 'created_at': "2999-01-01T00:00:00"})
+    assert item_to_result(store.latest("stock")).article_count == 5
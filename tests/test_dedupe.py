@@ -0,0 +1,44 @@
+from app.dedupe import ArticleDeduper, dedupe_articles, hamming, normalize_title, normalize_url, simhash
+
+
+def article(url, title, description="", source=""):
+    return {"url": url, "title": title, "description": description, "source": {"name": source}}
+
+
+def test_normalize_url_and_title():
+    assert normalize_url("https://www.example.com/news/1/?utm_source=x&id=3") == \
+        normalize_url("http://example.com/news/1?id=3")
+    assert normalize_title("Markets Rally On Rate Cut - Reuters", "Reuters") == "markets rally on rate cut"
+
+
+def test_simhash_is_close_for_near_duplicates():
+    """一部だけ異なる文のSimHashは近く、無関係な文は遠い"""
+    base = "The central bank cut interest rates by half a point on Tuesday, citing slowing growth and weak inflation"
+    near = base + " in the region"
+    other = "A new species of frog was discovered in the rainforest by a team of biologists from the university"
+    assert hamming(simhash(base), simhash(near)) < hamming(simhash(base), simhash(other))
+    assert simhash("") is None
+
+
+def test_deduper_clusters_duplicates():
+    """同じURLは除外し、同じタイトルや類似した内容の記事は同じクラスタにまとめる"""
+    description = "The central bank cut interest rates by half a point on Tuesday, citing slowing growth and weak inflation."
+    articles = [
+        article("https://a.com/1", "Bank cuts rates - A News", description, "A News"),
+        article("https://a.com/1?utm_source=feed", "Bank cuts rates - A News", description, "A News"),
+        article("https://b.com/x", "Bank cuts rates | B Daily", "Short summary.", "B Daily"),
+        article("https://d.com/z", "Frog species discovered", "Biologists found a new frog species.", "D"),
+    ]
+    kept, clusters, stats = dedupe_articles(articles)
+    assert [a["url"] for a in kept] == ["https://a.com/1", "https://b.com/x", "https://d.com/z"]
+    assert clusters[0] == clusters[1]
+    assert clusters[2] != clusters[0]
+    assert stats == {'clusters': 2, 'near_duplicates': 1, 'duplicate_urls': 1}
+
+
+def test_near_duplicate_descriptions_share_cluster():
+    deduper = ArticleDeduper(max_distance=3)
+    text = " ".join(f"word{i}" for i in range(60))
+    first = deduper.add(article("https://a.com/1", "Title one", text))
+    second = deduper.add(article("https://b.com/2", "Title one", text + " extra"))
+    assert first == second
@@ -0,0 +1,211 @@
+import asyncio
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from fastapi import HTTPException
+from app.fetcher import NewsFetcher
+
+ARTICLES = [
+    {'title': 'Stock rises', 'description': 'Good news', 'url': 'https://example.com/1'},
+    {'title': 'Stock falls', 'description': 'Bad news', 'url': 'https://example.com/2'},
+]
+
+
+def run_with_server(handler, scenario):
+    """フェイクのNews APIサーバーを起動してシナリオを実行する"""
+    async def main():
+        app = web.Application()
+        app.router.add_get("/v2/everything", handler)
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            return await scenario(str(server.make_url("/v2/everything")))
+        finally:
+            await server.close()
+    return asyncio.run(main())
+
+
+def test_fetch_news_async_retries_on_429():
+    """429の後にリトライして記事を取得する"""
+    calls = []
+
+    async def handler(request):
+        calls.append(dict(request.query))
+        if len(calls) == 1:
+            return web.json_response({'status': 'error', 'message': 'rate limited'}, status=429)
+        return web.json_response({'status': 'ok', 'totalResults': 2, 'articles': ARTICLES})
+
+    async def scenario(url):
+        fetcher = NewsFetcher(api_key="test-key", base_url=url, backoff=0.01)
+        try:
+            return await fetcher.fetch_news_async("stock", "2024-01-01", "2024-01-02")
+        finally:
+            await fetcher.close()
+
+    articles = run_with_server(handler, scenario)
+    assert articles == ARTICLES
+    assert len(calls) == 2
+    assert calls[0]['q'] == "stock"
+    assert calls[0]['apiKey'] == "test-key"
+
+
+def test_fetch_news_async_gives_up_after_max_retries():
+    """リトライ上限を超えたらエラーになる"""
+    calls = []
+
+    async def handler(request):
+        calls.append(1)
+        return web.json_response({'status': 'error', 'message': 'unavailable'}, status=503)
+
+    async def scenario(url):
+        fetcher = NewsFetcher(api_key="test-key", base_url=url, max_retries=2, backoff=0.01)
+        try:
+            with pytest.raises(HTTPException) as excinfo:
+                await fetcher.fetch_news_async("stock", "2024-01-01", "2024-01-02")
+            return excinfo.value
+        finally:
+            await fetcher.close()
+
+    error = run_with_server(handler, scenario)
+    assert error.status_code == 500
+    assert "unavailable" in error.detail
+    assert len(calls) == 3
+
+
+def test_fetch_news_async_retries_non_json_error_page():
+    """プロキシのHTMLのエラーページ（5xx）もリトライし、400にはしない"""
+    calls = []
+
+    async def handler(request):
+        calls.append(1)
+        if len(calls) == 1:
+            return web.Response(text="<html><body>502 Bad Gateway</body></html>", status=502, content_type="text/html")
+        return web.json_response({'status': 'ok', 'totalResults': 2, 'articles': ARTICLES})
+
+    async def always_failing(request):
+        return web.Response(text="<html>503</html>", status=503, content_type="text/html")
+
+    async def scenario(url):
+        fetcher = NewsFetcher(api_key="test-key", base_url=url, backoff=0.01)
+        try:
+            return await fetcher.fetch_news_async("stock", "2024-01-01", "2024-01-02")
+        finally:
+            await fetcher.close()
+
+    assert run_with_server(handler, scenario) == ARTICLES
+    assert len(calls) == 2
+
+    with pytest.raises(HTTPException) as excinfo:
+        run_with_server(always_failing, scenario)
+    assert excinfo.value.status_code == 500
+
+
+def test_fetch_news_sync_wrapper():
+    """同期ラッパーからも取得できる"""
+    async def handler(request):
+        return web.json_response({'status': 'ok', 'totalResults': 0, 'articles': []})
+
+    async def scenario(url):
+        fetcher = NewsFetcher(api_key="test-key", base_url=url)
+        loop = asyncio.get_running_loop()
+        with pytest.raises(HTTPException) as excinfo:
+            await loop.run_in_executor(None, fetcher.fetch_news, "stock", "2024-01-01", "2024-01-02")
+        return excinfo.value
+
+    error = run_with_server(handler, scenario)
+    assert error.status_code == 404
+
+
+def test_stream_news_paginates_days_and_dedupes():
+    """日単位・ページ単位に並列取得し、URLで重複を除外する"""
+    calls = []
+
+    async def handler(request):
+        day = request.query['from'][:10]
+        page = int(request.query['page'])
+        calls.append((day, page))
+        total = 150 if day == "2024-01-02" else 1
+        articles = [
+            {'title': f'{day}-{page}-{i}', 'url': f'https://example.com/{day}/{page}/{i}'}
+            for i in range(100 if page == 1 and total > 100 else total - 100 * (page - 1))
+        ]
+        # 日をまたいで配信された同一記事
+        articles.append({'title': 'wire', 'url': 'https://example.com/wire'})
+        return web.json_response({'status': 'ok', 'totalResults': total, 'articles': articles})
+
+    async def scenario(url):
+        fetcher = NewsFetcher(api_key="test-key", base_url=url)
+        report = {}
+        try:
+            articles = [
+                article async for article in fetcher.stream_news(
+                    "stock", "2024-01-01", "2024-01-02", max_articles=1000, max_requests=10, report=report
+                )
+            ]
+            return articles, report
+        finally:
+            await fetcher.close()
+
+    articles, report = run_with_server(handler, scenario)
+    assert sorted(calls) == [("2024-01-01", 1), ("2024-01-02", 1), ("2024-01-02", 2)]
+    assert sorted(report['complete_days']) == ["2024-01-01", "2024-01-02"]
+    assert report['requests'] == 3
+    urls = [article['url'] for article in articles]
+    assert len(urls) == len(set(urls)) == 100 + 50 + 1 + 1
+
+
+def test_stream_news_respects_article_cap_and_quota():
+    """記事数の上限とリクエスト数の上限を守る"""
+    calls = []
+
+    async def handler(request):
+        calls.append(request.query['from'])
+        page = request.query['page']
+        articles = [
+            {'url': f"https://example.com/{request.query['from']}/{page}/{i}"}
+            for i in range(100)
+        ]
+        return web.json_response({'status': 'ok', 'totalResults': 500, 'articles': articles})
+
+    async def scenario(url):
+        fetcher = NewsFetcher(api_key="test-key", base_url=url)
+        try:
+            capped = await fetcher.fetch_news_all("stock", "2024-01-01", "2024-01-10", max_articles=150)
+            quota = await fetcher.fetch_news_all("stock", "2024-01-01", "2024-01-10", max_articles=10000, max_requests=3)
+            return capped, quota
+        finally:
+            await fetcher.close()
+
+    capped, quota = run_with_server(handler, scenario)
+    assert len(capped) == 150
+    assert len(quota) == 300
+
+
+def test_fetch_requests_each_language():
+    """言語ごとにリクエストし、記事を公開日時の新しい順にまとめる"""
+    calls = []
+
+    async def handler(request):
+        language = request.query.get('language')
+        calls.append(language)
+        articles = [{'url': f'https://example.com/{language}', 'publishedAt': f"2024-01-0{2 if language == 'ja' else 1}T00:00:00Z"}]
+        return web.json_response({'status': 'ok', 'totalResults': 1, 'articles': articles})
+
+    async def scenario(url):
+        fetcher = NewsFetcher(api_key="test-key", base_url=url, languages="en, ja")
+        everything = NewsFetcher(api_key="test-key", base_url=url, languages="all")
+        try:
+            articles = await fetcher.fetch_news_async("stock", "2024-01-01", "2024-01-02")
+            report = {}
+            since = await fetcher.fetch_since("stock", "2024-01-01T00:00:00", report=report)
+            await everything.fetch_news_async("stock", "2024-01-01", "2024-01-02")
+            return articles, since, report
+        finally:
+            await fetcher.close()
+            await everything.close()
+
+    articles, since, report = run_with_server(handler, scenario)
+    assert [article['url'] for article in articles] == ["https://example.com/ja", "https://example.com/en"]
+    assert since == articles
+    assert report == {'requests': 2, 'skipped': 0}
+    assert calls == ["en", "ja", "en", "ja", None]
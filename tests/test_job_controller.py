@@ -0,0 +1,347 @@
+import asyncio
+import json
+import httpx
+import pytest
+from fastapi import FastAPI, HTTPException
+from app import db, job_controller
+from app.db import MemoryResultStore, ResultRepository, get_article_records, save_article_records, save_day_buckets
+
+
+class FakeAnalyzer:
+    def __init__(self, cache_revision="main+torch"):
+        self.model_name = "model"
+        self.cache_revision = cache_revision
+
+
+class FakeFetcher:
+    """日ごとに2件（good/bad）の記事を返し、取得した日付を記録する"""
+
+    def __init__(self):
+        self.requested = []
+
+    async def stream_news(self, query, date_from, date_to, days=None, report=None):
+        self.requested.append(sorted(days))
+        for day in days:
+            for word in ("good", "bad"):
+                yield {
+                    'title': f"{word} {day}",
+                    'description': "",
+                    'url': f"https://example.com/{day}/{word}",
+                    'publishedAt': f"{day}T09:00:00Z",
+                    'source': {'name': "example"},
+                }
+            # 日ごとに別の途中経過として届くように次の日の取得を待たせる
+            await asyncio.sleep(0.02)
+        report['complete_days'] = list(days)
+
+
+@pytest.fixture
+def env(monkeypatch):
+    store = MemoryResultStore()
+    monkeypatch.setattr(db, "repository", ResultRepository(store_factory=lambda: store))
+    monkeypatch.setattr(job_controller, "DEDUPE_ENABLED", False)
+    fetcher = FakeFetcher()
+    monkeypatch.setattr(job_controller, "get_news_fetcher", lambda: fetcher)
+    scored = []
+
+    async def analyze_texts(texts):
+        scored.extend(texts)
+        return [
+            {'sentiment': 'positive', 'score': 0.9, 'rating': 5, 'probs': [0, 0, 0, 0.1, 0.9]} if "good" in text
+            else {'sentiment': 'negative', 'score': 0.9, 'rating': 1, 'probs': [0.9, 0.1, 0, 0, 0]}
+            for text in texts
+        ]
+
+    monkeypatch.setattr(job_controller, "analyze_texts", analyze_texts)
+    analyzer = FakeAnalyzer()
+    monkeypatch.setattr(job_controller, "get_analyzer", lambda: analyzer)
+    return fetcher, scored, analyzer
+
+
+def run_stream(query="stock", date_from="2024-01-01", date_to="2024-01-03"):
+    async def main():
+        events = [event async for event in job_controller.stream_analysis(query, date_from, date_to)]
+        await asyncio.gather(*job_controller._pending_saves)
+        return events
+
+    return asyncio.run(main())
+
+
+def test_stream_fetches_only_missing_days_and_merges_buckets(env):
+    """保存済みの日別集計がある日は取得せず、取得した日の集計と合算する"""
+    fetcher, scored, analyzer = env
+    revision = job_controller.scoring_revision(analyzer)
+    asyncio.run(save_day_buckets(
+        "stock", {"2024-01-01": {'positive': 3, 'negative': 1, 'neutral': 0, 'total': 4}}, revision
+    ))
+
+    events = run_stream()
+    assert fetcher.requested == [["2024-01-02", "2024-01-03"]]
+    assert events[0]['cached_days'] == ["2024-01-01"]
+    result = events[-1]['result']
+    assert result['sentiment'] == {'positive': 5, 'negative': 3, 'neutral': 0, 'total': 8}
+    assert result['daily']["2024-01-01"]['total'] == 4
+    assert result['daily']["2024-01-03"] == {'positive': 1, 'negative': 1, 'neutral': 0, 'total': 2}
+    assert len(scored) == 4
+
+    # 取得した日の集計も保存され、次回は全ての日を取得しない
+    events = run_stream()
+    assert fetcher.requested[1:] == []
+    assert events[-1]['result']['sentiment'] == result['sentiment']
+
+
+def test_stream_ignores_records_from_other_revision(env):
+    """分析条件が変わると保存済みの日別集計・記事の結果を使わずに再分析する"""
+    fetcher, scored, analyzer = env
+    run_stream()
+    assert len(scored) == 6
+
+    analyzer.cache_revision = "main+onnx-int8"
+    run_stream()
+    assert fetcher.requested[1] == ["2024-01-01", "2024-01-02", "2024-01-03"]
+    assert len(scored) == 12
+
+
+def test_stored_result_is_keyed_by_revision(env, monkeypatch):
+    """分析条件が変わると保存済みの分析結果を返さずに再分析する"""
+    from app.model import AnalysisResult
+
+    _, _, analyzer = env
+    runs = []
+
+    async def run_analysis(query, date_from, date_to, paginate=False):
+        runs.append(analyzer.cache_revision)
+        return AnalysisResult(
+            query=query,
+            date_from=date_from,
+            date_to=date_to,
+            article_count=len(runs),
+            sentiment={"positive": 1, "negative": 0, "neutral": 0, "total": 1}
+        )
+
+    monkeypatch.setattr(job_controller, "run_analysis", run_analysis)
+
+    async def analyze():
+        result = await job_controller.analyze_with_store("stock", "2024-01-01", "2024-01-07")
+        await asyncio.gather(*job_controller._pending_saves)
+        return result.article_count
+
+    assert asyncio.run(analyze()) == 1
+    assert asyncio.run(analyze()) == 1
+    analyzer.cache_revision = "main+onnx-int8"
+    assert asyncio.run(analyze()) == 2
+    assert runs == ["main+torch", "main+onnx-int8"]
+
+
+def test_article_records_expire(monkeypatch):
+    """RECORD_TTLより前に保存された記事の結果は使わない"""
+    store = MemoryResultStore()
+    monkeypatch.setattr(db, "repository", ResultRepository(store_factory=lambda: store))
+    record = {'url': "https://example.com/a", 'sentiment': 'positive', 'score': 0.9, 'rating': 5}
+
+    async def main():
+        await save_article_records([record], "rev")
+        fresh = await get_article_records([record['url']], "rev")
+        other = await get_article_records([record['url']], "other")
+        monkeypatch.setattr(db, "RECORD_TTL", 0.0)
+        unlimited = await get_article_records([record['url']], "rev")
+        monkeypatch.setattr(db, "RECORD_TTL", 1e-6)
+        await asyncio.sleep(0.01)
+        expired = await get_article_records([record['url']], "rev")
+        return fresh, other, unlimited, expired
+
+    fresh, other, unlimited, expired = asyncio.run(main())
+    assert fresh[record['url']]['rating'] == 5
+    assert other == {} and expired == {}
+    assert record['url'] in unlimited
+
+
+def test_results_endpoint_ignores_internal_items(monkeypatch):
+    """「watchlist」などのキーワードの分析結果は、ウォッチリストなど内部のアイテムを保存した後も取得できる"""
+    from app.db import save_result, save_watch_keywords, save_watch_states
+    from app.model import AnalysisResult
+
+    store = MemoryResultStore()
+    monkeypatch.setattr(db, "repository", ResultRepository(store_factory=lambda: store))
+    app = FastAPI()
+    app.include_router(job_controller.router)
+    result = AnalysisResult(
+        query="watchlist",
+        date_from="2024-01-01",
+        date_to="2024-01-07",
+        article_count=1,
+        sentiment={"positive": 1, "negative": 0, "neutral": 0, "total": 1},
+        created_at="2024-01-08T00:00:00"
+    )
+
+    async def scenario():
+        await save_result(result)
+        await save_watch_keywords(["watchlist"])
+        await save_watch_states({"watchlist": {'total': 1}})
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            found = await client.get("/results/watchlist")
+            internal = await client.get("/results/%1Fwatchlist")
+            return found, internal
+
+    found, internal = asyncio.run(scenario())
+    assert found.status_code == 200
+    assert found.json()['article_count'] == 1
+    assert internal.status_code == 404
+
+
+def test_singleflight_shares_concurrent_calls(monkeypatch):
+    """同じ条件の同時リクエストは1回の分析を共有し、全員が同じ結果を受け取る"""
+    flight = job_controller.SingleFlight(ttl=0)
+    monkeypatch.setattr(job_controller, "analysis_flight", flight)
+    calls = []
+
+    async def analyze_with_store(query, date_from, date_to, paginate=False):
+        calls.append(query)
+        await asyncio.sleep(0.05)
+        return f"{query} {date_from} {date_to}"
+
+    monkeypatch.setattr(job_controller, "analyze_with_store", analyze_with_store)
+
+    async def main():
+        return await asyncio.gather(*(
+            job_controller.analyze_query("stock", "2024-01-01", "2024-01-07") for _ in range(5)
+        ))
+
+    results = asyncio.run(main())
+    assert calls == ["stock"]
+    assert results == ["stock 2024-01-01 2024-01-07"] * 5
+    assert flight.stats() == {'inflight': 0, 'recent': 0, 'leaders': 1, 'followers': 4, 'recent_hits': 0}
+
+
+def test_singleflight_cancelled_waiter_does_not_cancel_others():
+    """1人の待機者がキャンセルしても共有の計算と他の待機者は継続する"""
+    flight = job_controller.SingleFlight(ttl=0)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        first = asyncio.ensure_future(flight.do("key", compute))
+        second = asyncio.ensure_future(flight.do("key", compute))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "done"
+    assert calls == [1]
+
+
+def test_singleflight_reuses_recent_result_until_ttl():
+    """結果はttl秒だけ再利用し、その後は再計算する"""
+    flight = job_controller.SingleFlight(ttl=0.05)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return len(calls)
+
+    async def main():
+        first = await flight.do("key", compute)
+        hit = await flight.do("key", compute)
+        await asyncio.sleep(0.1)
+        expired = await flight.do("key", compute)
+        return first, hit, expired
+
+    assert asyncio.run(main()) == (1, 1, 2)
+    assert flight.recent_hits == 1
+
+
+def test_singleflight_propagates_errors_without_caching():
+    """例外は待機中の全員に伝わり、結果として再利用されない"""
+    flight = job_controller.SingleFlight(ttl=60)
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("fetch failed")
+
+    async def succeed():
+        return "ok"
+
+    async def main():
+        results = await asyncio.gather(*(flight.do("key", fail) for _ in range(3)), return_exceptions=True)
+        return results, await flight.do("key", succeed)
+
+    results, retried = asyncio.run(main())
+    assert calls == [1]
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert retried == "ok"
+    assert flight.stats()['inflight'] == 0
+
+
+def read_events(body):
+    """SSEの本文を(event, data)のリストに変換する"""
+    events = []
+    for block in body.split("\n\n"):
+        if not block:
+            continue
+        event, data = block.split("\n")
+        assert event.startswith("event: ") and data.startswith("data: ")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def get_stream(date_from="2024-01-01", date_to="2024-01-03"):
+    """/analyze/streamにリクエストし、保存が終わるのを待ってレスポンスを返す（起動処理は行わない）"""
+    app = FastAPI()
+    app.include_router(job_controller.router)
+
+    async def main():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get(
+                "/analyze/stream", params={'query': "stock", 'date_from': date_from, 'date_to': date_to}
+            )
+        await asyncio.gather(*job_controller._pending_saves)
+        return response
+
+    return asyncio.run(main())
+
+
+def test_stream_endpoint_sends_progress_per_day(env):
+    """/analyze/streamは取得した日ごとの途中経過と最後の集計をSSEで配信する"""
+    response = get_stream()
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith("text/event-stream")
+
+    events = read_events(response.text)
+    assert [name for name, _ in events] == ["articles", "articles", "articles", "done"]
+    assert all(data['event'] == name for name, data in events)
+    assert [[row['title'] for row in data['results']] for _, data in events[:3]] == [
+        [f"{word} {day}" for word in ("good", "bad")] for day in ("2024-01-03", "2024-01-02", "2024-01-01")
+    ]
+    assert [data['sentiment']['total'] for _, data in events[:3]] == [2, 4, 6]
+    result = events[-1][1]['result']
+    assert result['sentiment'] == {'positive': 3, 'negative': 3, 'neutral': 0, 'total': 6}
+    assert sorted(result['daily']) == ["2024-01-01", "2024-01-02", "2024-01-03"]
+
+
+def test_stream_endpoint_sends_error_event_when_fetch_fails(env, monkeypatch):
+    """取得が途中で失敗すると、それまでの途中経過の後にエラーのイベントを配信する"""
+    fetcher, _, _ = env
+
+    async def stream_news(query, date_from, date_to, days=None, report=None):
+        async for article in FakeFetcher.stream_news(fetcher, query, date_from, date_to, days=days[:1], report={}):
+            yield article
+        raise HTTPException(status_code=500, detail="News APIエラー: rateLimited")
+
+    monkeypatch.setattr(fetcher, "stream_news", stream_news)
+    response = get_stream()
+    assert response.status_code == 200
+
+    events = read_events(response.text)
+    assert [name for name, _ in events] == ["articles", "error"]
+    assert events[0][1]['sentiment']['total'] == 2
+    assert events[-1][1] == {'event': "error", 'status_code': 500, 'detail': "News APIエラー: rateLimited"}
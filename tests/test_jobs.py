@@ -0,0 +1,79 @@
+import asyncio
+import pytest
+from app.jobs import FAILED, PENDING, SUCCEEDED, JobManager, JobQueueFullError
+
+
+async def wait_finished(manager, job, timeout=1.0):
+    for _ in range(int(timeout / 0.01)):
+        if manager.get(job.job_id).finished:
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("ジョブが完了しませんでした")
+
+
+def test_job_runs_in_background_and_reports_result():
+    """ジョブはすぐに返され、バックグラウンドで実行される"""
+    async def main():
+        gate = asyncio.Event()
+
+        async def runner(job):
+            job.progress = {'processed': 1}
+            await gate.wait()
+            return {'query': job.params['query']}
+
+        manager = JobManager(runner, workers=1)
+        job = manager.submit(('q', '2024-01-01', '2024-01-02'), {'query': 'q'})
+        assert job.status == PENDING
+        await asyncio.sleep(0.01)
+        assert manager.get(job.job_id).progress == {'processed': 1}
+        gate.set()
+        await wait_finished(manager, job)
+        return manager.get(job.job_id)
+
+    job = asyncio.run(main())
+    assert job.status == SUCCEEDED
+    assert job.result == {'query': 'q'}
+
+
+def test_duplicate_in_flight_jobs_are_deduplicated():
+    """同じキーの実行中ジョブは共有され、完了後は新しいジョブになる"""
+    async def main():
+        calls = []
+
+        async def runner(job):
+            calls.append(job.job_id)
+            await asyncio.sleep(0.02)
+
+        manager = JobManager(runner, workers=2)
+        first = manager.submit('key', {})
+        second = manager.submit('key', {})
+        other = manager.submit('other', {})
+        await wait_finished(manager, first)
+        await wait_finished(manager, other)
+        third = manager.submit('key', {})
+        await wait_finished(manager, third)
+        return first, second, other, third, calls
+
+    first, second, other, third, calls = asyncio.run(main())
+    assert first is second
+    assert other is not first
+    assert third is not first
+    assert len(calls) == 3
+
+
+def test_failed_job_and_queue_limit():
+    """失敗したジョブはエラーを保持し、キューが満杯なら登録を拒否する"""
+    async def main():
+        async def runner(job):
+            raise RuntimeError("boom")
+
+        manager = JobManager(runner, workers=1, max_queue=1)
+        job = manager.submit('a', {})
+        with pytest.raises(JobQueueFullError):
+            manager.submit('b', {})
+        await wait_finished(manager, job)
+        return job
+
+    job = asyncio.run(main())
+    assert job.status == FAILED
+    assert job.error == "boom"
@@ -0,0 +1,42 @@
+from app import language
+from app.language import detect_language, parse_language_models, prepare, route_batch
+
+
+def test_detect_language_by_script():
+    assert detect_language("Apple shares rose after strong earnings") == "en"
+    assert detect_language("トヨタの株価が上昇した") == "ja"
+    assert detect_language("東京株式市場で日経平均が反発") == "ja"
+    assert detect_language("中国经济增长放缓") == "zh"
+    assert detect_language("삼성전자 주가 상승") == "ko"
+    assert detect_language("Курс рубля упал") == "ru"
+    # 英語の記事中の固有名詞程度のかなでは日本語にしない
+    assert detect_language("ソニー PlayStation sales beat expectations in the third quarter") == "en"
+
+
+def test_parse_language_models():
+    assert parse_language_models("ja=org/ja-model, ko = org/ko-model,broken") == {'ja': "org/ja-model", 'ko': "org/ko-model"}
+
+
+def test_japanese_falls_back_to_normalization(monkeypatch):
+    """MeCabを使えない場合はNFKC正規化のみ行い、文字数を長さの目安にする"""
+    segmenter = language.JapaneseSegmenter()
+    segmenter.available = False
+    monkeypatch.setattr(language, "japanese_segmenter", segmenter)
+    monkeypatch.setattr(language, "JAPANESE_SEGMENTATION", True)
+    assert prepare("ＡＩ関連株が上昇", "ja") == ("AI関連株が上昇", 8)
+
+
+def test_route_batch_groups_by_language_and_restores_order(monkeypatch):
+    monkeypatch.setattr(language, "JAPANESE_SEGMENTATION", False)
+    calls = []
+
+    def analyze_group(lang, texts):
+        calls.append((lang, texts))
+        return [{'sentiment': 'neutral', 'text': text, 'language': lang} for text in texts]
+
+    texts = ["a much longer english headline here", "株価が大きく上昇した", "short one", "株価が上昇"]
+    results = route_batch(texts, analyze_group)
+    assert [result['text'] for result in results] == texts
+    assert [result['language'] for result in results] == ["en", "ja", "en", "ja"]
+    # 言語ごとに1回、推定トークン数の短い順に渡される
+    assert calls == [("en", ["short one", "a much longer english headline here"]), ("ja", ["株価が上昇", "株価が大きく上昇した"])]
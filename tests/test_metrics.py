@@ -0,0 +1,59 @@
+import logging
+from app.logs import JsonFormatter, SamplingFilter, fields
+from app.metrics import Counter, Histogram, render
+
+
+def test_histogram_renders_cumulative_buckets():
+    """バケットは累積で、合計と件数を出力する"""
+    histogram = Histogram("test_latency_seconds", "テスト", labels=("status",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, status="200")
+    histogram.observe(0.5, status="200")
+    histogram.observe(3.0, status="200")
+    histogram.observe(0.05, status="429")
+
+    text = render([histogram])
+    assert "# TYPE test_latency_seconds histogram" in text
+    assert 'test_latency_seconds_bucket{status="200",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{status="200",le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{status="200",le="+Inf"} 3' in text
+    assert 'test_latency_seconds_sum{status="200"} 3.55' in text
+    assert 'test_latency_seconds_count{status="429"} 1' in text
+    assert histogram.count(status="200") == 3
+
+
+def test_counter_with_labels():
+    counter = Counter("test_lookups_total", "テスト", labels=("result",))
+    counter.inc(3, result="hit")
+    counter.inc(result="miss")
+    counter.inc(result="hit")
+
+    assert counter.value(result="hit") == 4
+    text = render([counter])
+    assert 'test_lookups_total{result="hit"} 4' in text
+    assert 'test_lookups_total{result="miss"} 1' in text
+
+
+def test_sampling_filter_keeps_warnings():
+    """sample=TrueのINFOは割合に応じて間引き、WARNING以上と通常のログは常に通す"""
+    logger = logging.getLogger("test")
+
+    def record(level, sample):
+        return logger.makeRecord("test", level, __file__, 0, "msg", (), None, extra=fields(sample=sample))
+
+    drop_all = SamplingFilter(0.0)
+    assert not drop_all.filter(record(logging.INFO, True))
+    assert drop_all.filter(record(logging.INFO, False))
+    assert drop_all.filter(record(logging.WARNING, True))
+    assert SamplingFilter(1.0).filter(record(logging.INFO, True))
+
+
+def test_json_formatter_includes_fields():
+    logger = logging.getLogger("socialear.test")
+    record = logger.makeRecord(
+        "socialear.test", logging.INFO, __file__, 0, "記事を取得しました", (), None,
+        extra=fields(articles=3)
+    )
+    line = JsonFormatter().format(record)
+    assert '"msg": "記事を取得しました"' in line
+    assert '"articles": 3' in line
+    assert '"level": "INFO"' in line
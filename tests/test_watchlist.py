@@ -0,0 +1,89 @@
+import asyncio
+from app import db
+from app.db import MemoryResultStore, ResultRepository, get_watch_states
+from app.fetcher import RateBudget
+from app.watchlist import Watchlist, apply_results, new_articles, new_state, summarize_state
+
+
+def article(url, published, title="Stock news"):
+    return {'title': title, 'description': '', 'url': url, 'publishedAt': published}
+
+
+def sentiment(rating):
+    return {'sentiment': 'positive' if rating >= 4 else 'negative' if rating <= 2 else 'neutral', 'score': 0.9, 'rating': rating}
+
+
+class FakeFetcher:
+    def __init__(self, articles):
+        self.articles = articles
+        self.calls = []
+
+    async def fetch_since(self, query, since, max_articles, max_requests, report):
+        self.calls.append(since)
+        report['requests'] = 1
+        report['skipped'] = 0
+        return [a for a in self.articles if a['publishedAt'][:19] >= since][::-1]
+
+
+def test_new_articles_skips_already_counted():
+    """前回の最新時刻の記事は再度返されても1回だけ数える"""
+    state = new_state("stock")
+    first = [article("u1", "2024-01-01T10:00:00Z"), article("u2", "2024-01-01T12:00:00Z")]
+    apply_results(state, first, [sentiment(5), sentiment(1)])
+    assert state['last_seen'] == "2024-01-01T12:00:00"
+    assert state['boundary_urls'] == ["u2"]
+
+    again = [article("u2", "2024-01-01T12:00:00Z"), article("u3", "2024-01-01T12:00:00Z"), article("u4", "2024-01-02T09:00:00Z")]
+    fresh = new_articles(state, again)
+    assert [a['url'] for a in fresh] == ["u3", "u4"]
+    apply_results(state, fresh, [sentiment(3), sentiment(4)])
+
+    summary = summarize_state(state)
+    assert summary['sentiment'] == {'positive': 2, 'negative': 1, 'neutral': 1, 'total': 4}
+    assert summary['daily']['2024-01-01']['total'] == 3
+    assert summary['rating_counts'] == [1, 0, 1, 1, 1]
+    assert summary['mean_rating'] == 3.25
+
+
+def test_poll_scores_only_the_delta(monkeypatch):
+    """2回目の取得は前回の最新時刻から行い、新しい記事だけを分析・保存する"""
+    store = MemoryResultStore()
+    monkeypatch.setattr(db, "repository", ResultRepository(store_factory=lambda: store))
+    fetcher = FakeFetcher([article("u1", "2099-01-01T10:00:00Z"), article("u2", "2099-01-01T11:00:00Z")])
+    scored = []
+
+    async def score(articles):
+        scored.append([a['url'] for a in articles])
+        return [sentiment(4) for _ in articles]
+
+    async def scenario():
+        watchlist = Watchlist(lambda: fetcher, score, keywords=["stock"], budget=RateBudget(10, 60))
+        await watchlist.poll("stock")
+        fetcher.articles.append(article("u3", "2099-01-01T12:00:00Z"))
+        summary = await watchlist.poll("stock")
+        return summary, await get_watch_states(["stock"])
+
+    summary, stored = asyncio.run(scenario())
+    assert scored == [["u1", "u2"], ["u3"]]
+    assert fetcher.calls[1] == "2099-01-01T11:00:00"
+    assert summary['sentiment']['total'] == 3
+    assert summary['polls'] == 2
+    assert stored['stock']['counts']['total'] == 3
+
+
+def test_rate_budget_and_interval():
+    """利用枠は時間とともに回復し、取得間隔はキーワード数に応じて延びる"""
+    now = [0.0]
+    budget = RateBudget(requests=60, period=3600, burst=2, clock=lambda: now[0])
+    budget.consume(2)
+    assert budget.delay() == 60
+    now[0] += 30
+    budget.consume()
+    assert budget.delay() == 90
+
+    async def noop(articles):
+        return []
+
+    watchlist = Watchlist(lambda: None, noop, keywords=["a", "b", "c"], interval=60, budget=budget,
+                          budget_requests=60, budget_period=3600)
+    assert watchlist.interval() == 180
@@ -0,0 +1,47 @@
+from app.workers import split_cores
+
+
+def test_split_cores_into_contiguous_groups():
+    """コアはワーカー数で連続した区間に分割される"""
+    assert split_cores(2, [0, 1, 2, 3]) == [[0, 1], [2, 3]]
+    assert split_cores(3, [0, 1, 2, 3, 4, 5, 6]) == [[0, 1, 2], [3, 4], [5, 6]]
+
+
+def test_split_cores_with_more_workers_than_cores():
+    """ワーカー数がコア数以上の場合は1コアずつ順番に割り当てる"""
+    assert split_cores(3, [4, 5]) == [[4], [5], [4]]
+    assert split_cores(2, []) == [[], []]
+
+
+def test_pool_cache_keys_match_in_process_and_check_restarts(tmp_path, monkeypatch):
+    """言語別のモデルのキャッシュキーはプロセス内の推論と同じになり、終了したワーカーは確認時に再起動される"""
+    from test_analyzer import make_tiny_model
+    from app import workers
+    from app.analyzer import SentimentAnalyzer
+    from app.cache import SentimentCache
+
+    (tmp_path / "default").mkdir()
+    (tmp_path / "ja").mkdir()
+    default_dir = make_tiny_model(tmp_path / "default")
+    ja_dir = make_tiny_model(tmp_path / "ja")
+    models = {'ja': f"{ja_dir}@main"}
+    monkeypatch.setenv("SENTIMENT_MODEL", str(default_dir))
+    monkeypatch.setenv("SENTIMENT_LANGUAGE_MODELS", f"ja={ja_dir}@main")
+    monkeypatch.setenv("MODEL_WARMUP", "0")
+    monkeypatch.setattr(workers, "LANGUAGE_MODELS", models)
+
+    local = SentimentAnalyzer(model_name=str(default_dir), cache=SentimentCache(db_path=None), language_models=models)
+    expected = local.for_language('ja')
+    pool = workers.InferencePool(1, cache=SentimentCache(db_path=None), check_interval=0)
+    try:
+        pool.start()
+        assert pool._language_model('ja') == (expected.model_name, expected.cache_revision)
+        assert pool._language_model('en') == (local.model_name, local.cache_revision)
+
+        worker = pool._workers[0]
+        worker.process.kill()
+        worker.process.join()
+        assert pool.check() == 1
+        assert pool.health()[0]['alive'] and pool.health()[0]['restarts'] == 1
+    finally:
+        pool.close()